@@ -1,93 +1,292 @@
 extern crate cpython;
 
-use cpython::{PyResult, Python, py_module_initializer, py_fn};
+use cpython::{PyResult, PyErr, Python, exc, py_module_initializer, py_fn};
 
 py_module_initializer!(babygiant, |py, m| {
     m.add(py, "__doc__", "This module is implemented in Rust.")?;
     m.add(py, "compute_dlog", py_fn!(py, compute_dlog(x: &str, y: &str)))?;
+    m.add(py, "compute_dlogs", py_fn!(py, compute_dlogs(table_file: &str, xs: Vec<String>, ys: Vec<String>)))?;
     Ok(())
 });
 
-use ark_ed_on_bn254::{EdwardsAffine as BabyJubJub, Fr, Fq, EdwardsParameters};
+use ark_ed_on_bn254::{EdwardsAffine as BabyJubJub, Fq, EdwardsParameters};
 use ark_ff::{BigInteger256, field_new, PrimeField, BigInteger};
 use ark_ec::{AffineCurve, ProjectiveCurve};
 use ark_ec::twisted_edwards_extended::{GroupProjective, GroupAffine};
+use ark_std::Zero;
 use hex;
+use memmap2::Mmap;
 
-use std::collections::HashMap;
+use std::convert::TryInto;
+use std::fs::{self, File};
+use std::io;
+use std::sync::{Arc, Mutex};
 
-fn baby_giant(max_bitwidth: u64, a: &GroupAffine<EdwardsParameters>, b: &GroupProjective<EdwardsParameters>) -> u64 {
-    let m = 1u64 << (max_bitwidth / 2);
+type Affine = GroupAffine<EdwardsParameters>;
+type Projective = GroupProjective<EdwardsParameters>;
 
-    let mut table = HashMap::new();
-    for j in 0u64..m {
-        // NOTE: equality and hashing (used for HashMap) does not perform as expected
-        // for projective representation (because coordinates are ambiguous), so switching
-        // to affine coordinates here
-        let v = a.mul(Fr::new(BigInteger256::from(j))).into_affine();
-        table.insert(v, j);
+const MAX_BITWIDTH: u64 = 32;
+
+// Baby-step table file format (all integers little-endian):
+//   magic (8 bytes) | m (u64) | m entries of (fingerprint(j*a) (u64), j (u32)), sorted by fingerprint
+const TABLE_MAGIC: &[u8; 8] = b"BGTABLE1";
+const HEADER_SIZE: usize = 16;
+const ENTRY_SIZE: usize = 12;
+
+// Number of giant steps which are converted to affine coordinates at once (batch normalization)
+const GIANT_STEP_BATCH: u64 = 1024;
+
+enum TableData {
+    Mapped(Mmap),
+    Owned(Vec<u8>),
+}
+
+struct Table {
+    data: TableData,
+}
+
+impl Table {
+    fn bytes(&self) -> &[u8] {
+        match &self.data {
+            TableData::Mapped(m) => &m[..],
+            TableData::Owned(v) => &v[..],
+        }
+    }
+
+    fn m(&self) -> u64 {
+        u64::from_le_bytes(self.bytes()[8..16].try_into().unwrap())
+    }
+
+    fn entry(&self, idx: usize) -> (u64, u64) {
+        let e = &self.bytes()[HEADER_SIZE + idx * ENTRY_SIZE..HEADER_SIZE + (idx + 1) * ENTRY_SIZE];
+        (u64::from_le_bytes(e[0..8].try_into().unwrap()), u32::from_le_bytes(e[8..12].try_into().unwrap()) as u64)
     }
-    let am = a.mul(Fr::new(BigInteger256::from(m)));
-    let mut gamma = b.clone();
 
-    for i in 0u64..m {
-        if let Some(j) = table.get(&gamma.into_affine()) {
-            return i*m + j;
+    /// All j for which fingerprint(j*a) == fp (usually at most one)
+    fn candidates(&self, fp: u64) -> Vec<u64> {
+        let n = self.m() as usize;
+        let (mut lo, mut hi) = (0usize, n);
+        while lo < hi {
+            let mid = (lo + hi) / 2;
+            if self.entry(mid).0 < fp {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        let mut ret = vec![];
+        while lo < n {
+            let (efp, j) = self.entry(lo);
+            if efp != fp {
+                break;
+            }
+            ret.push(j);
+            lo += 1;
         }
-        gamma = gamma - &am;
+        ret
     }
+}
 
-    panic!("No discrete log found");
+fn is_valid_table(data: &[u8], m: u64) -> bool {
+    data.len() == HEADER_SIZE + ENTRY_SIZE * m as usize
+        && &data[0..8] == TABLE_MAGIC
+        && u64::from_le_bytes(data[8..16].try_into().unwrap()) == m
 }
 
-fn compute_dlog(_py: Python, x: &str, y: &str) -> PyResult<String> {
-    let res = do_compute_dlog(x, y);
-    Ok(res.to_string())
+fn generator() -> Affine {
+    let gx = field_new!(Fq, "11904062828411472290643689191857696496057424932476499415469791423656658550213");
+    let gy = field_new!(Fq, "9356450144216313082194365820021861619676443907964402770398322487858544118183");
+    BabyJubJub::new(gx, gy)
+}
+
+fn fingerprint(p: &Affine) -> u64 {
+    p.x.into_repr().0[0]
+}
+
+fn small_mul(a: &Affine, k: u64) -> Projective {
+    let mut ret = Projective::zero();
+    for bit in (0..64).rev() {
+        ret.double_in_place();
+        if (k >> bit) & 1 == 1 {
+            ret.add_assign_mixed(a);
+        }
+    }
+    ret
+}
+
+fn build_table(a: &Affine, m: u64) -> Vec<u8> {
+    let mut steps = Vec::with_capacity(m as usize);
+    let mut acc = Projective::zero();
+    for _ in 0..m {
+        steps.push(acc);
+        acc.add_assign_mixed(a);
+    }
+    let steps = Projective::batch_normalization_into_affine(&steps);
+
+    let mut entries: Vec<(u64, u32)> = steps.iter().enumerate().map(|(j, p)| (fingerprint(p), j as u32)).collect();
+    entries.sort_unstable();
+
+    let mut data = Vec::with_capacity(HEADER_SIZE + ENTRY_SIZE * entries.len());
+    data.extend_from_slice(TABLE_MAGIC);
+    data.extend_from_slice(&m.to_le_bytes());
+    for (fp, j) in entries {
+        data.extend_from_slice(&fp.to_le_bytes());
+        data.extend_from_slice(&j.to_le_bytes());
+    }
+    data
+}
+
+fn map_table(table_file: &str, m: u64) -> io::Result<Option<Table>> {
+    let file = match File::open(table_file) {
+        Ok(f) => f,
+        Err(ref e) if e.kind() == io::ErrorKind::NotFound => return Ok(None),
+        Err(e) => return Err(e),
+    };
+    // The file is only ever replaced atomically, never modified in place
+    let mmap = unsafe { Mmap::map(&file)? };
+    if is_valid_table(&mmap[..], m) {
+        Ok(Some(Table { data: TableData::Mapped(mmap) }))
+    } else {
+        Ok(None)
+    }
+}
+
+/// Memory-map the baby-step table stored in table_file, compute and store it first if it does not exist yet.
+fn load_table(table_file: &str, a: &Affine, m: u64) -> io::Result<Table> {
+    if let Some(table) = map_table(table_file, m)? {
+        return Ok(table);
+    }
+    let tmp_file = format!("{}.{}.tmp", table_file, std::process::id());
+    fs::write(&tmp_file, build_table(a, m))?;
+    fs::rename(&tmp_file, table_file)?;
+    map_table(table_file, m)?.ok_or_else(|| io::Error::new(io::ErrorKind::InvalidData, "Invalid baby-step table"))
+}
+
+// Tables used by this process (key None: in-memory table of compute_dlog)
+static TABLES: Mutex<Vec<(Option<String>, Arc<Table>)>> = Mutex::new(Vec::new());
+
+fn get_table(table_file: Option<&str>, a: &Affine, m: u64) -> io::Result<Arc<Table>> {
+    let mut tables = TABLES.lock().unwrap();
+    if let Some((_, table)) = tables.iter().find(|(f, _)| f.as_deref() == table_file) {
+        return Ok(table.clone());
+    }
+    let table = Arc::new(match table_file {
+        Some(f) => load_table(f, a, m)?,
+        None => Table { data: TableData::Owned(build_table(a, m)) },
+    });
+    tables.push((table_file.map(String::from), table.clone()));
+    Ok(table)
 }
 
-fn parse_le_bytes_str(s: &str) -> BigInteger256 {
-    let mut buffer = [0u8; 32];     // 32 bytes for 265 bits
+fn baby_giant(table: &Table, a: &Affine, b: &Projective) -> Option<u64> {
+    let m = table.m();
+    let am = small_mul(a, m);
+    let mut gamma = b.clone();
+
+    let mut i = 0u64;
+    while i < m {
+        let n = std::cmp::min(GIANT_STEP_BATCH, m - i);
+        let mut batch = Vec::with_capacity(n as usize);
+        for _ in 0..n {
+            batch.push(gamma);
+            gamma = gamma - &am;
+        }
+        // NOTE: the projective representation is ambiguous, so switching to affine coordinates for the lookup
+        let batch = Projective::batch_normalization_into_affine(&batch);
+        for (k, p) in batch.iter().enumerate() {
+            for j in table.candidates(fingerprint(p)) {
+                // Fingerprints are truncated, verify the match
+                let x = (i + k as u64) * m + j;
+                if small_mul(a, x) == *b {
+                    return Some(x);
+                }
+            }
+        }
+        i += n;
+    }
+    None
+}
 
-    let v = hex::decode(s).unwrap();
-    assert_eq!(v.len(), 32);
-    let v = v.as_slice();
-    for i in 0..32 {
-        buffer[i] = v[i];
+fn parse_le_bytes_str(s: &str) -> Result<BigInteger256, String> {
+    let v = hex::decode(s).map_err(|e| e.to_string())?;
+    if v.len() != 32 {
+        return Err(format!("Expected 32 bytes, got {}", v.len()));
     }
 
     let mut bi = BigInteger256::new([0; 4]);
-    bi.read_le(&mut buffer.as_ref()).unwrap();
-    return bi;
+    bi.read_le(&mut v.as_slice()).map_err(|e| e.to_string())?;
+    Ok(bi)
 }
 
-fn do_compute_dlog(x: &str, y: &str) -> u64 {
+fn parse_point(x: &str, y: &str) -> Result<Projective, String> {
     // x and y are in little-endian hex string format
+    let bx = Fq::from_repr(parse_le_bytes_str(x)?).ok_or("Coordinate out of range")?;
+    let by = Fq::from_repr(parse_le_bytes_str(y)?).ok_or("Coordinate out of range")?;
 
-    let gx = field_new!(Fq, "11904062828411472290643689191857696496057424932476499415469791423656658550213");
-    let gy = field_new!(Fq, "9356450144216313082194365820021861619676443907964402770398322487858544118183");
-    let a = BabyJubJub::new(gx, gy);
-    // assert!(BabyJubJub::is_on_curve(&a));
-    // assert!(BabyJubJub::is_in_correct_subgroup_assuming_on_curve(&a));
+    let b = BabyJubJub::new(bx, by);
+    if !b.is_on_curve() || !b.is_in_correct_subgroup_assuming_on_curve() {
+        return Err(format!("({}, {}) is not a point in the prime order subgroup", x, y));
+    }
+    Ok(b.into_projective())
+}
 
-    let bx = Fq::from_repr(parse_le_bytes_str(x)).unwrap();
-    let by = Fq::from_repr(parse_le_bytes_str(y)).unwrap();
+fn do_compute_dlogs(table_file: Option<&str>, points: &[(String, String)]) -> Result<Vec<u64>, String> {
+    let a = generator();
+    let m = 1u64 << (MAX_BITWIDTH / 2);
+    let table = get_table(table_file, &a, m).map_err(|e| format!("Cannot load baby-step table: {}", e))?;
 
-    let b = BabyJubJub::new(bx, by);
-    assert!(BabyJubJub::is_on_curve(&b));
-    assert!(BabyJubJub::is_in_correct_subgroup_assuming_on_curve(&b));
-    let b = b.mul(Fr::new(BigInteger256::from(1)));
+    points.iter().map(|(x, y)| {
+        let b = parse_point(x, y)?;
+        baby_giant(&table, &a, &b).ok_or_else(|| format!("No discrete log found for ({}, {})", x, y))
+    }).collect()
+}
+
+fn compute_dlog(_py: Python, x: &str, y: &str) -> PyResult<String> {
+    let res = do_compute_dlogs(None, &[(x.to_string(), y.to_string())]).unwrap_or_else(|e| panic!("{}", e));
+    Ok(res[0].to_string())
+}
 
-    baby_giant(32, &a, &b)
+/// Compute the discrete logs of all points (xs[i], ys[i]) using the baby-step table stored in table_file.
+fn compute_dlogs(py: Python, table_file: &str, xs: Vec<String>, ys: Vec<String>) -> PyResult<Vec<String>> {
+    if xs.len() != ys.len() {
+        return Err(PyErr::new::<exc::ValueError, _>(py, "xs and ys must have the same length"));
+    }
+    let points: Vec<(String, String)> = xs.into_iter().zip(ys.into_iter()).collect();
+    let table_file = table_file.to_string();
+    let res = py.allow_threads(|| do_compute_dlogs(Some(&table_file), &points));
+    match res {
+        Ok(dlogs) => Ok(dlogs.iter().map(|d| d.to_string()).collect()),
+        Err(e) => Err(PyErr::new::<exc::ValueError, _>(py, e)),
+    }
 }
 
 #[cfg(test)]
 mod tests {
     use super::*;
 
+    fn point(x: &str, y: &str) -> (String, String) {
+        (x.to_string(), y.to_string())
+    }
+
     #[test]
     fn test_compute_dlog() {
-        let dlog = do_compute_dlog("c53d8d24e6767618b495ed560a0cb4fa3d86c5b86e0d9555ab4ef69cf675511a",
-                                   "a7099eb9f4b811bbd4ea1643e449bd1551d732d9ebc81833e5e33a3c2890af14");
-        assert_eq!(1, dlog);
+        let dlog = do_compute_dlogs(None, &[point("c53d8d24e6767618b495ed560a0cb4fa3d86c5b86e0d9555ab4ef69cf675511a",
+                                                   "a7099eb9f4b811bbd4ea1643e449bd1551d732d9ebc81833e5e33a3c2890af14")]);
+        assert_eq!(Ok(vec![1]), dlog);
+    }
+
+    #[test]
+    fn test_compute_dlogs_with_table_file() {
+        let table_file = std::env::temp_dir().join(format!("babygiant_test_{}.bin", std::process::id()));
+        let table_file = table_file.to_str().unwrap();
+        let points = [point("c53d8d24e6767618b495ed560a0cb4fa3d86c5b86e0d9555ab4ef69cf675511a",
+                            "a7099eb9f4b811bbd4ea1643e449bd1551d732d9ebc81833e5e33a3c2890af14"),
+                      point("0000000000000000000000000000000000000000000000000000000000000000",
+                            "0100000000000000000000000000000000000000000000000000000000000000")];
+        assert_eq!(Ok(vec![1, 0]), do_compute_dlogs(Some(table_file), &points));
+
+        let data = fs::read(table_file).unwrap();
+        assert!(is_valid_table(&data, 1 << (MAX_BITWIDTH / 2)));
+        fs::remove_file(table_file).unwrap();
     }
 }
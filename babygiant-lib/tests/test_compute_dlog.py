@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import babygiant
@@ -45,3 +47,27 @@ class TestComputeDlog(unittest.TestCase):
         x = 19121738117514367125825473914004741810707492687275644297534200073386934052875
         y = 8407169098186914336744034121476531686413014126989797732313769594461994647750
         self.assertEqual("11", babygiant.compute_dlog(to_le_32_hex_bytes(x), to_le_32_hex_bytes(y)))
+
+
+class TestComputeDlogs(unittest.TestCase):
+
+    def test_compute_dlogs(self):
+        with tempfile.TemporaryDirectory() as d:
+            table_file = os.path.join(d, 'babystep_table.bin')
+            points = [(11904062828411472290643689191857696496057424932476499415469791423656658550213,
+                       9356450144216313082194365820021861619676443907964402770398322487858544118183),
+                      (1237782632357792921748619918672290873715140228147952285260614658227666644805,
+                       8536601915096873801487482824890195798313989719405833310308025351040807340450),
+                      (0, 1)]
+            xs = [to_le_32_hex_bytes(x) for x, _ in points]
+            ys = [to_le_32_hex_bytes(y) for _, y in points]
+            self.assertEqual(["1", "439864", "0"], babygiant.compute_dlogs(table_file, xs, ys))
+            self.assertTrue(os.path.exists(table_file))
+
+            # Second call maps the existing table
+            self.assertEqual(["439864"], babygiant.compute_dlogs(table_file, xs[1:2], ys[1:2]))
+
+    def test_compute_dlogs_invalid_point(self):
+        with tempfile.TemporaryDirectory() as d:
+            with self.assertRaises(ValueError):
+                babygiant.compute_dlogs(os.path.join(d, 'babystep_table.bin'), [to_le_32_hex_bytes(1)], [to_le_32_hex_bytes(1)])
@@ -97,9 +97,12 @@ setup(
         'appdirs>=1.4,<1.5',
         'argcomplete>=1,<2',
         'semantic-version>=2.8.4,<2.9',
-        'babygiant-lib==1.0',
+        'babygiant-lib>=1.0,<2',
         'pysha3>=1.0.2,<1.1', # Console script doesn't work without this even though it is not required
     ],
+    extras_require={
+        'gmp': ['gmpy2>=2.0.8,<3'],  # Faster modular arithmetic for the Paillier, RSA and ElGamal backends
+    },
 
     # Contents
     packages=packages,
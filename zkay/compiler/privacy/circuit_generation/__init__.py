@@ -7,6 +7,7 @@ Submodules
 * :py:mod:`.circuit_helper`:     Helper class to construct high-level abstract proof circuits
 * :py:mod:`.circuit_constraints` Defines the different types of abstract circuit statements
 * :py:mod:`.circuit_generator`   Compiles abstract proof circuits generated by circuit_helper into concrete proof circuits and generates verification contracts
+* :py:mod:`.circuit_cache`       Cache for compiled circuits and keys which is shared by all projects
 
 ===========
 Subpackages
@@ -5,6 +5,7 @@ from typing import List, Optional, Union, Tuple
 
 import zkay.jsnark_interface.jsnark_interface as jsnark
 import zkay.jsnark_interface.libsnark_interface as libsnark
+from zkay.compiler.privacy.circuit_generation.circuit_cache import get_circuit_cache, unlink_shared_files
 from zkay.compiler.privacy.circuit_generation.circuit_constraints import CircComment, CircIndentBlock, \
     CircGuardModification, CircCall, CircSymmEncConstraint
 from zkay.compiler.privacy.circuit_generation.circuit_generator import CircuitGenerator
@@ -247,11 +248,18 @@ class JsnarkGenerator(CircuitGenerator):
 
         # Invoke jsnark compilation if either the jsnark-wrapper or the current circuit was modified (based on hash comparison)
         if oldhash != digest or not os.path.exists(os.path.join(output_dir, 'circuit.arith')):
+            # Files which were restored from the circuit cache must not be overwritten in place
+            unlink_shared_files(output_dir, exclude=self.get_vk_and_pk_filenames())
             if not import_keys:
                 # Remove old keys
                 for f in self._get_vk_and_pk_paths(circuit):
                     if os.path.exists(f):
                         os.remove(f)
+
+                cache = get_circuit_cache()
+                if cache is not None and cache.restore(digest, output_dir):
+                    zk_print(f'Circuit \'{circuit.get_verification_contract_name()}\' found in circuit cache, skipping compilation')
+                    return False
             jsnark.compile_circuit(output_dir, code)
             with open(hashfile, 'w') as f:
                 f.write(digest)
@@ -260,7 +268,23 @@ class JsnarkGenerator(CircuitGenerator):
             zk_print(f'Circuit \'{circuit.get_verification_contract_name()}\' not modified, skipping compilation')
             return False
 
+    def generate_circuits(self, *, import_keys: bool):
+        super().generate_circuits(import_keys=import_keys)
+
+        cache = get_circuit_cache()
+        if cache is not None and not import_keys:
+            for circuit in self.circuits_to_prove:
+                output_dir = self._get_circuit_output_dir(circuit)
+                with open(os.path.join(output_dir, f'{cfg.jsnark_circuit_classname}.hash')) as f:
+                    digest = f.read()
+                cache.store(digest, output_dir, [f for f in os.listdir(output_dir) if os.path.isfile(os.path.join(output_dir, f))])
+
     def _generate_keys(self, circuit: CircuitHelper):
+        # Remaining key files may be shared with the circuit cache, they must not be overwritten in place
+        for f in self._get_vk_and_pk_paths(circuit):
+            if os.path.exists(f):
+                os.remove(f)
+
         # Invoke the custom libsnark interface to generate keys
         output_dir = self._get_circuit_output_dir(circuit)
         libsnark.generate_keys(output_dir, output_dir, self.proving_scheme.name)
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional
+
+from zkay.config import cfg
+
+
+class CircuitCache:
+    """
+    Content-addressed cache for compiled circuits and their keys, which is shared by all projects on a machine.
+
+    Each entry is a directory (named after the digest of the circuit) which holds a copy of all files of a circuit output
+    directory. Files are hard-linked into and out of the cache if possible (otherwise copied).
+    If the cache exceeds max_size bytes, the least recently used entries are removed.
+
+    Entries are only ever added atomically and are never modified, the cache can thus be shared by concurrent processes.
+    """
+
+    def __init__(self, cache_dir: str, max_size: Optional[int] = None):
+        """
+        :param cache_dir: directory in which the cache entries are stored
+        :param max_size: maximum total size of all entries in bytes (if None, no limit)
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest)
+
+    def contains(self, digest: str) -> bool:
+        return os.path.isdir(self._entry_dir(digest))
+
+    def restore(self, digest: str, output_dir: str) -> bool:
+        """
+        Put the files of the entry for digest into output_dir (replacing existing files with the same name).
+
+        :return: True if the entry was found and restored
+        """
+        entry_dir = self._entry_dir(digest)
+        restored = []
+        try:
+            for filename in os.listdir(entry_dir):
+                _link_or_copy(os.path.join(entry_dir, filename), os.path.join(output_dir, filename))
+                restored.append(filename)
+            os.utime(entry_dir)
+        except FileNotFoundError:
+            # No entry or concurrently evicted, do not leave an incomplete circuit behind
+            for filename in restored:
+                os.remove(os.path.join(output_dir, filename))
+            return False
+        return True
+
+    def store(self, digest: str, output_dir: str, filenames: Iterable[str]):
+        """Add the files filenames of output_dir as the entry for digest (if there is none yet) and evict old entries."""
+        entry_dir = self._entry_dir(digest)
+        if os.path.isdir(entry_dir):
+            os.utime(entry_dir)
+            return
+
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp_')
+        try:
+            for filename in filenames:
+                _link_or_copy(os.path.join(output_dir, filename), os.path.join(tmp_dir, filename))
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Entry was added by another process (or the files are incomplete)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict(keep=digest)
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove the least recently used entries (except keep) until the cache fits into max_size."""
+        if self.max_size is None:
+            return
+        entries = []
+        for digest in self.entries():
+            entry_dir = self._entry_dir(digest)
+            try:
+                size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+                entries.append((os.path.getmtime(entry_dir), size, digest))
+            except FileNotFoundError:
+                pass
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, digest in sorted(entries):
+            if total <= self.max_size:
+                break
+            if digest != keep:
+                shutil.rmtree(self._entry_dir(digest), ignore_errors=True)
+                total -= size
+
+    def entries(self) -> List[str]:
+        """Return the digests of all entries."""
+        return [d for d in os.listdir(self.cache_dir) if not d.startswith('.') and os.path.isdir(self._entry_dir(d))]
+
+
+def _link_or_copy(src: str, dst: str):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Different file system or no hard link support
+        shutil.copy2(src, dst)
+
+
+def unlink_shared_files(directory: str, exclude: Iterable[str] = ()):
+    """
+    Remove all files in directory, which are hard-linked from somewhere else (e.g. from a CircuitCache entry).
+
+    This must be done before files in directory are overwritten in place, as this would modify all linked copies.
+    """
+    exclude = set(exclude)
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if filename not in exclude and os.path.isfile(path) and os.stat(path).st_nlink > 1:
+            os.remove(path)
+
+
+def get_circuit_cache() -> Optional[CircuitCache]:
+    """Return the circuit cache in cfg.circuit_cache_dir (None if the cache is disabled)."""
+    if not cfg.circuit_cache_dir:
+        return None
+    max_size = int(cfg.circuit_cache_max_size_gb * (1 << 30)) if cfg.circuit_cache_max_size_gb > 0 else None
+    return CircuitCache(cfg.circuit_cache_dir, max_size)
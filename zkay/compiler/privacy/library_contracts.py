@@ -37,6 +37,8 @@ def get_pki_contract(params: CryptoParams) -> str:
         mapping(address => uint[{params.key_len}]) pks;
         mapping(address => bool) hasAnnounced;
 
+        event PkAnnounced(address indexed owner);
+
         function announcePk(uint[{params.key_len}] calldata pk) external {{
             bool all_zero = true;
             for (uint i = 0; i < {params.key_len}; ++i) {{
@@ -45,12 +47,22 @@ def get_pki_contract(params: CryptoParams) -> str:
             require(!all_zero, "ERROR: 0 is not a valid public key.");
             pks[msg.sender] = pk;
             hasAnnounced[msg.sender] = true;
+            emit PkAnnounced(msg.sender);
         }}
 
         function getPk(address a) public view returns(uint[{params.key_len}] memory) {{
             require(hasAnnounced[a]);
             return pks[a];
         }}
+
+        function getPks(address[] calldata addrs) external view returns(uint[{params.key_len}][] memory keys, bool[] memory announced) {{
+            keys = new uint[{params.key_len}][](addrs.length);
+            announced = new bool[](addrs.length);
+            for (uint i = 0; i < addrs.length; ++i) {{
+                keys[i] = pks[addrs[i]];
+                announced[i] = hasAnnounced[addrs[i]];
+            }}
+        }}
     }}
     ''')
 
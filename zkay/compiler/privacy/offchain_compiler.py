@@ -107,6 +107,13 @@ class PythonOffchainVisitor(PythonCodeVisitor):
             raise NotImplementedError(f'No python constructor for type {t}')
         return constr
 
+    @staticmethod
+    def _get_plain_bits(t: TypeName) -> Optional[int]:
+        """Return n such that all values of type t are in range [0, 2^n) (None if t can have negative values)."""
+        if isinstance(t, BoolTypeName) or (isinstance(t, NumberTypeName) and not t.signed):
+            return t.elem_bitwidth
+        return None
+
     def get_constructor_args_and_params(self, ast: ContractDefinition):
         if not ast.constructor_definitions:
             return '', ''
@@ -207,7 +214,8 @@ class PythonOffchainVisitor(PythonCodeVisitor):
                 t = t.value_type.type_name
             if isinstance(t, CipherText):
                 crypto_name = t.crypto_params.crypto_name
-                constr = f', {self._get_type_constr(t.plain_type.type_name)}, cipher=True, crypto_backend="{crypto_name}"'
+                constr = f', {self._get_type_constr(t.plain_type.type_name)}, cipher=True, crypto_backend="{crypto_name}", ' \
+                         f'plain_bits={self._get_plain_bits(t.plain_type.type_name)}'
             else:
                 constr = f', {self._get_type_constr(t)}'
             sv_constr.append(f'self.state.decl("{svd.idf.name}"{constr})')
@@ -462,7 +470,8 @@ class PythonOffchainVisitor(PythonCodeVisitor):
             for retparam in ast.return_parameters:
                 t = retparam.annotated_type.type_name
                 if isinstance(t, CipherText):
-                    constr = f'(True, "{t.crypto_params.crypto_name}", {self._get_type_constr(t.plain_type.type_name)})'
+                    constr = f'(True, "{t.crypto_params.crypto_name}", {self._get_type_constr(t.plain_type.type_name)}, ' \
+                             f'{self._get_plain_bits(t.plain_type.type_name)})'
                 else:
                     constr = f'(False, None, {self._get_type_constr(t)})'
                 constructors.append(constr)
@@ -532,7 +541,8 @@ class PythonOffchainVisitor(PythonCodeVisitor):
             constr = self._get_type_constr(in_idf.t.plain_type.type_name)
             crypto_params = in_idf.t.crypto_params
             crypto_str = f'crypto_backend="{crypto_params.crypto_name}"'
-            dec_call = f'{api("dec")}({self.visit(in_idf.get_loc_expr())}, {constr}, {crypto_str})'
+            plain_bits = self._get_plain_bits(in_idf.t.plain_type.type_name)
+            dec_call = f'{api("dec")}({self.visit(in_idf.get_loc_expr())}, {constr}, {crypto_str}, plain_bits={plain_bits})'
             if crypto_params.is_symmetric_cipher():
                 in_decrypt += f'\n{plain_idf_name}, _ = {dec_call}'
             else:
@@ -66,6 +66,10 @@ class UserConfig:
 
         self._indentation: str = ' ' * 4
         self._libsnark_check_verify_locally_during_proof_generation: bool = False
+        self._jsnark_witness_server: bool = False
+        self._jsnark_witness_server_address: str = ''
+        self._jsnark_witness_server_token_file: str = ''
+        self._proving_tmp_dir: str = ''
 
         self._opt_solc_optimizer_runs: int = 50
         self._opt_hash_threshold: int = 1
@@ -76,10 +80,35 @@ class UserConfig:
         self._data_dir: str = self._appdirs.user_data_dir
         self._log_dir: str = self._appdirs.user_log_dir
         self._use_circuit_cache_during_testing_with_encryption: bool = True
+        self._circuit_cache_dir: str = ''
+        self._circuit_cache_max_size_gb: float = 10.0
         self._verbosity: int = 1
 
         self._disable_verification: bool = False
 
+        self._ecdh_shared_key_cache_size: int = 1024
+        self._ecdh_persist_shared_keys: bool = False
+
+        self._paillier_randomness_pool_size: int = 0
+        self._paillier_randomness_pool_low_water: int = 8
+
+        self._elgamal_rerand_pool_size: int = 0
+        self._elgamal_rerand_pool_low_water: int = 8
+
+        self._persist_public_keys: bool = False
+
+        self._crypto_executor: str = 'inline'
+        self._crypto_executor_values = ['inline', 'process']
+        self._crypto_executor_workers: int = 0
+
+        self._proving_scheduler_max_jobs: int = 0
+        self._proving_scheduler_memory_gb: float = 0.0
+
+        self._keystore_backend: str = 'simple'
+        self._keystore_backend_values = ['simple', 'sharded']
+        self._keystore_shards: int = 16
+        self._keystore_key_pair_cache_size: int = 4096
+
     @property
     def proving_scheme(self) -> str:
         """
@@ -257,6 +286,69 @@ class UserConfig:
         _type_check(val, bool)
         self._libsnark_check_verify_locally_during_proof_generation = val
 
+    @property
+    def jsnark_witness_server(self) -> bool:
+        """
+        If true, circuits are evaluated (to compute the prover inputs) by a resident JVM, instead of starting a new JVM per proof.
+
+        The server keeps each circuit in memory after it was built for the first time.
+        It evaluates one circuit at a time, i.e. proofs which are generated in parallel wait for each other's circuit evaluation.
+        If the server cannot be started or reached, a new JVM is used per proof as usual.
+        """
+        return self._jsnark_witness_server
+
+    @jsnark_witness_server.setter
+    def jsnark_witness_server(self, val: bool):
+        _type_check(val, bool)
+        self._jsnark_witness_server = val
+
+    @property
+    def jsnark_witness_server_address(self) -> str:
+        """
+        Address (host:port) of the jsnark witness server to use if jsnark_witness_server is true.
+
+        If empty, each zkay process starts its own server on first use.
+        A shared server can be started with 'python -m zkay.jsnark_interface.witness_server'.
+        """
+        return self._jsnark_witness_server_address
+
+    @jsnark_witness_server_address.setter
+    def jsnark_witness_server_address(self, val: str):
+        _type_check(val, str)
+        self._jsnark_witness_server_address = val
+
+    @property
+    def jsnark_witness_server_token_file(self) -> str:
+        """
+        File which contains the authentication token of the shared jsnark witness server at jsnark_witness_server_address.
+
+        The file is written by the server on startup (--token-file) and must only be readable by its owner.
+        """
+        return self._jsnark_witness_server_token_file
+
+    @jsnark_witness_server_token_file.setter
+    def jsnark_witness_server_token_file(self, val: str):
+        _type_check(val, str)
+        self._jsnark_witness_server_token_file = val
+
+    @property
+    def proving_tmp_dir(self) -> str:
+        """
+        Directory in which the intermediate files of proof generations (witness, circuit inputs, proof) are stored.
+
+        A RAM-backed file system (e.g. /dev/shm) avoids disk i/o for large circuits.
+        If empty, the system default temporary directory is used.
+        """
+        return self._proving_tmp_dir
+
+    @proving_tmp_dir.setter
+    def proving_tmp_dir(self, val: str):
+        _type_check(val, str)
+        import os
+        if val and not os.path.isdir(val):
+            raise ValueError(f'{val} is not a directory')
+        self._proving_tmp_dir = val
+
     @property
     def opt_solc_optimizer_runs(self) -> int:
         """SOLC: optimize for how many times to run the code"""
@@ -372,6 +464,38 @@ class UserConfig:
         _type_check(val, bool)
         self._use_circuit_cache_during_testing_with_encryption = val
 
+    @property
+    def circuit_cache_dir(self) -> str:
+        """
+        Directory of a cache for compiled circuits and their keys, which is shared by all projects (if empty, no cache is used).
+
+        When a circuit is compiled (without importing keys), its files and keys are taken from the cache if an identical
+        circuit (same code, circuit builder and proving scheme) was compiled before, instead of compiling it and generating
+        new keys. Note that all projects which use a cached circuit thus share the same keys.
+        """
+        return self._circuit_cache_dir
+
+    @circuit_cache_dir.setter
+    def circuit_cache_dir(self, val: str):
+        _type_check(val, str)
+        self._circuit_cache_dir = val
+
+    @property
+    def circuit_cache_max_size_gb(self) -> float:
+        """
+        Maximum total size (in GB) of the circuit cache (if 0, no limit).
+
+        If the cache grows larger, the least recently used circuits are removed.
+        """
+        return self._circuit_cache_max_size_gb
+
+    @circuit_cache_max_size_gb.setter
+    def circuit_cache_max_size_gb(self, val: float):
+        _type_check(val, (int, float))
+        if val < 0:
+            raise ValueError(f'Invalid cache size {val}')
+        self._circuit_cache_max_size_gb = val
+
     @property
     def verbosity(self) -> int:
         """
@@ -398,3 +522,193 @@ class UserConfig:
     def disable_verification(self, val: bool):
         _type_check(val, bool)
         self._disable_verification = val
+
+    @property
+    def ecdh_shared_key_cache_size(self) -> int:
+        """
+        Maximum number of ECDH shared keys which are kept in memory per crypto backend (least recently used keys are evicted).
+
+        Repeated encryptions and decryptions between the same two parties then only require a single key agreement.
+        If 0, shared keys are not cached.
+        """
+        return self._ecdh_shared_key_cache_size
+
+    @ecdh_shared_key_cache_size.setter
+    def ecdh_shared_key_cache_size(self, val: int):
+        _type_check(val, int)
+        self._ecdh_shared_key_cache_size = val
+
+    @property
+    def ecdh_persist_shared_keys(self) -> bool:
+        """
+        If true, ECDH shared keys are also stored in data_dir, so that they survive across sessions.
+
+        The stored keys are encrypted with a key derived from the secret key of their owner.
+        """
+        return self._ecdh_persist_shared_keys
+
+    @ecdh_persist_shared_keys.setter
+    def ecdh_persist_shared_keys(self, val: bool):
+        _type_check(val, bool)
+        self._ecdh_persist_shared_keys = val
+
+    @property
+    def paillier_randomness_pool_size(self) -> int:
+        """
+        Number of precomputed (r, r^n mod n^2) pairs which are kept per Paillier target public key.
+
+        The pairs are computed by a background thread, which moves the expensive part of Paillier encryption off
+        the critical path. If 0, no randomness is precomputed.
+        """
+        return self._paillier_randomness_pool_size
+
+    @paillier_randomness_pool_size.setter
+    def paillier_randomness_pool_size(self, val: int):
+        _type_check(val, int)
+        self._paillier_randomness_pool_size = val
+
+    @property
+    def paillier_randomness_pool_low_water(self) -> int:
+        """The Paillier randomness pool of a public key is refilled once it contains fewer than this many pairs."""
+        return self._paillier_randomness_pool_low_water
+
+    @paillier_randomness_pool_low_water.setter
+    def paillier_randomness_pool_low_water(self, val: int):
+        _type_check(val, int)
+        self._paillier_randomness_pool_low_water = val
+
+    @property
+    def elgamal_rerand_pool_size(self) -> int:
+        """
+        Number of precomputed ElGamal encryptions of zero which are kept per target public key.
+
+        They are computed by a background thread, re-randomization then only requires a single ciphertext addition.
+        Each encryption of zero is used only once. If 0, no encryptions of zero are precomputed.
+        """
+        return self._elgamal_rerand_pool_size
+
+    @elgamal_rerand_pool_size.setter
+    def elgamal_rerand_pool_size(self, val: int):
+        _type_check(val, int)
+        self._elgamal_rerand_pool_size = val
+
+    @property
+    def elgamal_rerand_pool_low_water(self) -> int:
+        """The ElGamal re-randomization pool of a public key is refilled once it contains fewer than this many entries."""
+        return self._elgamal_rerand_pool_low_water
+
+    @elgamal_rerand_pool_low_water.setter
+    def elgamal_rerand_pool_low_water(self, val: int):
+        _type_check(val, int)
+        self._elgamal_rerand_pool_low_water = val
+
+    @property
+    def persist_public_keys(self) -> bool:
+        """
+        If true, public keys requested from the pki are also stored in data_dir, so that they survive across sessions.
+
+        There is one cache file per chain, pki contract and crypto backend. At the start of a session, cached keys of
+        addresses which announced a new key since they were cached are discarded.
+        """
+        return self._persist_public_keys
+
+    @persist_public_keys.setter
+    def persist_public_keys(self, val: bool):
+        _type_check(val, bool)
+        self._persist_public_keys = val
+
+    @property
+    def crypto_executor(self) -> str:
+        """
+        How the offchain simulator executes encryption, decryption and homomorphic operations.
+
+        inline: synchronously on the calling thread
+        process: in a pool of worker processes, so that multi-threaded applications can use all cores for crypto
+
+        Available Options: [inline, process]
+        """
+        return self._crypto_executor
+
+    @crypto_executor.setter
+    def crypto_executor(self, val: str):
+        _check_is_one_of(val, self._crypto_executor_values)
+        self._crypto_executor = val
+
+    @property
+    def crypto_executor_workers(self) -> int:
+        """Number of worker processes of the process crypto executor (if 0, one worker per cpu core is used)."""
+        return self._crypto_executor_workers
+
+    @crypto_executor_workers.setter
+    def crypto_executor_workers(self, val: int):
+        _type_check(val, int)
+        self._crypto_executor_workers = val
+
+    @property
+    def proving_scheduler_max_jobs(self) -> int:
+        """Maximum number of proofs which are generated in parallel by one zkay process (if 0, one per cpu core)."""
+        return self._proving_scheduler_max_jobs
+
+    @proving_scheduler_max_jobs.setter
+    def proving_scheduler_max_jobs(self, val: int):
+        _type_check(val, int)
+        self._proving_scheduler_max_jobs = val
+
+    @property
+    def proving_scheduler_memory_gb(self) -> float:
+        """
+        Memory (in GB) which the proofs that are generated in parallel by one zkay process may use in total.
+
+        Whether a proof fits is decided based on the estimated memory usage of its circuit.
+        If 0, the size of the physical memory is used (minus the memory of resident processes like the jsnark witness server).
+        """
+        return self._proving_scheduler_memory_gb
+
+    @proving_scheduler_memory_gb.setter
+    def proving_scheduler_memory_gb(self, val: float):
+        _type_check(val, (int, float))
+        if val < 0:
+            raise ValueError(f'Invalid memory budget {val}')
+        self._proving_scheduler_memory_gb = val
+
+    @property
+    def keystore_backend(self) -> str:
+        """
+        Keystore implementation which manages the key pairs of local accounts.
+
+        simple: all key pairs are kept in memory, they are loaded from the key files in data_dir on first use
+        sharded: thread-safe keystore for many accounts, key pairs are stored in one indexed database file per \
+                 crypto backend in data_dir and only the most recently used ones are kept in memory
+
+        Available Options: [simple, sharded]
+        """
+        return self._keystore_backend
+
+    @keystore_backend.setter
+    def keystore_backend(self, val: str):
+        _check_is_one_of(val, self._keystore_backend_values)
+        self._keystore_backend = val
+
+    @property
+    def keystore_shards(self) -> int:
+        """Number of independently locked shards of the in-memory maps of the sharded keystore."""
+        return self._keystore_shards
+
+    @keystore_shards.setter
+    def keystore_shards(self, val: int):
+        _type_check(val, int)
+        self._keystore_shards = val
+
+    @property
+    def keystore_key_pair_cache_size(self) -> int:
+        """
+        Maximum number of key pairs which the sharded keystore keeps in memory (per crypto backend).
+
+        Also bounds the process-wide cache of key pairs which are loaded for the other keystores.
+        """
+        return self._keystore_key_pair_cache_size
+
+    @keystore_key_pair_cache_size.setter
+    def keystore_key_pair_cache_size(self, val: int):
+        _type_check(val, int)
+        self._keystore_key_pair_cache_size = val
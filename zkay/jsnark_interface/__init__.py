@@ -6,4 +6,6 @@ Submodules
 ==========
 * :py:mod:`.jsnark_interface`: Jsnark circuit compilation and evaluation (preparation steps for key and proof generation).
 * :py:mod:`.libsnark_interface`: Libsnark key and proof generation.
+* :py:mod:`.crypto_worker`: Resident jsnark JVM process for ECDH key derivation and key agreement.
+* :py:mod:`.witness_server`: Resident jsnark JVM process which evaluates circuits for proof generation.
 """
\ No newline at end of file
@@ -0,0 +1,148 @@
+import atexit
+import subprocess
+import threading
+from typing import List, Optional
+
+from zkay.config import zk_print
+from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar, compile_helper_class
+
+_worker_class_name = 'ZkayCryptoWorker'
+
+_worker_class_str = '' + '''\
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.math.BigInteger;
+import zkay.ZkayECDHGenerator;
+
+public class {worker_class_name} {{
+    public static void main(String[] args) throws Exception {{
+        // Responses are written to the original stdout, any output of the circuit builder goes to stderr
+        PrintStream out = new PrintStream(new FileOutputStream(FileDescriptor.out), true);
+        System.setOut(System.err);
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+        String line;
+        while ((line = in.readLine()) != null) {{
+            String[] request = line.trim().split(" ");
+            try {{
+                out.println("ok " + handle(request));
+            }} catch (Exception e) {{
+                out.println("err " + e.toString().replace('\\n', ' '));
+            }}
+        }}
+    }}
+
+    private static String handle(String[] request) {{
+        switch (request[0]) {{
+            case "keypair": {{
+                // keypair <randomness>...: pk and sk for each randomness
+                StringBuilder keys = new StringBuilder();
+                for (int i = 1; i < request.length; i++) {{
+                    BigInteger secret = ZkayECDHGenerator.rnd_to_secret(request[i]);
+                    if (i > 1) keys.append(" ");
+                    keys.append(ZkayECDHGenerator.derivePk(secret)).append(" ").append(secret.toString(16));
+                }}
+                return keys.toString();
+            }}
+            case "ecdh": {{
+                // ecdh <my sk> <other pk>...: one shared secret per other pk
+                StringBuilder keys = new StringBuilder();
+                for (int i = 2; i < request.length; i++) {{
+                    if (i > 2) keys.append(" ");
+                    keys.append(ZkayECDHGenerator.getSharedSecret(new BigInteger(request[i], 16), new BigInteger(request[1], 16)));
+                }}
+                return keys.toString();
+            }}
+            default:
+                throw new IllegalArgumentException("Unknown request " + request[0]);
+        }}
+    }}
+}}
+'''
+"""Java code of the worker main class, it answers one request per line on stdin with one response line on stdout"""
+
+
+class JsnarkCryptoWorker:
+    """
+    Long-lived JVM process which performs crypto operations using the jsnark circuit builder classes.
+
+    Booting a JVM and loading the circuit builder jar takes much longer than the operations themselves.
+    The worker is therefore started on first use and reused for all subsequent requests of this python process.
+    If the worker process dies, it is restarted transparently on the next request.
+    """
+
+    def __init__(self):
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def request(self, *args: str) -> List[str]:
+        """
+        Send a request to the worker and wait for the response.
+
+        :param args: request name followed by its (hex string) arguments
+        :raise SubprocessError: if the worker cannot be started or the request fails
+        :return: the whitespace separated values of the response
+        """
+        req = ' '.join(args)
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    process = self._ensure_running()
+                    process.stdin.write(req + '\n')
+                    process.stdin.flush()
+                    response = process.stdout.readline()
+                except OSError:
+                    response = ''
+                if response:
+                    break
+
+                # Worker crashed, restart it once before giving up
+                self._stop()
+                if attempt > 0:
+                    raise subprocess.SubprocessError(f'Crypto worker died while processing request "{req}"')
+
+        status, _, result = response.rstrip('\n').partition(' ')
+        if status != 'ok':
+            raise subprocess.SubprocessError(f'Crypto worker request "{req}" failed:\n{result}')
+        return result.split()
+
+    def stop(self):
+        """Terminate the worker process (if running)."""
+        with self._lock:
+            self._stop()
+
+    def _ensure_running(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            class_dir = compile_helper_class(_worker_class_name, _worker_class_str.format(worker_class_name=_worker_class_name))
+            zk_print('Starting jsnark crypto worker...', verbosity_level=2)
+            self._process = subprocess.Popen(
+                ['java', '-Xmx16384m', '-cp', f'{circuit_builder_jar}:{class_dir}', _worker_class_name],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+        return self._process
+
+    def _stop(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+
+_worker: Optional[JsnarkCryptoWorker] = None
+_worker_lock = threading.Lock()
+
+
+def crypto_worker() -> JsnarkCryptoWorker:
+    """Return the crypto worker of this process (it is shut down automatically when the interpreter exits)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = JsnarkCryptoWorker()
+            atexit.register(_worker.stop)
+        return _worker
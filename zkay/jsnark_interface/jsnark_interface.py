@@ -1,5 +1,9 @@
+import hashlib
 import os
-from typing import List
+import shutil
+import struct
+import tempfile
+from typing import List, Optional
 
 from zkay.compiler.privacy.circuit_generation.circuit_helper import CircuitHelper
 from zkay.config import cfg
@@ -11,6 +15,30 @@ from zkay.zkay_ast.ast import indent
 circuit_builder_jar = os.path.join(os.path.dirname(os.path.realpath(__file__)),  'JsnarkCircuitBuilder.jar')
 circuit_builder_jar_hash = hash_file(circuit_builder_jar).hex()
 
+jvm_max_heap = 16 << 30
+"""Maximum heap size of the jvms which are started by zkay (in bytes)"""
+
+jvm_initial_heap = 4 << 30
+"""Heap which a jvm allocates on startup (in bytes, at most its maximum heap size)"""
+
+jvm_heap_base = 256 << 20
+"""Heap size of a jvm which evaluates a circuit, independent of the circuit size"""
+
+jvm_heap_per_constraint = 2 << 10
+"""Heap size of a jvm which evaluates a circuit per circuit constraint"""
+
+
+def get_jvm_heap_size(constraints: Optional[int]) -> int:
+    """Return the maximum heap size (in bytes) of a jvm which evaluates a circuit with this many constraints (None: unknown)."""
+    if constraints is None:
+        return jvm_max_heap
+    return min(jvm_heap_base + constraints * jvm_heap_per_constraint, jvm_max_heap)
+
+
+def get_jvm_heap_args(max_heap: int = jvm_max_heap) -> List[str]:
+    """Return the java arguments which limit the heap of a jvm to max_heap bytes."""
+    return [f'-Xms{min(jvm_initial_heap, max_heap) >> 20}m', f'-Xmx{max_heap >> 20}m']
+
 
 def compile_circuit(circuit_dir: str, javacode: str):
     """
@@ -33,23 +61,171 @@ def compile_and_run_with_circuit_builder(working_dir, class_name, java_file_name
     run_command(['javac', '-cp', f'{circuit_builder_jar}', java_file_name], cwd=working_dir)
     # Run jsnark to generate the circuit
     return run_command(
-        ['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}:{working_dir}', class_name, *args],
+        ['java', *get_jvm_heap_args(), '-cp', f'{circuit_builder_jar}:{working_dir}', class_name, *args],
         cwd=working_dir, allow_verbose=True)
 
 
-def prepare_proof(circuit_dir: str, output_dir: str, serialized_args: List[int]):
+def compile_helper_class(class_name: str, java_code: str, class_path: List[str] = ()) -> str:
+    """
+    Compile a java class which uses the circuit builder (once per circuit builder and class version).
+
+    :param class_name: name of the (public) class in java_code
+    :param java_code: java source code of the class
+    :param class_path: directories of other helper classes which the class uses (see return value)
+    :raise SubprocessError: if compilation fails
+    :return: the directory which contains the compiled class
+    """
+    worker_dir = os.path.join(cfg.data_dir, 'jsnark_worker')
+    class_hash = hashlib.sha256(':'.join([circuit_builder_jar_hash, *class_path, java_code]).encode('utf-8')).hexdigest()
+    class_dir = os.path.join(worker_dir, class_hash[:16])
+    if not os.path.exists(os.path.join(class_dir, f'{class_name}.class')):
+        os.makedirs(worker_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=worker_dir)
+        jfile = os.path.join(tmp_dir, f'{class_name}.java')
+        with open(jfile, 'w') as f:
+            f.write(java_code)
+        run_command(['javac', '-cp', ':'.join([circuit_builder_jar, *class_path]), jfile], cwd=tmp_dir)
+        try:
+            os.rename(tmp_dir, class_dir)
+        except OSError:
+            # Another process compiled the class concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return class_dir
+
+
+def compile_witness_prover() -> str:
+    """
+    Compile the java class which evaluates circuits on the arguments from a witness file.
+
+    :raise SubprocessError: if compilation fails
+    :return: the directory which contains the compiled class
+    """
+    return compile_helper_class(_prover_class_name, _prover_class_str)
+
+
+def write_witness(output_dir: str, serialized_args: List[int]) -> str:
+    """
+    Write the circuit arguments to a binary witness file in output_dir.
+
+    Format: number of values, followed by the length and the big-endian bytes of each value
+    (all lengths are 4 byte big-endian integers).
+
+    :return: path of the witness file
+    """
+    witness = bytearray(struct.pack('>I', len(serialized_args)))
+    for arg in serialized_args:
+        val = arg.to_bytes((arg.bit_length() + 7) // 8, byteorder='big')
+        witness += struct.pack('>I', len(val))
+        witness += val
+    witness_file = os.path.join(output_dir, 'witness.bin')
+    with open(witness_file, 'wb') as f:
+        f.write(witness)
+    return witness_file
+
+
+def prepare_proof(circuit_dir: str, output_dir: str, serialized_args: List[int], max_heap: int = jvm_max_heap):
     """
     Generate a libsnark circuit input file by evaluating the circuit in jsnark using the provided input values.
 
+    The arguments are passed to the jvm in a binary witness file (see write_witness), which is memory-mapped by
+    the jvm. This avoids command line length limits for circuits with many inputs.
+
     :param circuit_dir: directory where the compiled circuit is located
     :param output_dir: directory, where to store the jsnark output files
     :param serialized_args: public inputs, public outputs and private inputs in the order in which they are defined in the circuit
+    :param max_heap: maximum heap size of the jvm in bytes (see get_jvm_heap_size)
     :raise SubprocessError: if circuit evaluation fails
     """
-    serialized_arg_str = [format(arg, 'x') for arg in serialized_args]
+    witness_file = write_witness(output_dir, serialized_args)
+    class_dir = compile_witness_prover()
 
     # Run jsnark to evaluate the circuit and compute prover inputs
-    run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}:{circuit_dir}', cfg.jsnark_circuit_classname, 'prove', *serialized_arg_str], cwd=output_dir, allow_verbose=True)
+    run_command(['java', *get_jvm_heap_args(max_heap), '-cp', f'{circuit_builder_jar}:{circuit_dir}:{class_dir}', _prover_class_name,
+                 cfg.jsnark_circuit_classname, witness_file], cwd=output_dir, allow_verbose=True)
+
+
+_prover_class_name = 'ZkayWitnessProver'
+
+_prover_class_str = '' + '''\
+import java.io.IOException;
+import java.math.BigInteger;
+import java.nio.MappedByteBuffer;
+import java.nio.channels.FileChannel;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.nio.file.StandardOpenOption;
+import java.util.ArrayList;
+import java.util.List;
+import circuit.eval.CircuitEvaluator;
+import circuit.structure.CircuitGenerator;
+import circuit.structure.Wire;
+import zkay.ZkayCircuitBase;
+
+public class ZkayWitnessProver {
+    public static void main(String[] args) throws Exception {
+        // <circuit class name> <witness file>
+        ZkayCircuitBase circuit = (ZkayCircuitBase) Class.forName(args[0]).getDeclaredConstructor().newInstance();
+        // Builds the circuit and writes its circuit file (and a dummy input file, which is overwritten by prove)
+        circuit.run(new String[]{"compile"});
+        prove(circuit, readWitness(Paths.get(args[1])));
+    }
+
+    // Evaluate a compiled circuit on the given arguments and write its input file
+    public static void prove(CircuitGenerator circuit, BigInteger[] args) {
+        // The public inputs/outputs and the private inputs are the first wires which a zkay circuit creates. They are
+        // circuit inputs followed by prover witnesses, or only prover witnesses if the circuit uses input hashing.
+        List<Wire> argWires = new ArrayList<>(circuit.getInWires());
+        argWires.remove(circuit.getOneWire());
+        argWires.addAll(circuit.getProverWitnessWires());
+        if (args.length > argWires.size()) {
+            throw new IllegalArgumentException("Input count mismatch, expected at most " + argWires.size() + ", was " + args.length);
+        }
+
+        CircuitEvaluator evaluator = new CircuitEvaluator(circuit);
+        for (int i = 0; i < args.length; ++i) {
+            evaluator.setWireValue(argWires.get(i), args[i]);
+        }
+        evaluator.evaluate();
+        evaluator.writeInputFile();
+    }
+
+    // Witness file format: see jsnark_interface.write_witness
+    public static BigInteger[] readWitness(Path path) throws IOException {
+        try (FileChannel channel = FileChannel.open(path, StandardOpenOption.READ)) {
+            MappedByteBuffer buf = channel.map(FileChannel.MapMode.READ_ONLY, 0, channel.size());
+            BigInteger[] args = new BigInteger[buf.getInt()];
+            for (int i = 0; i < args.length; ++i) {
+                byte[] val = new byte[buf.getInt()];
+                buf.get(val);
+                args[i] = new BigInteger(1, val);
+            }
+            return args;
+        }
+    }
+}
+'''
+"""Java code of the main class which runs a circuit with the arguments from a witness file (also used by the witness server)"""
+
+
+def count_constraints(arith_file: str) -> int:
+    """
+    Return the number of r1cs constraints of a jsnark circuit file (as counted by jsnark, i.e. the number of
+    multiplication gates).
+
+    :param arith_file: path to a circuit.arith file
+    """
+    constraints = 0
+    with open(arith_file) as f:
+        for line in f:
+            op = line.split(' ', 1)[0]
+            if op in ('mul', 'assert', 'xor', 'or', 'pack'):
+                constraints += 1
+            elif op == 'zerop':
+                constraints += 2
+            elif op == 'split':
+                # split in 1 <x> out n <...>
+                constraints += int(line.split(' out ', 1)[1].split(' ', 1)[0]) + 1
+    return constraints
 
 
 _class_template_str = '' + '''\
@@ -0,0 +1,465 @@
+"""
+Resident JVM which evaluates compiled zkay circuits to compute the libsnark prover inputs.
+
+jsnark_interface.prepare_proof starts a new JVM for every proof, which loads the circuit builder jar and rebuilds the
+circuit before it can evaluate it. The witness server instead keeps each circuit in memory after it was built for the
+first time and answers evaluation requests over a local TCP socket.
+
+Clients must authenticate with a secret token at the start of each connection, and the server only loads circuits
+from the output directories of allowed projects. Otherwise, any local user could make the server run arbitrary code.
+
+A server which is shared by multiple zkay processes of the same user can be started with::
+
+    python -m zkay.jsnark_interface.witness_server --token-file FILE [--port PORT] [--preload] PROJECT_DIR ...
+
+and selected with cfg.jsnark_witness_server_address and cfg.jsnark_witness_server_token_file.
+It only evaluates circuits of the given projects. Otherwise, every process starts its own private server on first use,
+which accepts the projects of the process that started it.
+
+A server evaluates one circuit at a time, concurrent requests (also from different clients) are queued. Only the
+libsnark part of concurrent proof generations runs in parallel then, cfg.jsnark_witness_server should be disabled if
+circuit evaluation dominates the proving time.
+"""
+
+import argparse
+import atexit
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional, Set, Tuple
+
+from zkay.config import cfg, zk_print
+from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar, compile_helper_class, compile_witness_prover, \
+    get_jvm_heap_args, write_witness
+
+_server_class_name = 'ZkayWitnessServer'
+
+_server_class_str = '' + '''\
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStreamWriter;
+import java.io.PrintStream;
+import java.io.PrintWriter;
+import java.math.BigInteger;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.file.DirectoryStream;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.nio.file.StandardCopyOption;
+import java.security.MessageDigest;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import circuit.structure.CircuitGenerator;
+import zkay.ZkayCircuitBase;
+
+public class {server_class_name} {{
+    private static class LoadedCircuit {{
+        final long classTimestamp;
+        final CircuitGenerator generator;
+
+        LoadedCircuit(long classTimestamp, CircuitGenerator generator) {{
+            this.classTimestamp = classTimestamp;
+            this.generator = generator;
+        }}
+    }}
+
+    private static final Map<Path, LoadedCircuit> circuits = new HashMap<>();
+
+    // Circuits are only loaded from subdirectories of these project directories
+    private static final Set<Path> projectDirs = new HashSet<>();
+
+    // If the server was started without project directories, its owner adds them with "allow" requests
+    private static boolean allowRequests;
+
+    private static byte[] token;
+
+    // jsnark writes its output files into the working directory of the jvm
+    private static final Path workDir = Paths.get("").toAbsolutePath();
+
+    // Circuits are built and evaluated one at a time on a single thread: jsnark keeps the active circuit generator per
+    // thread, and all circuits write their output files into workDir
+    private static final ExecutorService evaluator = Executors.newSingleThreadExecutor();
+
+    public static void main(String[] args) throws Exception {{
+        // The port is written to the original stdout, any output of the circuit builder goes to stderr
+        PrintStream out = new PrintStream(new FileOutputStream(FileDescriptor.out), true);
+        System.setOut(System.err);
+
+        // The token is passed on stdin, such that other users cannot see it in the process list
+        token = new BufferedReader(new InputStreamReader(System.in, "UTF-8")).readLine().getBytes("UTF-8");
+        for (int i = 1; i < args.length; ++i) {{
+            projectDirs.add(Paths.get(args[i]).toRealPath());
+        }}
+        allowRequests = projectDirs.isEmpty();
+
+        ServerSocket server = new ServerSocket(Integer.parseInt(args[0]), 50, InetAddress.getLoopbackAddress());
+        out.println(server.getLocalPort());
+        while (true) {{
+            Socket socket = server.accept();
+            Thread t = new Thread(() -> serve(socket));
+            t.setDaemon(true);
+            t.start();
+        }}
+    }}
+
+    private static void serve(Socket socket) {{
+        try (Socket s = socket;
+             BufferedReader in = new BufferedReader(new InputStreamReader(s.getInputStream(), "UTF-8"));
+             PrintWriter out = new PrintWriter(new OutputStreamWriter(s.getOutputStream(), "UTF-8"), true)) {{
+            // auth <token>
+            String line = in.readLine();
+            if (line == null || !line.startsWith("auth\\t") || !MessageDigest.isEqual(token, line.substring(5).getBytes("UTF-8"))) {{
+                out.println("err authentication failed");
+                return;
+            }}
+            out.println("ok ");
+
+            while ((line = in.readLine()) != null) {{
+                String[] request = line.split("\\t");
+                try {{
+                    out.println("ok " + evaluator.submit(() -> handle(request)).get());
+                }} catch (ExecutionException e) {{
+                    out.println("err " + String.valueOf(e.getCause()).replace('\\n', ' '));
+                }} catch (InterruptedException e) {{
+                    out.println("err interrupted");
+                }}
+            }}
+        }} catch (IOException e) {{
+            // Client disconnected
+        }}
+    }}
+
+    private static String handle(String[] request) throws Exception {{
+        switch (request[0]) {{
+            case "ping":
+                return "pong";
+            case "allow":
+                // allow <project dir>
+                if (!allowRequests) {{
+                    throw new SecurityException("The project directories of this server are fixed");
+                }}
+                projectDirs.add(Paths.get(request[1]).toRealPath());
+                return "";
+            case "load":
+                // load <class name> <circuit dir>
+                getCircuit(request[1], Paths.get(request[2]));
+                return "";
+            case "prove":
+                // prove <class name> <circuit dir> <output dir> <hex args>...
+                return prove(request[1], Paths.get(request[2]), Paths.get(request[3]),
+                             Arrays.stream(request, 4, request.length).map(arg -> new BigInteger(arg, 16)).toArray(BigInteger[]::new));
+            case "prove-file":
+                // prove-file <class name> <circuit dir> <output dir> <witness file>
+                return prove(request[1], Paths.get(request[2]), Paths.get(request[3]), ZkayWitnessProver.readWitness(Paths.get(request[4])));
+            default:
+                throw new IllegalArgumentException("Unknown request " + request[0]);
+        }}
+    }}
+
+    private static String prove(String className, Path circuitDir, Path outputDir, BigInteger[] args) throws Exception {{
+        CircuitGenerator circuit = getCircuit(className, circuitDir);
+        circuit.writeCircuitFile();
+        ZkayWitnessProver.prove(circuit, args);
+        moveOutputFiles(outputDir);
+        return "";
+    }}
+
+    private static CircuitGenerator getCircuit(String className, Path circuitDir) throws Exception {{
+        circuitDir = circuitDir.toRealPath();
+        if (!projectDirs.contains(circuitDir.getParent())) {{
+            throw new SecurityException("Circuit directory " + circuitDir + " is not in an allowed project directory");
+        }}
+        long timestamp = Files.getLastModifiedTime(circuitDir.resolve(className + ".class")).toMillis();
+        LoadedCircuit loaded = circuits.get(circuitDir);
+        if (loaded == null || loaded.classTimestamp != timestamp) {{
+            // (Re-)build the circuit, this is what "prove" does on every invocation of the circuit class
+            URLClassLoader loader = new URLClassLoader(new URL[]{{circuitDir.toUri().toURL()}}, {server_class_name}.class.getClassLoader());
+            ZkayCircuitBase generator = (ZkayCircuitBase) loader.loadClass(className).getDeclaredConstructor().newInstance();
+            generator.run(new String[]{{"compile"}});
+            // Output files are written again for each proof
+            moveOutputFiles(null);
+            loaded = new LoadedCircuit(timestamp, generator);
+            circuits.put(circuitDir, loaded);
+        }}
+        return loaded.generator;
+    }}
+
+    private static void moveOutputFiles(Path outputDir) throws IOException {{
+        try (DirectoryStream<Path> files = Files.newDirectoryStream(workDir)) {{
+            for (Path f : files) {{
+                if (outputDir == null) {{
+                    Files.delete(f);
+                }} else {{
+                    Files.move(f, outputDir.resolve(f.getFileName()), StandardCopyOption.REPLACE_EXISTING);
+                }}
+            }}
+        }}
+    }}
+}}
+'''
+"""Java code of the server main class, it answers one request (tab separated line) per line with one response line"""
+
+
+class WitnessServerUnavailable(Exception):
+    """The witness server could not be started or reached."""
+    pass
+
+
+class JsnarkWitnessServer:
+    """
+    Client of a jsnark witness server.
+
+    If address is None, a private server process is started on first use (and restarted if it dies).
+    The projects of all circuits which are evaluated by this client are then allowed in the private server.
+    Otherwise, token_file is the file which contains the authentication token of the server at address.
+    """
+
+    def __init__(self, address: Optional[Tuple[str, int]] = None, token_file: Optional[str] = None):
+        self._address = address
+        self._token_file = token_file
+        self._process: Optional[subprocess.Popen] = None
+        self._work_dir: Optional[str] = None
+        self._port = 0
+        self._token = ''
+        self._project_dirs: Set[str] = set()
+        self._socket: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def prepare_proof(self, circuit_dir: str, output_dir: str, serialized_args: List[int]):
+        """
+        Same as jsnark_interface.prepare_proof, but using the witness server.
+
+        :raise WitnessServerUnavailable: if the server cannot be reached
+        :raise SubprocessError: if circuit evaluation fails
+        """
+        witness_file = write_witness(output_dir, serialized_args)
+        self._allow_project(circuit_dir)
+        self.request('prove-file', cfg.jsnark_circuit_classname, os.path.abspath(circuit_dir), os.path.abspath(output_dir),
+                     os.path.abspath(witness_file))
+
+    def preload(self, project_dir: str):
+        """Build the circuits of all verification contracts in project_dir in the server."""
+        for circuit_dir in get_circuit_dirs(project_dir):
+            self._allow_project(circuit_dir)
+            self.request('load', cfg.jsnark_circuit_classname, os.path.abspath(circuit_dir))
+
+    def is_available(self) -> bool:
+        try:
+            return self.request('ping') == 'pong'
+        except (WitnessServerUnavailable, subprocess.SubprocessError):
+            return False
+
+    def request(self, *args: str) -> str:
+        """
+        Send a request to the server and wait for the response.
+
+        :raise WitnessServerUnavailable: if the server cannot be reached
+        :raise SubprocessError: if the request fails
+        :return: the response
+        """
+        req = '\t'.join(args)
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    self._connect()
+                    response = self._send(req)
+                except OSError:
+                    response = ''
+                if response:
+                    break
+
+                # Connection lost (or server crashed), reconnect once before giving up
+                self._disconnect()
+                if attempt > 0:
+                    raise WitnessServerUnavailable(f'Connection to jsnark witness server lost while processing request "{args[0]}"')
+
+        status, _, result = response.rstrip('\n').partition(' ')
+        if status != 'ok':
+            raise subprocess.SubprocessError(f'Witness server request "{args[0]}" failed:\n{result}')
+        return result
+
+    def _allow_project(self, circuit_dir: str):
+        """Allow the project of circuit_dir in the private server (the projects of a shared server are fixed)."""
+        project_dir = os.path.dirname(os.path.abspath(circuit_dir))
+        if self._address is None and project_dir not in self._project_dirs:
+            self._project_dirs.add(project_dir)
+            self.request('allow', project_dir)
+
+    def stop(self):
+        """Disconnect from the server and terminate it (if it was started by this client)."""
+        with self._lock:
+            self._disconnect()
+            if self._process is not None:
+                self._process.terminate()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+                    self._process.wait()
+                self._process = None
+            if self._work_dir is not None:
+                shutil.rmtree(self._work_dir, ignore_errors=True)
+                self._work_dir = None
+
+    def _send(self, req: str) -> str:
+        self._socket.sendall((req + '\n').encode('utf-8'))
+        return self._reader.readline().decode('utf-8')
+
+    def _connect(self):
+        if self._socket is not None:
+            return
+        address = self._address if self._address is not None else self._ensure_running()
+        token = self._read_token() if self._address is not None else self._token
+        try:
+            self._socket = socket.create_connection(address)
+        except OSError as e:
+            raise WitnessServerUnavailable(f'Cannot connect to jsnark witness server at {address[0]}:{address[1]} ({e})')
+        self._reader = self._socket.makefile('rb')
+
+        if not self._send(f'auth\t{token}').startswith('ok'):
+            self._disconnect()
+            raise WitnessServerUnavailable(f'Authentication at jsnark witness server at {address[0]}:{address[1]} failed')
+        if self._address is None:
+            # Projects which were allowed in a previous (crashed) server process
+            for project_dir in sorted(self._project_dirs):
+                self._send(f'allow\t{project_dir}')
+
+    def _read_token(self) -> str:
+        if not self._token_file:
+            raise WitnessServerUnavailable('No token file configured for the jsnark witness server')
+        try:
+            with open(self._token_file) as f:
+                return f.read().strip()
+        except OSError as e:
+            raise WitnessServerUnavailable(f'Cannot read jsnark witness server token ({e})')
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+            self._socket, self._reader = None, None
+
+    def _ensure_running(self) -> Tuple[str, int]:
+        if self._process is None or self._process.poll() is not None:
+            if self._work_dir is not None:
+                shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._token = secrets.token_hex(32)
+            self._process, self._work_dir, self._port = start_server(0, self._token)
+        return '127.0.0.1', self._port
+
+
+def start_server(port: int, token: str, project_dirs: List[str] = ()) -> Tuple[subprocess.Popen, str, int]:
+    """
+    Start a witness server process which listens on port (0: any free port).
+
+    :param token: secret with which clients have to authenticate
+    :param project_dirs: projects whose circuits the server evaluates (if empty, they are allowed by the clients)
+    :raise WitnessServerUnavailable: if the server cannot be started
+    :return: (server process, working directory of the server, port)
+    """
+    try:
+        prover_class_dir = compile_witness_prover()
+        class_dir = compile_helper_class(_server_class_name, _server_class_str.format(server_class_name=_server_class_name),
+                                         [prover_class_dir])
+        # Same file system as the proof directories, such that output files can be moved cheaply
+        work_dir = tempfile.mkdtemp(prefix='zkay_witness_server_', dir=cfg.proving_tmp_dir or None)
+        zk_print('Starting jsnark witness server...', verbosity_level=2)
+        process = subprocess.Popen(
+            ['java', *get_jvm_heap_args(), '-cp', f'{circuit_builder_jar}:{prover_class_dir}:{class_dir}', _server_class_name, str(port),
+             *[os.path.abspath(d) for d in project_dirs]],
+            cwd=work_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+        process.stdin.write(token + '\n')
+        process.stdin.close()
+    except (OSError, subprocess.SubprocessError) as e:
+        raise WitnessServerUnavailable(f'Cannot start jsnark witness server ({e})')
+
+    port_line = process.stdout.readline()
+    if not port_line.strip().isdigit():
+        process.kill()
+        process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise WitnessServerUnavailable('jsnark witness server failed to start')
+    return process, work_dir, int(port_line)
+
+
+def write_token_file(filename: str) -> str:
+    """Write a new random authentication token to filename (only readable by the current user) and return it."""
+    token = secrets.token_hex(32)
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        # Permissions of a pre-existing file are not changed by os.open
+        os.fchmod(f.fileno(), 0o600)
+        f.write(token + '\n')
+    return token
+
+
+def get_circuit_dirs(project_dir: str) -> List[str]:
+    """Return the output directories of all compiled circuits in project_dir."""
+    return sorted(os.path.join(project_dir, d) for d in os.listdir(project_dir)
+                  if os.path.isfile(os.path.join(project_dir, d, f'{cfg.jsnark_circuit_classname}.class')))
+
+
+_server: Optional[JsnarkWitnessServer] = None
+_server_lock = threading.Lock()
+
+
+def witness_server() -> JsnarkWitnessServer:
+    """Return the witness server client of this process (see cfg.jsnark_witness_server_address)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            address = None
+            if cfg.jsnark_witness_server_address:
+                host, _, port = cfg.jsnark_witness_server_address.rpartition(':')
+                address = (host, int(port))
+            _server = JsnarkWitnessServer(address, cfg.jsnark_witness_server_token_file)
+            atexit.register(_server.stop)
+        return _server
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Run a jsnark witness server which can be shared by zkay processes.')
+    parser.add_argument('project_dirs', metavar='PROJECT_DIR', nargs='+', help='Compiled zkay project whose circuits the server evaluates')
+    parser.add_argument('--token-file', required=True,
+                        help='File to which the authentication token is written (see cfg.jsnark_witness_server_token_file)')
+    parser.add_argument('--port', type=int, default=0, help='Port to listen on (localhost only, default: any free port)')
+    parser.add_argument('--preload', action='store_true', help='Build the circuits of all projects on startup')
+    a = parser.parse_args(args)
+
+    process, work_dir, port = start_server(a.port, write_token_file(a.token_file), a.project_dirs)
+    try:
+        client = JsnarkWitnessServer(('127.0.0.1', port), a.token_file)
+        if a.preload:
+            for project_dir in a.project_dirs:
+                client.preload(project_dir)
+        client.stop()
+        print(f'jsnark witness server listening on 127.0.0.1:{port}', flush=True)
+        process.wait()
+    except KeyboardInterrupt:
+        process.terminate()
+        process.wait()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from zkay.compiler.privacy.circuit_generation.backends import jsnark_generator
+from zkay.compiler.privacy.circuit_generation.backends.jsnark_generator import JsnarkGenerator
+from zkay.compiler.privacy.circuit_generation.circuit_cache import CircuitCache, unlink_shared_files
+from zkay.tests.zkay_unit_test import ZkayTestCase
+
+
+class TestCircuitCache(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def _circuit_dir(self, name: str, files: dict) -> str:
+        d = os.path.join(self.tmp_dir.name, name)
+        os.makedirs(d)
+        for filename, content in files.items():
+            with open(os.path.join(d, filename), 'w') as f:
+                f.write(content)
+        return d
+
+    def test_store_and_restore(self):
+        cache = CircuitCache(self.cache_dir)
+        src = self._circuit_dir('src', {'circuit.arith': 'total 1', 'proving.key': 'pk'})
+        cache.store('abc', src, ['circuit.arith', 'proving.key'])
+        self.assertTrue(cache.contains('abc'))
+
+        dst = self._circuit_dir('dst', {'circuit.arith': 'old'})
+        self.assertTrue(cache.restore('abc', dst))
+        self.assertFalse(cache.restore('other', dst))
+        for filename, content in [('circuit.arith', 'total 1'), ('proving.key', 'pk')]:
+            with open(os.path.join(dst, filename)) as f:
+                self.assertEqual(f.read(), content)
+
+        # Restored files are shared with the cache, they must be removed before they are rewritten
+        unlink_shared_files(dst, exclude=['proving.key'])
+        self.assertEqual(os.listdir(dst), ['proving.key'])
+        with open(os.path.join(self.cache_dir, 'abc', 'circuit.arith')) as f:
+            self.assertEqual(f.read(), 'total 1')
+
+    def test_lru_eviction(self):
+        cache = CircuitCache(self.cache_dir, max_size=10)
+        for digest in ['a', 'b']:
+            cache.store(digest, self._circuit_dir(digest, {'proving.key': '1234'}), ['proving.key'])
+            time.sleep(0.01)
+        self.assertTrue(cache.restore('a', self._circuit_dir('out', {})))
+        time.sleep(0.01)
+
+        # 'b' is the least recently used entry
+        cache.store('c', self._circuit_dir('c', {'proving.key': '1234'}), ['proving.key'])
+        self.assertEqual(sorted(cache.entries()), ['a', 'c'])
+
+        # An entry which is larger than the cache is kept until the next entry is added
+        cache.store('d', self._circuit_dir('d', {'proving.key': 'x' * 20}), ['proving.key'])
+        self.assertEqual(cache.entries(), ['d'])
+
+    def test_keygen_does_not_modify_cached_keys(self):
+        cache = CircuitCache(self.cache_dir)
+        cache.store('abc', self._circuit_dir('src', {'proving.key': 'pk', 'verification.key': 'vk'}), ['proving.key', 'verification.key'])
+
+        # Circuit was restored from the cache, but one of its keys is missing afterwards
+        output_dir = self._circuit_dir('C_out', {})
+        cache.restore('abc', output_dir)
+        os.remove(os.path.join(output_dir, 'verification.key'))
+
+        def generate_keys(input_dir, output_dir, proving_scheme):
+            for filename in JsnarkGenerator.get_vk_and_pk_filenames():
+                with open(os.path.join(output_dir, filename), 'w') as f:
+                    f.write('new')
+
+        circuit = mock.Mock(**{'get_verification_contract_name.return_value': 'C'})
+        generator = JsnarkGenerator([], mock.Mock(), self.tmp_dir.name)
+        with mock.patch.object(jsnark_generator.libsnark, 'generate_keys', generate_keys):
+            generator._generate_keys(circuit)
+
+        with open(os.path.join(output_dir, 'proving.key')) as f:
+            self.assertEqual(f.read(), 'new')
+        with open(os.path.join(self.cache_dir, 'abc', 'proving.key')) as f:
+            self.assertEqual(f.read(), 'pk')
@@ -0,0 +1,105 @@
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from subprocess import SubprocessError
+
+from zkay.config import cfg
+from zkay.jsnark_interface.witness_server import JsnarkWitnessServer, WitnessServerUnavailable, get_circuit_dirs, \
+    write_token_file
+from zkay.tests.zkay_unit_test import ZkayTestCase
+
+
+class _FakeServerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if self.rfile.readline().decode('utf-8') != f'auth\t{self.server.token}\n':
+            self.wfile.write(b'err authentication failed\n')
+            return
+        self.wfile.write(b'ok \n')
+
+        for line in self.rfile:
+            request = line.decode('utf-8').rstrip('\n').split('\t')
+            self.server.requests.append(request)
+            if request[0] == 'ping':
+                self.wfile.write(b'ok pong\n')
+            elif request[0] in ['prove', 'prove-file', 'allow']:
+                self.wfile.write(b'ok \n')
+            else:
+                self.wfile.write(b'err java.lang.IllegalArgumentException: Unknown request\n')
+
+
+class TestWitnessServerClient(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp_dir.name, 'token')
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _FakeServerHandler)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.token = write_token_file(self.token_file)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = JsnarkWitnessServer(self.server.server_address, self.token_file)
+
+    def tearDown(self) -> None:
+        self.client.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def test_prepare_proof(self):
+        self.assertTrue(self.client.is_available())
+        with tempfile.TemporaryDirectory() as out_dir:
+            self.client.prepare_proof('circuit_dir', out_dir, [1, 255, 4096])
+            witness_file = os.path.join(out_dir, 'witness.bin')
+            self.assertEqual(self.server.requests[-1], ['prove-file', cfg.jsnark_circuit_classname, os.path.abspath('circuit_dir'),
+                                                        out_dir, witness_file])
+            with open(witness_file, 'rb') as f:
+                self.assertEqual(f.read(), bytes.fromhex('00000003' '00000001' '01' '00000001' 'ff' '00000002' '1000'))
+
+    def test_authentication(self):
+        self.assertEqual(os.stat(self.token_file).st_mode & 0o777, 0o600)
+        with open(self.token_file, 'w') as f:
+            f.write('wrong')
+        self.assertFalse(self.client.is_available())
+        self.assertFalse(JsnarkWitnessServer(self.server.server_address).is_available())
+        self.assertEqual(self.server.requests, [])
+
+    def test_private_server_projects(self):
+        # The client allows the projects of the evaluated circuits in its private server, also after a reconnect
+        client = JsnarkWitnessServer()
+        client._token = self.server.token
+        client._ensure_running = lambda: self.server.server_address
+        try:
+            with tempfile.TemporaryDirectory() as out_dir:
+                client.prepare_proof(os.path.join('project', 'a_out'), out_dir, [1])
+                client._disconnect()
+                client.prepare_proof(os.path.join('project', 'b_out'), out_dir, [1])
+        finally:
+            client.stop()
+        self.assertEqual([r[:2] for r in self.server.requests], [['allow', os.path.abspath('project')]] * 2 +
+                         [['prove-file', cfg.jsnark_circuit_classname], ['allow', os.path.abspath('project')],
+                          ['prove-file', cfg.jsnark_circuit_classname]])
+
+    def test_failed_request(self):
+        with self.assertRaises(SubprocessError):
+            self.client.request('invalid')
+
+    def test_unreachable(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            address = s.getsockname()
+        client = JsnarkWitnessServer(address, self.token_file)
+        self.assertFalse(client.is_available())
+        with self.assertRaises(WitnessServerUnavailable), tempfile.TemporaryDirectory() as out_dir:
+            client.prepare_proof('circuit_dir', out_dir, [1])
+
+    def test_circuit_dirs(self):
+        with tempfile.TemporaryDirectory() as project_dir:
+            for d in ['b_out', 'a_out', 'other']:
+                os.makedirs(os.path.join(project_dir, d))
+            for d in ['b_out', 'a_out']:
+                open(os.path.join(project_dir, d, f'{cfg.jsnark_circuit_classname}.class'), 'w').close()
+            self.assertEqual(get_circuit_dirs(project_dir), [os.path.join(project_dir, 'a_out'), os.path.join(project_dir, 'b_out')])
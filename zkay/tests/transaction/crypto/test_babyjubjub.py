@@ -0,0 +1,45 @@
+from random import Random
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.babyjubjub import BABYJUBJUB_A, BABYJUBJUB_D, CURVE_ORDER, ExtendedPoint, Fq, Fr, \
+    Point, fixed_base_table
+
+
+def affine_add(p: Point, a: Point) -> Point:
+    u3 = (p.u * a.v + p.v * a.u) / (Fq.ONE + BABYJUBJUB_D * p.u * a.u * p.v * a.v)
+    v3 = (p.v * a.v - BABYJUBJUB_A * p.u * a.u) / (Fq.ONE - BABYJUBJUB_D * p.u * a.u * p.v * a.v)
+    return Point(u3, v3)
+
+
+def affine_mul(p: Point, s: Fr) -> Point:
+    ret = Point.ZERO
+    for c in format(s.s, '0256b'):
+        ret = affine_add(ret, ret)
+        if int(c):
+            ret = affine_add(ret, p)
+    return ret
+
+
+class TestBabyJubJub(ZkayTestCase):
+    rnd = Random(42)
+
+    def test_add(self):
+        p = affine_mul(Point.GENERATOR, Fr(self.rnd.randrange(CURVE_ORDER)))
+        self.assertEqual(p + Point.GENERATOR, affine_add(p, Point.GENERATOR))
+        self.assertEqual(p.double(), affine_add(p, p))
+        self.assertEqual(p + p.negate(), Point.ZERO)
+        self.assertEqual(p + Point.ZERO, p)
+
+    def test_mul(self):
+        p = affine_mul(Point.GENERATOR, Fr(self.rnd.randrange(CURVE_ORDER)))
+        for s in [0, 1, 2, 15, 16, CURVE_ORDER - 1] + [self.rnd.randrange(CURVE_ORDER) for _ in range(5)]:
+            expected = affine_mul(p, Fr(s))
+            self.assertEqual(p * Fr(s), expected)
+            self.assertEqual(p.mul_fixed_base(Fr(s)), expected)
+
+    def test_fixed_base_table_cached(self):
+        self.assertIs(fixed_base_table(Point.GENERATOR), fixed_base_table(Point(Fq(Point.GENERATOR.u.s), Point.GENERATOR.v)))
+
+    def test_batch_to_affine(self):
+        points = [ExtendedPoint.from_affine(Point.GENERATOR).mul(s) for s in range(5)]
+        self.assertEqual(ExtendedPoint.batch_to_affine(points), [p.to_affine() for p in points])
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.dummy import DummyCrypto
+from zkay.transaction.crypto.ecdh_aes import EcdhAesCrypto
+from zkay.transaction.crypto.elgamal import ElgamalCrypto
+from zkay.transaction.crypto.paillier import PaillierCrypto
+from zkay.transaction.interface import PlaintextRangeError
+from zkay.transaction.keystore.simple import SimpleKeystore
+from zkay.transaction.types import AddressValue, CipherValue
+
+
+class TestBatchCrypto(ZkayTestCase):
+
+    def test_default_enc_dec_many(self):
+        keystore = SimpleKeystore(None, DummyCrypto.params)
+        crypto = DummyCrypto(keystore)
+        me, other = AddressValue(1), AddressValue(2)
+        for address in [me, other]:
+            key_pair = crypto._generate_or_load_key_pair(address.val.hex())
+            keystore.local_key_pairs[address] = key_pair
+            keystore.local_pk_store[address] = key_pair.pk
+
+        results = crypto.enc_many([1, 2, 3], me, [me, other, me])
+        self.assertEqual([cipher for cipher, _ in results], [crypto.enc(plain, me, target)[0] for plain, target in [(1, me), (2, other), (3, me)]])
+
+        ciphers = [results[0][0], CipherValue(params=crypto.params), results[2][0]]
+        self.assertEqual([plain for plain, _ in crypto.dec_many(ciphers, me)], [1, 0, 3])
+        self.assertEqual(crypto.enc_many([], me, []), [])
+        self.assertEqual(crypto.dec_many([], me), [])
+
+    def test_paillier_dec_many_raw(self):
+        p, q = PaillierCrypto.generate_primes(PaillierCrypto.params.key_bits)
+        pc = PaillierCrypto(None)
+        sk = pc.serialize_pk(p, pc.params.key_bytes) + pc.serialize_pk(q, pc.params.key_bytes)
+        plains = [0, 1, 42, -42]
+        raw = pc.enc_many_raw(plains, None, [p * q] * len(plains))
+        self.assertEqual(pc.dec_many_raw([cipher for cipher, _ in raw], sk), [(plain, rnd) for plain, (_, rnd) in zip(plains, raw)])
+
+    def test_elgamal_enc_dec_many_raw(self):
+        eg = ElgamalCrypto(None)
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        sk = 448344687855328518203304384067387474955750326758815542295083498526674852893
+        pk_int = eg.deserialize_pk(pk)
+
+        plains = [0, 1, 42, 255, 1000]
+        raw = eg.enc_many_raw(plains, None, [pk_int] * len(plains))
+        for plain, (cipher, rnd) in zip(plains, raw):
+            self.assertEqual(cipher, eg._enc_with_rand(plain, rnd[0], pk))
+
+        ciphers = [cipher for cipher, _ in raw]
+        self.assertEqual([plain for plain, _ in eg.dec_many_raw(ciphers, sk)], plains)
+        self.assertEqual([plain for plain, _ in eg.dec_many_raw(ciphers, sk, 16)], plains)
+        # Values outside of the expected range are reported with their correct plain text
+        with self.assertRaises(PlaintextRangeError) as ctx:
+            eg.dec_many_raw(ciphers, sk, 8)
+        self.assertEqual(ctx.exception.plain, 1000)
+
+    def test_ecdh_shared_keys_batched(self):
+        worker = mock.Mock()
+        worker.request.side_effect = lambda name, sk, *pks: [f'{int(pk, 16) + 1:x}' for pk in pks]
+        crypto = EcdhAesCrypto(None)
+        with mock.patch('zkay.transaction.crypto.ecdh_base.crypto_worker', return_value=worker):
+            raw = crypto.enc_many_raw([1, 2, 3, 4], 5, [10, 11, 10, 12])
+            self.assertEqual(worker.request.call_count, 1)
+            self.assertEqual(worker.request.call_args[0], ('ecdh', '5', 'a', 'b', 'c'))
+
+            # The sender public key is appended to the cipher text
+            ciphers = [tuple(cipher) + (pk,) for (cipher, _), pk in zip(raw, [10, 11, 10, 12])]
+            self.assertEqual([plain for plain, _ in crypto.dec_many_raw(ciphers, 5)], [1, 2, 3, 4])
+            self.assertEqual(worker.request.call_count, 1)
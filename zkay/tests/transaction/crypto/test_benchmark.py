@@ -0,0 +1,39 @@
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import benchmark
+from zkay.transaction.crypto.meta import cryptoparams
+from zkay.transaction.crypto.params import CryptoParams
+
+
+class TestCryptoBenchmark(ZkayTestCase):
+
+    def test_benchmark_backend(self):
+        results = benchmark.run_benchmarks(['dummy', 'dummy-hom'], runs=3, keygen_runs=1)['results']
+        self.assertEqual(set(results['dummy']['248']), {'keygen', 'key_load', 'enc', 'dec', 'dec_32bit'})
+        self.assertIn('rerand', results['dummy-hom']['248'])
+        for stats in results['dummy-hom']['248'].values():
+            self.assertLessEqual(stats['min'], stats['p50'])
+            self.assertLessEqual(stats['p50'], stats['p99'])
+            self.assertLessEqual(stats['p99'], stats['max'])
+
+    def test_key_size_restored(self):
+        old = dict(cryptoparams['paillier'])
+        with benchmark._key_size('paillier', 1024):
+            self.assertEqual(CryptoParams('paillier').key_bits, 1024)
+            self.assertEqual(CryptoParams('paillier').cipher_bytes_payload, 256)
+        self.assertEqual(cryptoparams['paillier'], old)
+
+    def test_percentiles(self):
+        stats = benchmark._stats([i / 1000 for i in range(1, 101)])
+        self.assertEqual((stats['p50'], stats['p90'], stats['p99']), (50, 90, 99))
+
+    def test_compare(self):
+        def result(p50: float):
+            return {'results': {'paillier': {'320': {'enc': {'p50': p50}, 'dec': {'p50': 1.0}}}}}
+
+        self.assertEqual(benchmark.compare(result(1.1), result(1.0), tolerance=0.25), [])
+        regressions = benchmark.compare(result(2.0), result(1.0), tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('paillier/320/enc'))
+
+        failed = {'results': {'paillier': {'320': {'enc': {'error': 'ValueError: '}}}}}
+        self.assertEqual(len(benchmark.compare(failed, result(1.0), tolerance=0.25)), 1)
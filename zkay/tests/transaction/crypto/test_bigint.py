@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import bigint
+from zkay.transaction.crypto.bigint import invert, powmod
+
+
+class TestBigint(ZkayTestCase):
+
+    def test_powmod(self):
+        self.assertEqual(powmod(3, 200, 1000003), pow(3, 200, 1000003))
+        self.assertEqual(powmod(-3, 5, 7), pow(-3, 5, 7))
+        self.assertEqual(powmod(3, -1, 7), 5)
+        self.assertIsInstance(powmod(3, 200, 1000003), int)
+
+    def test_invert(self):
+        self.assertEqual(invert(3, 7), 5)
+        self.assertEqual(invert(10, 1), 0)
+        with self.assertRaises(ValueError):
+            invert(6, 9)
+        with self.assertRaises(ValueError):
+            powmod(6, -1, 9)
+
+    @unittest.skipUnless(bigint.has_gmpy2, 'gmpy2 not installed')
+    def test_engines_agree(self):
+        rnd = random.Random(42)
+        for bits in [64, 254, 1024, 4096]:
+            mod = rnd.getrandbits(bits) | 1
+            base, exp = rnd.getrandbits(bits), rnd.getrandbits(bits)
+            self.assertEqual(bigint._gmp_powmod(base, exp, mod), bigint._int_powmod(base, exp, mod))
+            try:
+                expected = bigint._int_invert(base, mod)
+            except ValueError:
+                self.assertRaises(ValueError, bigint._gmp_invert, base, mod)
+            else:
+                self.assertEqual(bigint._gmp_invert(base, mod), expected)
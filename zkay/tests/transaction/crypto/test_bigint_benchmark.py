@@ -0,0 +1,58 @@
+import random
+import time
+import unittest
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import bigint
+from zkay.transaction.crypto.babyjubjub import BASE_ORDER
+
+# Running this benchmark prints a CSV (or TSV if you set SEP = '\t') to stdout with the following columns:
+#   operation:  Dominant modular arithmetic operation of a crypto backend
+#   key_bits:   Key size of the backend
+#   int_us:     Average time with python ints, in microseconds
+#   gmpy2_us:   Average time with gmpy2, in microseconds
+#   speedup:    int_us / gmpy2_us
+
+KEY_BITS = [1024, 2048, 3072]  # Paillier and RSA key sizes
+NUM_RUNS = 5                    # Number of runs per operation and key size
+SEP = ','                       # Value separator in output
+
+
+def _operations(rnd: random.Random):
+    """Yield (operation, key_bits, function which is called with the powmod and invert implementations)."""
+    for bits in KEY_BITS:
+        n = rnd.getrandbits(bits) | (1 << (bits - 1)) | 1
+        p = rnd.getrandbits(bits // 2) | (1 << (bits // 2 - 1)) | 1
+        r, c = rnd.getrandbits(bits), rnd.getrandbits(bits)
+
+        # r^n mod n^2
+        yield 'paillier_enc', bits, lambda powmod, invert: powmod(r, n, n * n)
+        # c^(p-1) mod p^2 (one of the two CRT halves)
+        yield 'paillier_dec', bits, lambda powmod, invert: powmod(c, p - 1, p * p)
+        # c^d mod p (one of the two CRT halves)
+        yield 'rsa_dec', bits, lambda powmod, invert: powmod(c, r % (p - 1), p)
+
+    # Field inversion for extended -> affine coordinate conversion
+    x = rnd.getrandbits(253) | 1
+    yield 'babyjubjub_inv', 254, lambda powmod, invert: invert(x, BASE_ORDER)
+
+
+def _time(fct, powmod, invert) -> float:
+    start = time.perf_counter()
+    for _ in range(NUM_RUNS):
+        fct(powmod, invert)
+    return (time.perf_counter() - start) / NUM_RUNS * 1e6
+
+
+class BigintBenchmark(ZkayTestCase):
+    @unittest.skipUnless(bigint.has_gmpy2, 'gmpy2 not installed')
+    def test_run_benchmark(self):
+        print('operation', 'key_bits', 'int_us', 'gmpy2_us', 'speedup', sep=SEP)
+        for operation, key_bits, fct in _operations(random.Random(42)):
+            int_us = _time(fct, bigint._int_powmod, bigint._int_invert)
+            gmp_us = _time(fct, bigint._gmp_powmod, bigint._gmp_invert)
+            print(operation, key_bits, round(int_us, 1), round(gmp_us, 1), round(int_us / gmp_us, 2), sep=SEP)
+
+
+if __name__ == "__main__":
+    BigintBenchmark('test_run_benchmark').test_run_benchmark()
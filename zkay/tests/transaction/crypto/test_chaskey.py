@@ -0,0 +1,67 @@
+import secrets
+import shutil
+import unittest
+
+from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import chaskey
+from zkay.utils.run_command import run_command
+
+
+def jar_chaskey(mode: str, key: bytes, iv: bytes, data: bytes) -> bytes:
+    out, _ = run_command(['java', '-cp', f'{circuit_builder_jar}', 'zkay.ChaskeyLtsCbc', mode, key.hex(), iv.hex(), data.hex()])
+    return int(out.splitlines()[-1], 16).to_bytes(len(data), byteorder='big')
+
+
+# (key, iv, plain, cipher), computed with zkay.ChaskeyLtsCbc from the circuit builder jar
+known_answers = [
+    ('000102030405060708090a0b0c0d0e0f', '0f0e0d0c0b0a09080706050403020100',
+     '000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f',
+     '86a3584880fc554761fb89a146ddefdd1e3fde9fcf4a22d8a772caf2b08f15f0'),
+    ('ffffffffffffffffffffffffffffffff', '00112233445566778899aabbccddeeff',
+     '0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef',
+     '955a092547e88d67e33d212c7c4b09286fa9474dfc67ac42ced8a4e69b87e57e'),
+    ('2b7e151628aed2a6abf7158809cf4f3c', '000102030405060708090a0b0c0d0e0f',
+     '6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51',
+     '9ec19a3684b2653afd27ed2b79fcc5c569566cf70c1e7e247e9f6f6d05d83a5d'),
+]
+
+
+class TestChaskey(ZkayTestCase):
+
+    def test_known_answers(self):
+        for key, iv, plain, cipher in known_answers:
+            key, iv, plain, cipher = map(bytes.fromhex, (key, iv, plain, cipher))
+            self.assertEqual(chaskey.encrypt(key, iv, plain), cipher)
+            self.assertEqual(chaskey.decrypt(key, iv, cipher), plain)
+
+    def test_round_trip(self):
+        for _ in range(10):
+            key, iv, plain = secrets.token_bytes(16), secrets.token_bytes(16), secrets.token_bytes(32)
+            cipher = chaskey.encrypt(key, iv, plain)
+            self.assertEqual(len(cipher), 32)
+            self.assertNotEqual(cipher, plain)
+            self.assertEqual(chaskey.decrypt(key, iv, cipher), plain)
+
+    def test_cbc_chaining(self):
+        key, iv = secrets.token_bytes(16), secrets.token_bytes(16)
+        cipher = chaskey.encrypt(key, iv, bytes(32))
+        # Identical plaintext blocks must result in different cipher blocks
+        self.assertNotEqual(cipher[:16], cipher[16:])
+        self.assertEqual(chaskey.encrypt(key, iv, bytes(16)), cipher[:16])
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            chaskey.encrypt(bytes(15), bytes(16), bytes(32))
+        with self.assertRaises(ValueError):
+            chaskey.encrypt(bytes(16), bytes(16), bytes(31))
+        with self.assertRaises(ValueError):
+            chaskey.decrypt(bytes(16), bytes(8), bytes(32))
+
+    @unittest.skipIf(shutil.which('java') is None, 'java not available')
+    def test_matches_jar(self):
+        for _ in range(3):
+            key, iv, plain = secrets.token_bytes(16), secrets.token_bytes(16), secrets.token_bytes(32)
+            cipher = chaskey.encrypt(key, iv, plain)
+            self.assertEqual(cipher, jar_chaskey('enc', key, iv, plain))
+            self.assertEqual(plain, jar_chaskey('dec', key, iv, cipher))
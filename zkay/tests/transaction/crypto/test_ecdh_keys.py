@@ -0,0 +1,49 @@
+import os
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import ecdh_base
+from zkay.transaction.crypto.ecdh_aes import EcdhAesCrypto
+
+
+class TestEcdhKeyFile(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_temp_data_dir()
+
+        self.derivations = []
+        self.crypto = EcdhAesCrypto(None)
+        self.crypto._gen_keypair = lambda rnd: self.derivations.append(rnd) or (int.from_bytes(rnd, 'big') % 1000, 42)
+
+    def test_keys_stored(self):
+        key_pair = self.crypto._generate_or_load_key_pair('01')
+        loaded = self.crypto._generate_or_load_key_pair('01')
+        self.assertEqual((loaded.pk, loaded.sk), (key_pair.pk, key_pair.sk))
+        self.assertEqual(len(self.derivations), 1)
+
+    def test_legacy_key_file_upgraded(self):
+        key_file = os.path.join(cfg.data_dir, 'keys', 'ec_02.bin')
+        os.makedirs(os.path.dirname(key_file))
+        with open(key_file, 'wb') as f:
+            f.write(bytes(range(32)))
+
+        key_pair = self.crypto._generate_or_load_key_pair('02')
+        self.assertEqual(key_pair.pk[0], int.from_bytes(bytes(range(32)), 'big') % 1000)
+        self.assertEqual(self.crypto._read_key_file(key_file), (bytes(range(32)), (key_pair.pk[0], 42)))
+        self.assertEqual(self.crypto._generate_or_load_key_pair('02').sk, key_pair.sk)
+        self.assertEqual(len(self.derivations), 1)
+
+    def test_key_files_generated_in_one_request(self):
+        self.crypto._generate_or_load_key_pair('01')
+        worker = mock.Mock()
+        worker.request.side_effect = lambda name, *rnds: [v for i, _ in enumerate(rnds) for v in [hex(i + 1)[2:], hex(i + 11)[2:]]]
+        with mock.patch.object(ecdh_base, 'crypto_worker', return_value=worker):
+            self.crypto._generate_key_files(['01', '03', '04'])
+        self.assertEqual(worker.request.call_count, 1)
+        self.assertEqual(worker.request.call_args[0][0], 'keypair')
+
+        self.assertEqual([self.crypto._generate_or_load_key_pair(a).pk[0] for a in ['03', '04']], [1, 2])
+        self.assertEqual(self.crypto._generate_or_load_key_pair('04').sk[0], 12)
+        self.assertEqual(len(self.derivations), 1)
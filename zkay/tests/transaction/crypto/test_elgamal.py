@@ -1,8 +1,10 @@
 from zkay.transaction.crypto import babyjubjub
 
 from zkay.transaction.crypto.elgamal import ElgamalCrypto
+from zkay.transaction.crypto.pool import PrecomputationPool
 
 from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.interface import PlaintextRangeError
 from zkay.transaction.types import CipherValue
 
 
@@ -62,6 +64,34 @@ class TestElgamal(ZkayTestCase):
         expected = 42
         self.assertEqual(plain, expected)
 
+    def test_decrypt_in_range(self):
+        eg = ElgamalCrypto(None)
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        sk = 448344687855328518203304384067387474955750326758815542295083498526674852893
+        for plain, plain_bits in [(42, 8), (255, 8), (1000, 16), (42, 32)]:
+            cipher = eg._enc_with_rand(plain, 4992017890738015216991440853823451346783754228142718316135811893930821210517, pk)
+            self.assertEqual(eg._dec_in_range(cipher, sk, plain_bits)[0], plain)
+
+    def test_decrypt_out_of_range(self):
+        eg = ElgamalCrypto(None)
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        sk = 448344687855328518203304384067387474955750326758815542295083498526674852893
+        r = 4992017890738015216991440853823451346783754228142718316135811893930821210517
+        for plain, plain_bits in [(256, 8), (300, 8), (1 << 16, 16), (1 << 17, 17)]:
+            cipher = eg._enc_with_rand(plain, r, pk)
+            with self.assertRaises(PlaintextRangeError) as ctx:
+                eg.dec_raw(cipher, sk, plain_bits)
+            self.assertEqual(ctx.exception.plain, plain)
+            self.assertEqual(ctx.exception.plain_bits, plain_bits)
+
+        # Batch decryption fails as a whole
+        ciphers = [eg._enc_with_rand(plain, r, pk) for plain in [42, 300]]
+        with self.assertRaises(PlaintextRangeError) as ctx:
+            eg.dec_many_raw(ciphers, sk, 8)
+        self.assertEqual(ctx.exception.plain, 300)
+
     def test_homomorphic_add(self):
         eg = ElgamalCrypto(None)
         cipher1 = CipherValue([17990166387038654353532224054392704246273066434684370089496246721960255371329,
@@ -115,3 +145,40 @@ class TestElgamal(ZkayTestCase):
         expected = eg.do_op('+', None, cipher, cipher)
         res = eg.do_op('*', None, cipher, 2)
         self.assertEqual(res, expected)
+
+    def test_rerand_with_pool(self):
+        eg = ElgamalCrypto(None)
+        eg.rerand_pool = PrecomputationPool('test', eg._sample_enc_zero, size=2, low_water=1)
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        sk = 448344687855328518203304384067387474955750326758815542295083498526674852893
+        cipher = CipherValue(eg._enc_with_rand(42, 1234, pk), params=eg.params)
+        try:
+            eg.rerand_pool.fill(tuple(pk))
+            randomness = set()
+            for _ in range(4):
+                rerand, r = eg.do_rerand(cipher, pk)
+                self.assertNotEqual(rerand, cipher[:])
+                self.assertEqual(eg._dec(rerand, sk)[0], 42)
+                self.assertEqual(rerand, eg._enc_with_rand(42, 1234 + r[0], pk))
+                randomness.add(r[0])
+            self.assertEqual(len(randomness), 4)
+        finally:
+            eg.rerand_pool.shutdown()
+
+    def test_homomorphic_chain_uses_native(self):
+        eg = ElgamalCrypto(None)
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        sk = 448344687855328518203304384067387474955750326758815542295083498526674852893
+        cipher = CipherValue(eg._enc_with_rand(42, 1234, pk), params=eg.params)
+
+        res = eg.do_op_value('+', pk, cipher, cipher)
+        self.assertEqual(res[:], tuple(eg.do_op('+', pk, cipher, cipher)))
+        self.assertEqual(res.get_native(None), eg._deserialize_cipher(res))
+
+        # Re-wrapping keeps the native form, the chained operation does not deserialize its operand again
+        wrapped = CipherValue(res, params=eg.params)
+        self.assertIs(wrapped.get_native(None), res.get_native(None))
+        res = eg.do_op_value('*', pk, wrapped, 3)
+        self.assertEqual(eg._dec(res, sk)[0], 42 * 2 * 3)
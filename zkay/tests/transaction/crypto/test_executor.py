@@ -0,0 +1,76 @@
+import pickle
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.executor import InlineCryptoExecutor, ProcessPoolCryptoExecutor, then
+from zkay.transaction.crypto.paillier import PaillierCrypto
+from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.types import CipherValue
+
+
+class _ConfigCrypto:
+    def __init__(self, key_store):
+        pass
+
+    @staticmethod
+    def get_option(name: str):
+        return getattr(cfg, name)
+
+
+class TestCryptoExecutor(ZkayTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.p, cls.q = PaillierCrypto.generate_primes(PaillierCrypto.params.key_bits)
+        cls.n = cls.p * cls.q
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.pc = PaillierCrypto(None)
+        self.sk = self.pc.serialize_pk(self.p, self.pc.params.key_bytes) + self.pc.serialize_pk(self.q, self.pc.params.key_bytes)
+
+    def _roundtrip(self, executor):
+        plains = [0, 1, 42, 1337]
+        enc_futures = [executor.submit(self.pc, 'enc_raw', plain, None, self.n) for plain in plains]
+        ciphers = [future.result()[0] for future in enc_futures]
+        dec_futures = [executor.submit(self.pc, 'dec_raw', cipher, self.sk, None) for cipher in ciphers]
+        self.assertEqual([future.result()[0] for future in dec_futures], plains)
+
+        op = executor.submit(self.pc, 'do_op', '+', self.pc.serialize_pk(self.n, self.pc.params.key_bytes),
+                             CipherValue(ciphers[2], params=self.pc.params), CipherValue(ciphers[3], params=self.pc.params))
+        self.assertEqual(executor.submit(self.pc, 'dec_raw', op.result(), self.sk).result()[0], 42 + 1337)
+
+    def test_inline(self):
+        self._roundtrip(InlineCryptoExecutor())
+
+    def test_process_pool(self):
+        executor = ProcessPoolCryptoExecutor(2)
+        try:
+            self._roundtrip(executor)
+        finally:
+            executor.shutdown()
+
+    def test_process_pool_config(self):
+        # Workers are not forked, they receive the configuration of the calling process
+        executor = ProcessPoolCryptoExecutor(1)
+        try:
+            self.assertTrue(executor.submit(_ConfigCrypto(None), 'get_option', 'is_unit_test').result())
+        finally:
+            executor.shutdown()
+
+    def test_exception_propagated(self):
+        future = InlineCryptoExecutor().submit(self.pc, 'do_op', 'invalid-op', [self.n], 1, 2)
+        self.assertIsNotNone(future.exception())
+
+    def test_then(self):
+        future = then(InlineCryptoExecutor().submit(self.pc, 'deserialize_pk', [1, 2]), lambda x: x + 1)
+        self.assertEqual(future.result(), self.pc.deserialize_pk([1, 2]) + 1)
+
+    def test_cipher_value_pickle(self):
+        params = CryptoParams('paillier')
+        cipher = CipherValue([1, 2, 3], params=params, native=42)
+        restored = pickle.loads(pickle.dumps(cipher))
+        self.assertEqual(restored, cipher)
+        self.assertEqual(restored.params, params)
+        self.assertEqual(restored.get_native(None), 42)
@@ -0,0 +1,56 @@
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.paillier import PaillierCrypto, get_decryption_context
+from zkay.transaction.crypto.pool import PrecomputationPool
+from zkay.transaction.types import CipherValue
+
+
+class TestPaillier(ZkayTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.p, cls.q = PaillierCrypto.generate_primes(PaillierCrypto.params.key_bits)
+        cls.n = cls.p * cls.q
+
+    def _sk(self, pc: PaillierCrypto):
+        return pc.serialize_pk(self.p, pc.params.key_bytes) + pc.serialize_pk(self.q, pc.params.key_bytes)
+
+    def test_decrypt(self):
+        pc = PaillierCrypto(None)
+        for plain in [0, 1, 42, self.n // 2, -1, -42]:
+            random = PaillierCrypto.sample_below(self.n, co_prime=True)
+            cipher = pc._enc_with_rand(plain % self.n, random, self.n)
+            dec_plain, dec_random = pc._dec(cipher, self._sk(pc))
+            self.assertEqual(dec_plain, plain)
+            self.assertEqual(pc.deserialize_pk(dec_random), random)
+
+    def test_decryption_context_cached(self):
+        self.assertIs(get_decryption_context(self.p, self.q), get_decryption_context(self.p, self.q))
+
+    def test_encrypt_with_pool(self):
+        pc = PaillierCrypto(None)
+        pc.randomness_pool = PrecomputationPool('test', pc._sample_randomness, size=2, low_water=1)
+        try:
+            pc.randomness_pool.fill(self.n)
+            for _ in range(4):
+                cipher, random = pc._enc(42, None, self.n)
+                dec_plain, dec_random = pc._dec(cipher, self._sk(pc))
+                self.assertEqual(dec_plain, 42)
+                self.assertEqual(dec_random, random)
+        finally:
+            pc.randomness_pool.shutdown()
+
+    def test_homomorphic_chain_uses_native(self):
+        pc = PaillierCrypto(None)
+        pk = pc.serialize_pk(self.n, pc.params.key_bytes)
+        cipher = CipherValue(pc._enc_with_rand(42, 1234, self.n), params=pc.params)
+
+        res = pc.do_op_value('+', pk, cipher, cipher)
+        self.assertEqual(res[:], tuple(pc.do_op('+', pk, cipher, cipher)))
+        self.assertEqual(res.get_native(None), pc.deserialize_pk(res[:]))
+
+        # Re-wrapping keeps the native form, the chained operation does not deserialize its operand again
+        wrapped = CipherValue(res, params=pc.params)
+        self.assertIs(wrapped.get_native(None), res.get_native(None))
+        res = pc.do_op_value('-', pk, wrapped, cipher)
+        self.assertEqual(pc._dec(res, self._sk(pc))[0], 42)
@@ -0,0 +1,60 @@
+import gc
+import time
+import weakref
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import pool as pool_module
+from zkay.transaction.crypto.pool import PrecomputationPool
+
+
+class TestPrecomputationPool(ZkayTestCase):
+
+    def _wait_for(self, pool: PrecomputationPool, key, count: int):
+        for _ in range(500):
+            if pool.available(key) >= count:
+                return
+            time.sleep(0.01)
+        self.fail('Pool was not refilled')
+
+    def test_refill(self):
+        pool = PrecomputationPool('test', lambda k: k * 2, size=4, low_water=2)
+        try:
+            self.assertIsNone(pool.get(3))
+            self._wait_for(pool, 3, 4)
+            self.assertEqual([pool.get(3) for _ in range(4)], [6] * 4)
+            self.assertEqual(pool.stats()['hits'], 4)
+            self.assertEqual(pool.stats()['misses'], 1)
+        finally:
+            pool.shutdown()
+        self.assertEqual(pool.available(3), 0)
+
+    def test_disabled(self):
+        pool = PrecomputationPool('test', lambda k: k, size=0, low_water=0)
+        pool.fill(1)
+        self.assertIsNone(pool.get(1))
+        self.assertIsNone(pool._thread)
+
+    def test_max_keys(self):
+        pool = PrecomputationPool('test', lambda k: k, size=2, low_water=1, max_keys=2)
+        try:
+            for key in range(3):
+                pool.fill(key)
+            self._wait_for(pool, 2, 2)
+            self.assertEqual(pool.available(0), 0)
+        finally:
+            pool.shutdown()
+
+    def test_shutdown_at_exit(self):
+        pool = PrecomputationPool('test', lambda k: k, size=2, low_water=1)
+        pool.fill(1)
+        self._wait_for(pool, 1, 2)
+        pool_module._shutdown_pools()
+        self.assertTrue(pool._stopped)
+        self.assertEqual(pool.available(1), 0)
+
+        # Pools are not kept alive by the exit hook
+        pool = PrecomputationPool('test', lambda k: k, size=0, low_water=0)
+        ref = weakref.ref(pool)
+        del pool
+        gc.collect()
+        self.assertIsNone(ref())
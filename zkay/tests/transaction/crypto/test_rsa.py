@@ -0,0 +1,62 @@
+from Crypto.Cipher import PKCS1_OAEP, PKCS1_v1_5
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Util.strxor import strxor
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.rsa_base import RSACrypto
+from zkay.transaction.crypto.rsa_oaep import RSAOAEPCrypto
+from zkay.transaction.crypto.rsa_pkcs15 import RSAPKCS15Crypto
+
+
+class TestRSA(ZkayTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = RSA.generate(2048, e=RSACrypto.default_exponent)
+
+    def _check(self, crypto: RSACrypto, pycryptodome_cipher, decrypt):
+        plain = 0x1234567890abcdef
+        cipher, rnd = crypto._enc(plain, None, self.key.n)
+
+        cipher_bytes = crypto.unpack_to_byte_array(cipher, crypto.params.cipher_chunk_size, crypto.params.cipher_bytes_payload)
+        self.assertEqual(int.from_bytes(decrypt(cipher_bytes), byteorder='big'), plain)
+
+        dec_plain, dec_rnd = crypto._dec(cipher, self.key)
+        self.assertEqual(dec_plain, plain)
+        self.assertEqual(dec_rnd, rnd)
+
+        # Cipher texts created by pycryptodome
+        cipher_bytes = pycryptodome_cipher.encrypt(plain.to_bytes(32, byteorder='big'))
+        dec_plain, _ = crypto._dec(crypto.pack_byte_array(cipher_bytes, crypto.params.cipher_chunk_size), self.key)
+        self.assertEqual(dec_plain, plain)
+
+    def test_oaep(self):
+        cipher = PKCS1_OAEP.new(self.key, hashAlgo=SHA256)
+        self._check(RSAOAEPCrypto(None), cipher, cipher.decrypt)
+
+    def test_pkcs15(self):
+        cipher = PKCS1_v1_5.new(self.key)
+        self._check(RSAPKCS15Crypto(None), cipher, lambda c: cipher.decrypt(c, None))
+
+    def test_oaep_invalid_padding(self):
+        crypto = RSAOAEPCrypto(None)
+        k, h_len = self.key.size_in_bytes(), crypto.h_len
+        seed = bytes(range(h_len))
+
+        def encode(db: bytes, first: int = 0) -> bytes:
+            masked_db = strxor(db, crypto._mgf(seed, k - h_len - 1))
+            return bytes([first]) + strxor(seed, crypto._mgf(masked_db, h_len)) + masked_db
+
+        msg = b'\x12' * 32
+        ps = b'\x00' * (k - len(msg) - 2 * h_len - 2)
+        self.assertEqual(crypto._unpad(encode(crypto.l_hash + ps + b'\x01' + msg)), (msg, seed))
+
+        for em in [encode(crypto.l_hash + ps + b'\x01' + msg, first=1),
+                   encode(b'\x00' * h_len + ps + b'\x01' + msg),
+                   encode(crypto.l_hash + ps + b'\x00' + msg),
+                   encode(crypto.l_hash + b'\x02' + ps[1:] + b'\x01' + msg),
+                   encode(crypto.l_hash + b'\x00' * (k - 2 * h_len - 1))]:
+            with self.assertRaises(ValueError):
+                crypto._unpad(em)
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction import interface
+from zkay.transaction.crypto.dummy import DummyCrypto
+from zkay.transaction.keystore.simple import SimpleKeystore
+from zkay.transaction.runtime import Runtime
+from zkay.transaction.types import AddressValue
+
+
+class TestKeyPairCache(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_temp_data_dir()
+        self.old_cache_size = cfg.keystore_key_pair_cache_size
+        cfg.keystore_key_pair_cache_size = 2
+        interface.clear_key_pair_cache()
+        self.crypto = DummyCrypto(SimpleKeystore(None, DummyCrypto.params))
+        self.addresses = [AddressValue(i) for i in range(1, 5)]
+
+    def tearDown(self) -> None:
+        interface.clear_key_pair_cache()
+        cfg.keystore_key_pair_cache_size = self.old_cache_size
+        super().tearDown()
+
+    def test_bounded(self):
+        for address in self.addresses:
+            self.crypto._get_key_pair(address)
+        self.assertEqual(len(interface._key_pair_cache), 2)
+
+        # Least recently used key pairs are evicted first
+        with mock.patch.object(self.crypto, '_generate_or_load_key_pair', wraps=self.crypto._generate_or_load_key_pair) as load:
+            self.crypto._get_key_pair(self.addresses[2])
+            self.crypto._get_key_pair(self.addresses[0])
+            self.crypto._get_key_pair(self.addresses[2])
+            self.assertEqual([c[0][0] for c in load.call_args_list], [self.addresses[0].val.hex()])
+
+    def test_cleared_by_runtime_reset(self):
+        self.crypto._get_key_pair(self.addresses[0])
+        self.assertEqual(len(interface._key_pair_cache), 1)
+        Runtime.reset()
+        self.assertEqual(len(interface._key_pair_cache), 0)
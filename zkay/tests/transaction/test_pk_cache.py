@@ -0,0 +1,59 @@
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.pk_cache import PersistentPkCache
+from zkay.transaction.types import AddressValue, PublicKeyValue
+
+
+class TestPersistentPkCache(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_temp_data_dir()
+
+        self.params = CryptoParams('elgamal')
+        self.addresses = [AddressValue(bytes([i]) * 20) for i in range(1, 4)]
+        self.pks = {address: PublicKeyValue([address.val[0]] * self.params.key_len, params=self.params) for address in self.addresses}
+
+    def _cache(self, cache_id: str = 'chain:pki:elgamal') -> PersistentPkCache:
+        cache = PersistentPkCache(cache_id, self.params)
+        cache.load()
+        return cache
+
+    def _fill(self, block: int):
+        cache = self._cache()
+        cache.sync(block, {})
+        cache.put(self.pks)
+        cache.save()
+
+    def test_keys_survive_sessions(self):
+        self._fill(10)
+        cache = self._cache()
+        self.assertEqual(cache.synced_block, 10)
+        self.assertEqual(cache.get_all(), self.pks)
+
+    def test_caches_are_separate(self):
+        self._fill(10)
+        self.assertEqual(len(self._cache('other_chain:pki:elgamal')), 0)
+
+    def test_reannounced_keys_discarded(self):
+        self._fill(10)
+        cache = self._cache()
+        cache.sync(20, {self.addresses[0]: 15, self.addresses[1]: 9})
+        self.assertEqual(set(cache.get_all()), set(self.addresses[1:]))
+        self.assertEqual(cache.synced_block, 20)
+
+    def test_chain_reset_discards_all(self):
+        self._fill(10)
+        cache = self._cache()
+        cache.sync(5, {})
+        self.assertEqual(len(cache), 0)
+
+    def test_corrupted_file_ignored(self):
+        self._fill(10)
+        cache = self._cache()
+        with open(cache.filename, 'w') as f:
+            f.write('{"version": 1, ')
+        cache = self._cache()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.synced_block)
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import threading
+import time
+from typing import List
+from unittest import mock
+
+import zkay.jsnark_interface.jsnark_interface as jsnark
+from zkay.jsnark_interface.jsnark_interface import count_constraints, get_jvm_heap_size
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.interface import ZkayProverInterface, ProofGenerationError
+from zkay.transaction.prover import JsnarkProver, ProvingScheduler
+
+
+def _function_name(verifier_dir: str) -> str:
+    return os.path.basename(verifier_dir)[len('zk__Verify_C_'):-len('_out')]
+
+
+class _FakeProver(ZkayProverInterface):
+    """Prover which generates the proof for a function of contract C once it is released, the memory usage is len(function)."""
+
+    def __init__(self):
+        super().__init__('groth16')
+        self.lock = threading.Lock()
+        self.started: List[str] = []
+        self.running = 0
+        self.max_running = 0
+        self.release = {}
+
+    def estimate_memory(self, verifier_dir: str) -> int:
+        return len(_function_name(verifier_dir))
+
+    def _generate_proof(self, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> List[int]:
+        fname = _function_name(verifier_dir)
+        with self.lock:
+            self.started.append(fname)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.release.setdefault(fname, threading.Event()).wait(10)
+        with self.lock:
+            self.running -= 1
+        if 'fail' in fname:
+            raise ProofGenerationError('failed')
+        return in_vals + priv_values
+
+    def get_prover_key_hash(self, verifier_directory: str) -> bytes:
+        return b''
+
+
+class TestProvingScheduler(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.prover = _FakeProver()
+
+    def _submit(self, scheduler: ProvingScheduler, function: str, priority: int = 0):
+        self.prover.release.setdefault(function, threading.Event())
+        return scheduler.submit(self.prover, '', 'C', function, [2], [1], [], priority=priority)
+
+    def _wait_until_started(self, count: int):
+        while len(self.prover.started) < count:
+            time.sleep(0.01)
+
+    def _release_all(self):
+        for event in self.prover.release.values():
+            event.set()
+
+    def test_memory_budget(self):
+        scheduler = ProvingScheduler(max_jobs=4, memory_budget=5)
+        try:
+            futures = [self._submit(scheduler, f) for f in ['aaa', 'bbb', 'cc']]
+            self._release_all()
+            self.assertEqual([f.result() for f in futures], [[1, 2]] * 3)
+            self.assertLessEqual(self.prover.max_running, 2)
+
+            # Proofs which exceed the budget are generated on their own
+            future = self._submit(scheduler, 'a' * 10)
+            self._release_all()
+            self.assertEqual(future.result(), [1, 2])
+        finally:
+            scheduler.shutdown()
+
+    def test_priorities_and_metrics(self):
+        scheduler = ProvingScheduler(max_jobs=1)
+        try:
+            blocker = self._submit(scheduler, 'first')
+            self._wait_until_started(1)
+            futures = [self._submit(scheduler, 'low', 0), self._submit(scheduler, 'high', 5), self._submit(scheduler, 'fail', 1)]
+            self.assertEqual(scheduler.queue_depth, 3)
+            self._release_all()
+            blocker.result()
+            futures[0].result()
+            with self.assertRaises(ProofGenerationError):
+                futures[2].result()
+
+            self.assertEqual(self.prover.started, ['first', 'high', 'fail', 'low'])
+            metrics = scheduler.metrics()
+            self.assertEqual((metrics['queue_depth'], metrics['running'], metrics['completed'], metrics['failed']), (0, 0, 3, 1))
+            self.assertGreaterEqual(metrics['max_wait_time'], metrics['avg_wait_time'])
+        finally:
+            scheduler.shutdown()
+
+    def test_shutdown_cancels_waiting(self):
+        scheduler = ProvingScheduler(max_jobs=1)
+        running = self._submit(scheduler, 'first')
+        waiting = self._submit(scheduler, 'second')
+        self._wait_until_started(1)
+        threading.Timer(0.1, self._release_all).start()
+        scheduler.shutdown()
+        self.assertTrue(waiting.cancelled())
+        self.assertEqual(running.result(), [1, 2])
+        with self.assertRaises(RuntimeError):
+            self._submit(scheduler, 'third')
+
+
+class TestJsnarkMemoryEstimate(ZkayTestCase):
+
+    def test_count_constraints(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, 'circuit.arith'), 'w') as f:
+                f.write('total 12\n'
+                        'input 0\n'
+                        'nizkinput 1\n'
+                        'mul in 2 <0 1> out 1 <2>\n'
+                        'add in 2 <0 2> out 1 <3>\n'
+                        'const-mul-5 in 1 <3> out 1 <4>\n'
+                        'split in 1 <4> out 3 <5 6 7>\n'
+                        'zerop in 1 <4> out 2 <8 9>\n'
+                        'assert in 2 <1 1> out 1 <1>\n'
+                        'output 2\n')
+            self.assertEqual(count_constraints(os.path.join(d, 'circuit.arith')), 1 + 4 + 2 + 1)
+
+            prover = JsnarkProver('groth16')
+            self.assertEqual(prover.estimate_memory(d), get_jvm_heap_size(8) + JsnarkProver.jvm_overhead)
+            self.assertEqual(prover.estimate_memory(os.path.join(d, 'missing')), jsnark.jvm_max_heap + JsnarkProver.jvm_overhead)
+
+    def test_jvm_heap_within_estimate(self):
+        for constraints in [1, 100000, 10 ** 8]:
+            prover = JsnarkProver('groth16')
+            with tempfile.TemporaryDirectory() as d:
+                open(os.path.join(d, 'circuit.arith'), 'w').close()
+                with mock.patch.object(jsnark, 'count_constraints', return_value=constraints), \
+                        mock.patch.object(jsnark, 'run_command') as run_command, \
+                        mock.patch.object(jsnark, 'compile_helper_class', return_value=d):
+                    prover._prepare_proof(d, d, [1])
+                heap_args = {a[:4]: int(a[4:-1]) << 20 for a in run_command.call_args[0][0] if a.startswith('-Xm')}
+                self.assertLessEqual(heap_args['-Xms'], heap_args['-Xmx'])
+                self.assertLessEqual(heap_args['-Xmx'] + JsnarkProver.jvm_overhead, prover.estimate_memory(d))
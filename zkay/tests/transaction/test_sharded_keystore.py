@@ -0,0 +1,93 @@
+import threading
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.dummy import DummyCrypto
+from zkay.transaction.crypto.rsa_oaep import RSAOAEPCrypto
+from zkay.transaction.keystore.sharded import ShardedDict, ShardedKeystore
+from zkay.transaction.types import AddressValue
+
+
+class TestShardedDict(ZkayTestCase):
+
+    def test_lru_eviction(self):
+        d = ShardedDict(1, max_size=2)
+        d['a'], d['b'] = 1, 2
+        self.assertEqual(d['a'], 1)
+        d['c'] = 3
+        self.assertEqual(dict(d), {'a': 1, 'c': 3})
+
+    def test_concurrent_access(self):
+        d = ShardedDict(4)
+
+        def fill(offset: int):
+            for i in range(1000):
+                d[offset + i] = i
+        threads = [threading.Thread(target=fill, args=(t * 1000,)) for t in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(d), 4000)
+        self.assertEqual(d[3999], 999)
+
+
+class TestShardedKeystore(ZkayTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_temp_data_dir()
+        self.old_cache_size = cfg.keystore_key_pair_cache_size
+        cfg.keystore_key_pair_cache_size = 2
+
+        # Fake pki in which no keys are announced yet
+        self.conn = mock.Mock()
+        self.conn.req_public_keys.side_effect = lambda addresses, params: [None] * len(addresses)
+        self.addresses = [AddressValue(i) for i in range(1, 6)]
+
+    def tearDown(self) -> None:
+        cfg.keystore_key_pair_cache_size = self.old_cache_size
+        super().tearDown()
+
+    def _keystore(self) -> ShardedKeystore:
+        return ShardedKeystore(self.conn, DummyCrypto.params)
+
+    def test_key_pairs_survive_sessions(self):
+        keystore = self._keystore()
+        DummyCrypto(keystore).generate_or_load_key_pairs(self.addresses)
+        self.assertEqual(len(keystore.local_key_pairs), len(self.addresses))
+
+        keystore = self._keystore()
+        crypto = DummyCrypto(keystore)
+        with mock.patch.object(crypto, '_generate_or_load_key_pair') as load_key_file:
+            crypto.generate_or_load_key_pairs(self.addresses)
+            crypto.generate_or_load_key_pair(self.addresses[0])
+            load_key_file.assert_not_called()
+        for address in self.addresses:
+            self.assertTrue(keystore.has_initialized_keys_for(address))
+            self.assertEqual(keystore.sk(address).val, int.from_bytes(address.val, byteorder='big'))
+        self.assertFalse(keystore.has_initialized_keys_for(AddressValue(42)))
+        with self.assertRaises(KeyError):
+            keystore.sk(AddressValue(42))
+
+    def test_cached_key_pairs_bounded(self):
+        keystore = self._keystore()
+        DummyCrypto(keystore).generate_or_load_key_pairs(self.addresses)
+        for address in self.addresses:
+            self.assertEqual(keystore.pk(address), DummyCrypto(None)._generate_or_load_key_pair(address.val.hex()).pk)
+        self.assertLessEqual(len(keystore.local_key_pairs._cache), 2)
+
+    def test_rsa_key_pairs(self):
+        keystore = ShardedKeystore(self.conn, RSAOAEPCrypto.params)
+        RSAOAEPCrypto(keystore).generate_or_load_key_pair(self.addresses[0])
+        sk, pk = keystore.sk(self.addresses[0]).val, keystore.pk(self.addresses[0])
+
+        # Private keys are RsaKey objects, they are stored in their exported form
+        keystore = ShardedKeystore(self.conn, RSAOAEPCrypto.params)
+        crypto = RSAOAEPCrypto(keystore)
+        with mock.patch.object(crypto, '_generate_or_load_key_pair') as load_key_file:
+            crypto.generate_or_load_key_pair(self.addresses[0])
+            load_key_file.assert_not_called()
+        self.assertEqual(keystore.sk(self.addresses[0]).val, sk)
+        self.assertEqual(keystore.pk(self.addresses[0]), pk)
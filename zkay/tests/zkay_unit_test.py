@@ -1,3 +1,4 @@
+import tempfile
 from unittest import TestCase
 from abc import ABCMeta
 
@@ -17,3 +18,15 @@ class ZkayTestCase(TestCase, metaclass=ABCMeta):
     def tearDown(self) -> None:
         super().tearDown()
         cfg._is_unit_test = self.old_was_unit_test
+
+    def use_temp_data_dir(self) -> str:
+        """Let cfg.data_dir point to a fresh temporary directory until the end of the current test."""
+        old_data_dir = cfg.data_dir
+        tmp_dir = tempfile.TemporaryDirectory()
+        cfg._data_dir = tmp_dir.name
+
+        def restore():
+            cfg._data_dir = old_data_dir
+            tmp_dir.cleanup()
+        self.addCleanup(restore)
+        return tmp_dir.name
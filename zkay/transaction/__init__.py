@@ -6,6 +6,7 @@ Submodules
 ==========
 * :py:mod:`.interface`: Runtime API interface
 * :py:mod:`.offchain`: Offchain simulator base class with common functionality
+* :py:mod:`.pk_cache`: Persistent cache for public keys requested from the pki
 * :py:mod:`.runtime`: Static class which provides access to the individual API backend singletons.
 * :py:mod:`.types`: Type wrapper classes (for safer API interactions) used by the Runtime API.
 
@@ -73,10 +73,72 @@ class Web3Blockchain(ZkayBlockchainInterface):
         return PublicKeyValue(self._req_state_var(self.pki_contract(crypto_params.crypto_name), 'getPk', address),
                               params=crypto_params)
 
+    def _req_public_keys(self, addresses: List[Union[bytes, str]], crypto_params: CryptoParams) -> List[Optional[PublicKeyValue]]:
+        if not addresses:
+            return []
+        try:
+            keys, announced = self._req_state_var(self.pki_contract(crypto_params.crypto_name), 'getPks', addresses)
+        except BlockChainError:
+            # PKI contracts deployed by older zkay versions do not provide the batch getter
+            return super()._req_public_keys(addresses, crypto_params)
+        return [PublicKeyValue(key, params=crypto_params) if is_announced else None for key, is_announced in zip(keys, announced)]
+
     def _announce_public_key(self, address: Union[bytes, str], pk: Tuple[int, ...], crypto_params: CryptoParams) -> Any:
         with log_context(f'announcePk'):
             return self._transact(self.pki_contract(crypto_params.crypto_name), address, 'announcePk', pk)
 
+    def _announce_public_keys(self, announcements: List[Tuple[Union[bytes, str], Tuple[int, ...]]], crypto_params: CryptoParams) -> List[Any]:
+        # Submit all transactions with locally managed nonces before waiting for the first receipt
+        pki_contract = self.pki_contract(crypto_params.crypto_name)
+        nonces = {}
+        with log_context(f'announcePk'):
+            try:
+                tx_hashes = []
+                for sender, pk in announcements:
+                    if sender not in nonces:
+                        nonces[sender] = self.w3.eth.getTransactionCount(sender, 'pending')
+                    fct = pki_contract.functions['announcePk'](pk)
+                    tx = {'from': sender, 'gas': self._gas_heuristic(sender, fct), 'nonce': nonces[sender]}
+                    tx_hashes.append(fct.transact(tx))
+                    nonces[sender] += 1
+                tx_receipts = [self.w3.eth.waitForTransactionReceipt(tx_hash) for tx_hash in tx_hashes]
+            except Exception as e:
+                raise BlockChainError(e.args)
+
+            for tx_receipt in tx_receipts:
+                if tx_receipt['status'] == 0:
+                    raise TransactionFailedException("Transaction failed")
+                gas = tx_receipt['gasUsed']
+                zk_print(f"Consumed gas: {gas}")
+                my_logging.data('gas', gas)
+        return tx_receipts
+
+    def _pki_cache_id(self, crypto_params: CryptoParams) -> Optional[str]:
+        if self.is_debug_backend():
+            # Debug chains are recreated with the same chain id and contract addresses, cached keys could be stale
+            return None
+        try:
+            chain_id = self.w3.eth.chainId
+        except Exception as e:
+            raise BlockChainError(e.args)
+        return f'{chain_id}:{self.pki_contract(crypto_params.crypto_name).address}:{crypto_params.crypto_name}'
+
+    def _req_pk_announcements(self, from_block: Optional[int], crypto_params: CryptoParams) -> Tuple[int, Dict[AddressValue, int]]:
+        try:
+            latest_block = self.w3.eth.blockNumber
+            if from_block is None or from_block >= latest_block:
+                return latest_block, {}
+            event = self.pki_contract(crypto_params.crypto_name).events.PkAnnounced
+            logs = event.getLogs(fromBlock=from_block + 1, toBlock=latest_block)
+        except Exception as e:
+            raise BlockChainError(e.args)
+
+        announcements = {}
+        for log in logs:
+            owner = AddressValue(log['args']['owner'])
+            announcements[owner] = max(announcements.get(owner, 0), log['blockNumber'])
+        return latest_block, announcements
+
     def _req_state_var(self, contract_handle, name: str, *indices) -> Any:
         try:
             return contract_handle.functions[name](*indices).call()
@@ -4,6 +4,9 @@ This package contains the cryptography backends.
 ==========
 Submodules
 ==========
+* :py:mod:`.bigint`: Modular big integer arithmetic (uses gmpy2 if installed)
+* :py:mod:`.benchmark`: Micro-benchmarks for all crypto backends (JSON output, regression check against a baseline)
+* :py:mod:`.executor`: Executors which run crypto backend operations inline or in worker processes
 * :py:mod:`.dummy`: Fast but insecure key generation (pk == sk == address) and encryption (enc = (+), dec = (-)) for debugging
 * :py:mod:`.rsa_pkcs15`: Slow, secure rsa key generation and encryption using RSA PKCS1.5 padding
 * :py:mod:`.rsa_oaep`: Very slow, secure rsa key generation and encryption using RSA OAEP padding
@@ -25,6 +25,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+from functools import lru_cache
+from typing import List
+
+from zkay.transaction.crypto.bigint import invert, powmod
+
 BASE_ORDER = 21888242871839275222246405745257275088548364400416034343698204186575808495617
 
 CURVE_ORDER = 2736030358979909402780800718157159386076813972158567259200215660948447373041
@@ -55,16 +60,10 @@ class FieldElement(object):
         return self * a.inv()
 
     def exp(self, e):
-        e = format(e, '0256b')
-        ret = self.t(1)
-        for c in e:
-            ret = ret * ret
-            if int(c):
-                ret = ret * self
-        return ret
+        return self.t(powmod(self.s, e, self.m))
 
     def inv(self):
-        return self.exp(self.m - 2)
+        return self.t(invert(self.s, self.m))
 
     def __eq__(self, a):
         return self.s == a.s
@@ -117,30 +116,27 @@ class Point(object):
         self.v = v
 
     def __add__(self, a):
-        (u1, v1) = (self.u, self.v)
-        (u2, v2) = (a.u, a.v)
-        u3 = (u1*v2 + v1*u2) / (Fq.ONE + BABYJUBJUB_D * u1 * u2 * v1 * v2)
-        v3 = (v1 * v2 - BABYJUBJUB_A * u1 * u2) / (Fq.ONE - BABYJUBJUB_D * u1 * u2 * v1 * v2)
-        return Point(u3, v3)
+        return (ExtendedPoint.from_affine(self) + ExtendedPoint.from_affine(a)).to_affine()
 
     def double(self):
-        return self + self
+        return ExtendedPoint.from_affine(self).double().to_affine()
 
     def negate(self):
         return Point(-self.u, self.v)
 
     def __mul__(self, s):
-        s = format(s.s, '0256b')
-        ret = self.ZERO
-        for c in s:
-            ret = ret.double()
-            if int(c):
-                ret = ret + self
-        return ret
+        return ExtendedPoint.from_affine(self).mul(s.s).to_affine()
+
+    def mul_fixed_base(self, s):
+        """Multiply by s using a (cached) precomputed table for this point, use for points which are multiplied often."""
+        return fixed_base_table(self).mul(s.s).to_affine()
 
     def __eq__(self, a):
         return self.u == a.u and self.v == a.v
 
+    def __hash__(self):
+        return hash((self.u.s, self.v.s))
+
     def __str__(self):
         return 'Point(%s, %s)' % (self.u, self.v)
 
@@ -148,4 +144,165 @@ class Point(object):
 Point.ZERO = Point(Fq.ZERO, Fq.ONE)
 Point.GENERATOR = Point(Fq(BABYJUBJUB_GENERATOR_X), Fq(BABYJUBJUB_GENERATOR_Y))
 
+
+#
+# Extended coordinates
+#
+
+_q = BASE_ORDER
+_a = BABYJUBJUB_A.s
+_d = BABYJUBJUB_D.s
+
+
+class ExtendedPoint(object):
+    """
+    Point in extended twisted Edwards coordinates (X : Y : T : Z) with u = X/Z, v = Y/Z and T = X*Y/Z.
+
+    Addition and doubling (Hisil et al., "Twisted Edwards Curves Revisited", 2008) do not require any
+    field inversions, only the conversion back to affine coordinates does.
+    The coordinates are plain ints (mod BASE_ORDER) for performance reasons.
+    """
+    __slots__ = ['x', 'y', 't', 'z']
+
+    # Width of the signed windows used for variable-base scalar multiplication
+    WNAF_WIDTH = 5
+
+    def __init__(self, x: int, y: int, t: int, z: int):
+        self.x = x
+        self.y = y
+        self.t = t
+        self.z = z
+
+    @staticmethod
+    def from_affine(p: Point) -> 'ExtendedPoint':
+        return ExtendedPoint(p.u.s, p.v.s, (p.u.s * p.v.s) % _q, 1)
+
+    def to_affine(self) -> Point:
+        z_inv = invert(self.z, _q)
+        return Point(Fq(self.x * z_inv), Fq(self.y * z_inv))
+
+    @staticmethod
+    def batch_to_affine(points: List['ExtendedPoint']) -> List[Point]:
+        """Convert all points to affine coordinates using a single field inversion (Montgomery's trick)."""
+        prefix = [1]
+        for p in points:
+            prefix.append((prefix[-1] * p.z) % _q)
+        inv = invert(prefix[-1], _q)
+        ret = [None] * len(points)
+        for i in reversed(range(len(points))):
+            z_inv = (inv * prefix[i]) % _q
+            inv = (inv * points[i].z) % _q
+            ret[i] = Point(Fq(points[i].x * z_inv), Fq(points[i].y * z_inv))
+        return ret
+
+    def __add__(self, a: 'ExtendedPoint') -> 'ExtendedPoint':
+        # add-2008-hwcd (complete for BabyJubJub, as d is not a square)
+        aa = self.x * a.x
+        bb = self.y * a.y
+        cc = (self.t * _d % _q) * a.t
+        dd = self.z * a.z
+        e = ((self.x + self.y) * (a.x + a.y) - aa - bb) % _q
+        f = (dd - cc) % _q
+        g = (dd + cc) % _q
+        h = (bb - _a * aa) % _q
+        return ExtendedPoint(e * f % _q, g * h % _q, e * h % _q, f * g % _q)
+
+    def double(self) -> 'ExtendedPoint':
+        # dbl-2008-hwcd
+        aa = self.x * self.x
+        bb = self.y * self.y
+        cc = 2 * self.z * self.z
+        dd = _a * aa
+        e = ((self.x + self.y) * (self.x + self.y) - aa - bb) % _q
+        g = (dd + bb) % _q
+        f = (g - cc) % _q
+        h = (dd - bb) % _q
+        return ExtendedPoint(e * f % _q, g * h % _q, e * h % _q, f * g % _q)
+
+    def negate(self) -> 'ExtendedPoint':
+        return ExtendedPoint(-self.x % _q, self.y, -self.t % _q, self.z)
+
+    def mul(self, s: int) -> 'ExtendedPoint':
+        """Variable-base scalar multiplication using the width-w NAF of s."""
+        digits = _wnaf(s, self.WNAF_WIDTH)
+        if not digits:
+            return ExtendedPoint.ZERO
+
+        # Odd multiples P, 3P, 5P, ..., (2^(w-1) - 1)P
+        odd = [self]
+        twice = self.double()
+        for _ in range((1 << (self.WNAF_WIDTH - 2)) - 1):
+            odd.append(odd[-1] + twice)
+
+        acc = ExtendedPoint.ZERO
+        for digit in reversed(digits):
+            acc = acc.double()
+            if digit > 0:
+                acc = acc + odd[digit >> 1]
+            elif digit < 0:
+                acc = acc + odd[(-digit) >> 1].negate()
+        return acc
+
+
+ExtendedPoint.ZERO = ExtendedPoint(0, 1, 0, 1)
+
 assert Point.ZERO + Point.ZERO == Point.ZERO
+
+
+def _wnaf(s: int, w: int) -> List[int]:
+    """Return the width-w non-adjacent form of s >= 0 (least significant digit first)."""
+    digits = []
+    while s > 0:
+        if s & 1:
+            digit = s & ((1 << w) - 1)
+            if digit >= 1 << (w - 1):
+                digit -= 1 << w
+            s -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        s >>= 1
+    return digits
+
+
+class FixedBaseTable(object):
+    """
+    Precomputed multiples j * 2^(w*i) * P of a fixed base point P (for all windows i and digits 0 < j < 2^w).
+
+    A scalar multiplication then only needs one addition per non-zero w-bit window of the scalar and no doublings.
+    """
+
+    WINDOW_BITS = 4
+
+    def __init__(self, base: Point):
+        w = self.WINDOW_BITS
+        windows = (CURVE_ORDER.bit_length() + w - 1) // w
+        self.max_bits = windows * w
+
+        self.rows = []
+        b = ExtendedPoint.from_affine(base)
+        for _ in range(windows):
+            row = [b]
+            for _ in range((1 << w) - 2):
+                row.append(row[-1] + b)
+            self.rows.append(row)
+            b = row[-1] + b
+
+    def mul(self, s: int) -> ExtendedPoint:
+        assert 0 <= s < (1 << self.max_bits)
+        w, mask = self.WINDOW_BITS, (1 << self.WINDOW_BITS) - 1
+        acc = ExtendedPoint.ZERO
+        i = 0
+        while s:
+            digit = s & mask
+            if digit:
+                acc = acc + self.rows[i][digit - 1]
+            s >>= w
+            i += 1
+        return acc
+
+
+@lru_cache(maxsize=64)
+def fixed_base_table(base: Point) -> FixedBaseTable:
+    """Return the (cached) fixed base table for base (e.g. the generator or a frequently used public key)."""
+    return FixedBaseTable(base)
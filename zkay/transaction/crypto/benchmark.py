@@ -0,0 +1,215 @@
+"""
+Micro-benchmarks for all crypto backends which are registered in zkay.transaction.runtime.
+
+For each backend (and for backends with variable key sizes, for each key size), the time required for key generation,
+key loading, encryption, decryption and (for homomorphic backends) homomorphic operations and re-randomization is
+measured. The results are written as JSON, with percentiles in milliseconds per operation.
+
+Usage::
+
+    python -m zkay.transaction.crypto.benchmark [-b BACKEND ...] [-n RUNS] [-o result.json]
+    python -m zkay.transaction.crypto.benchmark --compare baseline.json [--tolerance 0.25]
+
+In compare mode, the exit code is 1 if the median time of any operation regressed by more than the tolerance
+with respect to the baseline.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from zkay.config import cfg
+from zkay.transaction.crypto import bigint
+from zkay.transaction.crypto.meta import cryptoparams
+from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.interface import ZkayHomomorphicCryptoInterface
+from zkay.transaction.keystore import SimpleKeystore
+from zkay.transaction.runtime import _crypto_classes
+from zkay.transaction.types import AddressValue, CipherValue
+
+VARIABLE_KEY_BITS = {
+    'paillier': [320, 1024, 2048],
+    'rsa-oaep': [1024, 2048, 3072],
+    'rsa-pkcs1.5': [1024, 2048, 3072],
+}
+"""Key sizes to benchmark for backends with configurable key size (all other backends use their fixed key size)"""
+
+PERCENTILES = [50, 90, 99]
+
+
+@contextlib.contextmanager
+def _key_size(crypto_backend: str, key_bits: int):
+    """Temporarily change the key size of crypto_backend (only for backends in VARIABLE_KEY_BITS)."""
+    params = cryptoparams[crypto_backend]
+    old = dict(params)
+    key_bytes = key_bits // 8
+    params['key_bits'] = key_bits
+    if crypto_backend == 'paillier':
+        params['cipher_payload_bytes'] = 2 * key_bytes
+        params['rnd_bytes'] = key_bytes
+    elif crypto_backend.startswith('rsa'):
+        params['cipher_payload_bytes'] = key_bytes
+        if crypto_backend == 'rsa-pkcs1.5':
+            params['rnd_bytes'] = key_bytes - 3 - 32
+    try:
+        yield
+    finally:
+        params.clear()
+        params.update(old)
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    """Return summary statistics (in milliseconds) for samples (in seconds)."""
+    samples = sorted(s * 1000 for s in samples)
+    stats = {'runs': len(samples), 'mean': sum(samples) / len(samples), 'min': samples[0], 'max': samples[-1]}
+    for p in PERCENTILES:
+        # Nearest-rank percentile
+        stats[f'p{p}'] = samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+    return {key: round(val, 4) if isinstance(val, float) else val for key, val in stats.items()}
+
+
+def _measure(results: Dict[str, Any], operation: str, fct: Callable[[int], Any], runs: int) -> bool:
+    """Store the statistics of runs calls of fct in results[operation], return false if fct failed."""
+    samples = []
+    try:
+        for i in range(runs):
+            start = time.perf_counter()
+            fct(i)
+            samples.append(time.perf_counter() - start)
+    except NotImplementedError:
+        # Operation is not supported by this backend
+        return False
+    except Exception as e:
+        results[operation] = {'error': f'{type(e).__name__}: {e}'}
+        return False
+    results[operation] = _stats(samples)
+    return True
+
+
+def benchmark_backend(crypto_backend: str, runs: int, keygen_runs: int) -> Dict[str, Any]:
+    """Benchmark all operations of crypto_backend with the currently configured key size."""
+    crypto_cls = _crypto_classes[crypto_backend]
+    keystore = SimpleKeystore(None, CryptoParams(crypto_backend))
+    crypto = crypto_cls(keystore)
+    rnd = random.Random(42)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        old_data_dir, cfg._data_dir = cfg._data_dir, data_dir
+        try:
+            if not _measure(results, 'keygen', lambda i: crypto._generate_or_load_key_pair(f'{i + 1:040x}'), keygen_runs):
+                return results
+            _measure(results, 'key_load', lambda i: crypto._generate_or_load_key_pair(f'{1:040x}'), runs)
+
+            me = AddressValue(1)
+            key_pair = crypto._generate_or_load_key_pair(f'{1:040x}')
+        finally:
+            cfg._data_dir = old_data_dir
+
+    keystore.local_key_pairs[me] = key_pair
+    keystore.local_pk_store[me] = key_pair.pk
+
+    plains = [rnd.randrange(1 << 32) for _ in range(runs)]
+    ciphers: List[Optional[CipherValue]] = [None] * runs
+
+    def enc(i: int):
+        ciphers[i], _ = crypto.enc(plains[i], me, me)
+    if not _measure(results, 'enc', enc, runs):
+        return results
+
+    _measure(results, 'dec', lambda i: crypto.dec(ciphers[i], me), runs)
+    _measure(results, 'dec_32bit', lambda i: crypto.dec(ciphers[i], me, 32), runs)
+
+    if isinstance(crypto, ZkayHomomorphicCryptoInterface):
+        pk = key_pair.pk[:]
+        _measure(results, 'hom_add', lambda i: crypto.do_op('+', pk, ciphers[i], ciphers[i - 1]), runs)
+        _measure(results, 'hom_scalar_mul', lambda i: crypto.do_op('*', pk, ciphers[i], plains[i - 1]), runs)
+        _measure(results, 'rerand', lambda i: crypto.do_rerand(ciphers[i], pk), runs)
+    return results
+
+
+def run_benchmarks(crypto_backends: List[str], runs: int, keygen_runs: int) -> Dict[str, Any]:
+    """Benchmark crypto_backends and return the JSON-serializable results."""
+    results = {}
+    for crypto_backend in crypto_backends:
+        results[crypto_backend] = {}
+        for key_bits in VARIABLE_KEY_BITS.get(crypto_backend, [cryptoparams[crypto_backend]['key_bits']]):
+            print(f'Benchmarking {crypto_backend} ({key_bits} bit keys)...', file=sys.stderr)
+            with _key_size(crypto_backend, key_bits):
+                results[crypto_backend][str(key_bits)] = benchmark_backend(crypto_backend, runs, keygen_runs)
+
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'gmpy2': bigint.has_gmpy2,
+            'runs': runs,
+            'keygen_runs': keygen_runs,
+            'unit': 'ms',
+        },
+        'results': results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every operation whose median time regressed by more than tolerance w.r.t. baseline."""
+    regressions = []
+    for crypto_backend, key_sizes in results['results'].items():
+        for key_bits, operations in key_sizes.items():
+            for operation, stats in operations.items():
+                base_stats = baseline['results'].get(crypto_backend, {}).get(key_bits, {}).get(operation, {})
+                if 'p50' not in stats or 'p50' not in base_stats:
+                    if 'error' in stats and 'p50' in base_stats:
+                        regressions.append(f'{crypto_backend}/{key_bits}/{operation}: failed ({stats["error"]})')
+                    continue
+                if stats['p50'] > base_stats['p50'] * (1 + tolerance):
+                    regressions.append(f'{crypto_backend}/{key_bits}/{operation}: median {stats["p50"]} ms '
+                                       f'(baseline {base_stats["p50"]} ms, +{stats["p50"] / base_stats["p50"] - 1:.0%})')
+    return regressions
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the zkay crypto backends.')
+    parser.add_argument('-b', '--backend', dest='backends', action='append', choices=list(_crypto_classes.keys()),
+                        help='Backend to benchmark (can be repeated, default: all)')
+    parser.add_argument('-n', '--runs', type=int, default=50, help='Number of runs per operation')
+    parser.add_argument('--keygen-runs', type=int, default=3, help='Number of runs for key generation')
+    parser.add_argument('-o', '--output', help='Write the results to this file instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare the results with this baseline result file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown in compare mode')
+    a = parser.parse_args(args)
+
+    old_verbosity, cfg.verbosity = cfg.verbosity, 0
+    try:
+        # Some backends print progress information, keep stdout clean for the results
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_benchmarks(a.backends or list(_crypto_classes.keys()), a.runs, a.keygen_runs)
+    finally:
+        cfg.verbosity = old_verbosity
+
+    if a.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(a.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if a.compare is not None:
+        with open(a.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, a.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION: {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
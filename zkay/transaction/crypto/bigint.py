@@ -0,0 +1,47 @@
+"""
+Modular big integer arithmetic, which is backed by GMP (via gmpy2) if it is installed and by python ints otherwise.
+
+All functions take and return python ints and compute the same results with either engine.
+"""
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+def _int_powmod(base: int, exp: int, mod: int) -> int:
+    return pow(base, exp, mod)
+
+
+def _int_invert(x: int, mod: int) -> int:
+    return pow(x, -1, mod)
+
+
+def _gmp_powmod(base: int, exp: int, mod: int) -> int:
+    try:
+        return int(gmpy2.powmod(base, exp, mod))
+    except ZeroDivisionError:
+        raise ValueError('base is not invertible for the given modulus')
+
+
+def _gmp_invert(x: int, mod: int) -> int:
+    try:
+        inv = int(gmpy2.invert(x, mod))
+    except ZeroDivisionError:
+        inv = 0
+    if inv == 0 and mod != 1:
+        # Older gmpy2 versions return 0 instead of raising
+        raise ValueError('base is not invertible for the given modulus')
+    return inv
+
+
+has_gmpy2 = gmpy2 is not None
+"""True if gmpy2 is installed and used for all computations"""
+
+# powmod(base, exp, mod): base^exp mod mod (negative exponents require base to be invertible, ValueError otherwise)
+# invert(x, mod): inverse of x modulo mod (ValueError if x is not invertible)
+if has_gmpy2:
+    powmod, invert = _gmp_powmod, _gmp_invert
+else:
+    powmod, invert = _int_powmod, _int_invert
@@ -0,0 +1,106 @@
+"""
+Pure python implementation of the Chaskey-LTS block cipher in CBC mode (without padding).
+
+This is byte-for-byte compatible with zkay.ChaskeyLtsCbc from the jsnark circuit builder (which is also what the
+zkay circuits implement), so that ecdh-chaskey encryption does not require launching a JVM.
+"""
+import struct
+from typing import List
+
+BLOCK_SIZE = 16
+KEY_SIZE = 16
+ROUNDS = 16
+
+_MASK = 0xffffffff
+
+
+def _rotl(x: int, n: int) -> int:
+    return ((x << n) | (x >> (32 - n))) & _MASK
+
+
+def _rotr(x: int, n: int) -> int:
+    return ((x >> n) | (x << (32 - n))) & _MASK
+
+
+def _encrypt_block(k: List[int], block: bytes) -> bytes:
+    v0, v1, v2, v3 = struct.unpack('<4I', block)
+    v0, v1, v2, v3 = v0 ^ k[0], v1 ^ k[1], v2 ^ k[2], v3 ^ k[3]
+    for _ in range(ROUNDS):
+        v0 = (v0 + v1) & _MASK
+        v1 = _rotl(v1, 5) ^ v0
+        v0 = _rotl(v0, 16)
+        v2 = (v2 + v3) & _MASK
+        v3 = _rotl(v3, 8) ^ v2
+        v0 = (v0 + v3) & _MASK
+        v3 = _rotl(v3, 13) ^ v0
+        v2 = (v2 + v1) & _MASK
+        v1 = _rotl(v1, 7) ^ v2
+        v2 = _rotl(v2, 16)
+    return struct.pack('<4I', v0 ^ k[0], v1 ^ k[1], v2 ^ k[2], v3 ^ k[3])
+
+
+def _decrypt_block(k: List[int], block: bytes) -> bytes:
+    v0, v1, v2, v3 = struct.unpack('<4I', block)
+    v0, v1, v2, v3 = v0 ^ k[0], v1 ^ k[1], v2 ^ k[2], v3 ^ k[3]
+    for _ in range(ROUNDS):
+        v2 = _rotr(v2, 16)
+        v1 = _rotr(v1 ^ v2, 7)
+        v2 = (v2 - v1) & _MASK
+        v3 = _rotr(v3 ^ v0, 13)
+        v0 = (v0 - v3) & _MASK
+        v3 = _rotr(v3 ^ v2, 8)
+        v2 = (v2 - v3) & _MASK
+        v0 = _rotr(v0, 16)
+        v1 = _rotr(v1 ^ v0, 5)
+        v0 = (v0 - v1) & _MASK
+    return struct.pack('<4I', v0 ^ k[0], v1 ^ k[1], v2 ^ k[2], v3 ^ k[3])
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return bytes(x ^ y for x, y in zip(a, b))
+
+
+def _check_args(key: bytes, iv: bytes, data: bytes):
+    if len(key) != KEY_SIZE or len(iv) != BLOCK_SIZE:
+        raise ValueError('Wrong size')
+    if len(data) % BLOCK_SIZE != 0:
+        raise ValueError('Input not aligned to block size')
+
+
+def encrypt(key: bytes, iv: bytes, plain: bytes) -> bytes:
+    """
+    Encrypt plain using Chaskey-LTS in CBC mode.
+
+    :param key: 16 byte key
+    :param iv: 16 byte initialization vector
+    :param plain: plain text, length must be a multiple of the block size
+    :raise ValueError: if any argument has an invalid size
+    :return: the cipher text (without iv)
+    """
+    _check_args(key, iv, plain)
+    k = struct.unpack('<4I', key)
+    prev, out = iv, []
+    for i in range(0, len(plain), BLOCK_SIZE):
+        prev = _encrypt_block(k, _xor(plain[i:i + BLOCK_SIZE], prev))
+        out.append(prev)
+    return b''.join(out)
+
+
+def decrypt(key: bytes, iv: bytes, cipher: bytes) -> bytes:
+    """
+    Decrypt cipher using Chaskey-LTS in CBC mode.
+
+    :param key: 16 byte key
+    :param iv: 16 byte initialization vector
+    :param cipher: cipher text (without iv), length must be a multiple of the block size
+    :raise ValueError: if any argument has an invalid size
+    :return: the plain text
+    """
+    _check_args(key, iv, cipher)
+    k = struct.unpack('<4I', key)
+    prev, out = iv, []
+    for i in range(0, len(cipher), BLOCK_SIZE):
+        block = cipher[i:i + BLOCK_SIZE]
+        out.append(_xor(_decrypt_block(k, block), prev))
+        prev = block
+    return b''.join(out)
@@ -1,46 +1,214 @@
+import hashlib
 import os
 import secrets
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from Crypto.Cipher import AES
 
 from zkay.config import cfg, zk_print
-from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar
-from zkay.transaction.interface import PrivateKeyValue, PublicKeyValue, KeyPair
+from zkay.jsnark_interface.crypto_worker import crypto_worker
+from zkay.transaction.interface import PrivateKeyValue, PublicKeyValue, KeyPair, ZkayKeystoreInterface
 from zkay.transaction.interface import ZkayCryptoInterface
-from zkay.utils.run_command import run_command
+
+
+class SharedKeyCache:
+    """
+    Bounded LRU cache for ECDH shared keys, keyed by (own secret key, peer public key).
+
+    If persist is true, keys are additionally appended to a file in cfg.data_dir (one file per secret key).
+    Each record is encrypted with AES-GCM under a key which is derived from the secret key, so only the
+    owner of the secret key can read them.
+    """
+
+    _nonce_bytes = 12
+    _tag_bytes = 16
+    _pk_bytes = 32
+    _key_bytes = 16
+    _record_bytes = _nonce_bytes + _pk_bytes + _key_bytes + _tag_bytes
+
+    def __init__(self, max_size: int, persist: bool = False):
+        self.max_size = max_size
+        self.persist = persist
+        self._keys: Dict[Tuple[int, int], bytes] = OrderedDict()
+        self._persisted: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, my_sk: int, other_pk: int) -> Optional[bytes]:
+        with self._lock:
+            if self.persist and my_sk not in self._persisted:
+                self._load(my_sk)
+            key = self._keys.get((my_sk, other_pk))
+            if key is not None:
+                self._keys.move_to_end((my_sk, other_pk))
+            return key
+
+    def put(self, my_sk: int, other_pk: int, key: bytes):
+        with self._lock:
+            self._insert(my_sk, other_pk, key)
+            if self.persist and other_pk not in self._persisted.setdefault(my_sk, set()):
+                self._store(my_sk, other_pk, key)
+
+    def _insert(self, my_sk: int, other_pk: int, key: bytes):
+        if self.max_size <= 0:
+            return
+        self._keys[(my_sk, other_pk)] = key
+        self._keys.move_to_end((my_sk, other_pk))
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    @staticmethod
+    def _derive(my_sk: int, purpose: bytes) -> bytes:
+        return hashlib.sha256(purpose + my_sk.to_bytes(32, byteorder='big')).digest()
+
+    def _filename(self, my_sk: int) -> str:
+        owner_id = self._derive(my_sk, b'zkay-ecdh-cache-id').hex()[:32]
+        return os.path.join(cfg.data_dir, 'keys', f'ecdh_shared_{owner_id}.bin')
+
+    def _load(self, my_sk: int):
+        persisted = self._persisted.setdefault(my_sk, set())
+        filename = self._filename(my_sk)
+        if not os.path.exists(filename):
+            return
+
+        enc_key = self._derive(my_sk, b'zkay-ecdh-cache-key')
+        with open(filename, 'rb') as f:
+            data = f.read()
+        for off in range(0, len(data) - self._record_bytes + 1, self._record_bytes):
+            record = data[off:off + self._record_bytes]
+            nonce, payload, tag = record[:self._nonce_bytes], record[self._nonce_bytes:-self._tag_bytes], record[-self._tag_bytes:]
+            try:
+                plain = AES.new(enc_key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(payload, tag)
+            except ValueError:
+                # Corrupted record, ignore
+                continue
+            other_pk = int.from_bytes(plain[:self._pk_bytes], byteorder='big')
+            persisted.add(other_pk)
+            self._insert(my_sk, other_pk, plain[self._pk_bytes:])
+
+    def _store(self, my_sk: int, other_pk: int, key: bytes):
+        enc_key = self._derive(my_sk, b'zkay-ecdh-cache-key')
+        nonce = secrets.token_bytes(self._nonce_bytes)
+        payload, tag = AES.new(enc_key, AES.MODE_GCM, nonce=nonce).encrypt_and_digest(other_pk.to_bytes(self._pk_bytes, byteorder='big') + key)
+
+        filename = self._filename(my_sk)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'ab') as f:
+            f.write(nonce + payload + tag)
+        self._persisted[my_sk].add(other_pk)
 
 
 class EcdhBase(ZkayCryptoInterface):
 
+    def __init__(self, keystore: ZkayKeystoreInterface):
+        super().__init__(keystore)
+        self.shared_key_cache = SharedKeyCache(cfg.ecdh_shared_key_cache_size, cfg.ecdh_persist_shared_keys)
+
+    @staticmethod
+    def _gen_keypairs(rnds: List[bytes]) -> List[Tuple[int, int]]:
+        keys = crypto_worker().request('keypair', *[rnd.hex() for rnd in rnds])
+        return [(int(pk, 16), int(sk, 16)) for pk, sk in zip(keys[::2], keys[1::2])]
+
     @staticmethod
-    def _gen_keypair(rnd: bytes):
-        keys, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}', 'zkay.ZkayECDHGenerator', rnd.hex()])
-        keys = keys.splitlines()[-2:]
-        return int(keys[0], 16), int(keys[1], 16)
+    def _gen_keypair(rnd: bytes) -> Tuple[int, int]:
+        return EcdhBase._gen_keypairs([rnd])[0]
 
     @staticmethod
-    def _ecdh_sha256(other_pk: int, my_sk: int):
-        ret, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}', 'zkay.ZkayECDHGenerator', hex(my_sk)[2:], hex(other_pk)[2:]])
-        key = ret.splitlines()[-1]
+    def _compute_ecdh_sha256(other_pk: int, my_sk: int) -> bytes:
+        key, = crypto_worker().request('ecdh', hex(my_sk)[2:], hex(other_pk)[2:])
         return int(key, 16).to_bytes(16, byteorder='big')
 
+    def _ecdh_sha256(self, other_pk: int, my_sk: int) -> bytes:
+        key = self.shared_key_cache.get(my_sk, other_pk)
+        if key is None:
+            key = self._compute_ecdh_sha256(other_pk, my_sk)
+            self.shared_key_cache.put(my_sk, other_pk, key)
+        return key
+
+    def _prefetch_shared_keys(self, my_sk: int, other_pks: Iterable[int]):
+        """Compute all missing shared keys for my_sk with a single crypto worker request."""
+        missing = [pk for pk in dict.fromkeys(other_pks) if self.shared_key_cache.get(my_sk, pk) is None]
+        # Keys which would not fit into the cache are computed on demand
+        missing = missing[:max(0, self.shared_key_cache.max_size)]
+        if len(missing) > 1:
+            keys = crypto_worker().request('ecdh', hex(my_sk)[2:], *[hex(pk)[2:] for pk in missing])
+            for pk, key in zip(missing, keys):
+                self.shared_key_cache.put(my_sk, pk, int(key, 16).to_bytes(16, byteorder='big'))
+
+    def enc_many_raw(self, plains: List[int], sk: Any, pks: List[Any]) -> List[Tuple[List[int], None]]:
+        self._prefetch_shared_keys(sk, pks)
+        return super().enc_many_raw(plains, sk, pks)
+
+    def dec_many_raw(self, ciphers: List[Tuple[int, ...]], sk: Any,
+                     plain_bits: Optional[int] = None) -> List[Tuple[int, None]]:
+        # The last element of each cipher is the public key of its sender
+        self._prefetch_shared_keys(sk, [cipher[-1] for cipher in ciphers])
+        return super().dec_many_raw(ciphers, sk, plain_bits)
+
+    # Key file format: magic | version (1 byte) | seed randomness (32 bytes) | pk (32 bytes) | sk (32 bytes)
+    # Legacy key files only contain the 32 bytes of seed randomness
+    key_file_magic = b'ZKEC'
+    key_file_version = 1
+
+    def _write_key_file(self, key_file: str, rnd: bytes, pk: int, sk: int):
+        tmp_file = f'{key_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(self.key_file_magic + bytes([self.key_file_version]))
+            f.write(rnd + pk.to_bytes(32, byteorder='big') + sk.to_bytes(32, byteorder='big'))
+        os.replace(tmp_file, key_file)
+
+    def _read_key_file(self, key_file: str) -> Tuple[bytes, Optional[Tuple[int, int]]]:
+        """Return (seed randomness, (pk, sk) or None if the key file uses the legacy format)."""
+        with open(key_file, 'rb') as f:
+            data = f.read()
+        if len(data) == 32:
+            return data, None
+
+        header_len = len(self.key_file_magic) + 1
+        if data[:len(self.key_file_magic)] != self.key_file_magic or len(data) != header_len + 96:
+            raise ValueError(f'Invalid EC key file {key_file}')
+        if data[len(self.key_file_magic)] != self.key_file_version:
+            raise ValueError(f'Unsupported EC key file version {data[len(self.key_file_magic)]} in {key_file}')
+        data = data[header_len:]
+        pk = int.from_bytes(data[32:64], byteorder='big')
+        sk = int.from_bytes(data[64:96], byteorder='big')
+        return data[:32], (pk, sk)
+
+    @staticmethod
+    def _key_file(address: str) -> str:
+        return os.path.join(cfg.data_dir, 'keys', f'ec_{address}.bin')
+
+    def _generate_key_files(self, addresses: List[str]):
+        # Worker processes would each start their own JVM, all keys are derived with a single crypto worker request instead
+        missing = [address for address in addresses if not os.path.exists(self._key_file(address))]
+        if not missing:
+            return
+        os.makedirs(os.path.join(cfg.data_dir, 'keys'), exist_ok=True)
+        rnds = [secrets.token_bytes(32) for _ in missing]
+        for address, rnd, (pk, sk) in zip(missing, rnds, self._gen_keypairs(rnds)):
+            self._write_key_file(self._key_file(address), rnd, pk, sk)
+
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
-        key_file = os.path.join(cfg.data_dir, 'keys', f'ec_{address}.bin')
+        key_file = self._key_file(address)
         os.makedirs(os.path.dirname(key_file), exist_ok=True)
         if not os.path.exists(key_file):
             # Generate fresh randomness for ec private key
             zk_print(f'Key pair not found, generating new EC secret...')
             rnd = secrets.token_bytes(32)
 
-            # Store randomness so that address will have the same key every time
-            with open(key_file, 'wb') as f:
-                f.write(rnd)
+            # Store randomness and derived keys so that address will have the same key every time
+            pk, sk = self._gen_keypair(rnd)
+            self._write_key_file(key_file, rnd, pk, sk)
             zk_print('done')
         else:
-            # Restore saved randomness
+            # Restore saved keys
             zk_print(f'EC secret found, loading from file {key_file}')
-            with open(key_file, 'rb') as f:
-                rnd = f.read()
-
-        # Derive keys from randomness
-        pk, sk = self._gen_keypair(rnd)
+            rnd, keys = self._read_key_file(key_file)
+            if keys is None:
+                # Derive keys from randomness once and upgrade the legacy key file
+                keys = self._gen_keypair(rnd)
+                self._write_key_file(key_file, rnd, *keys)
+            pk, sk = keys
 
         return KeyPair(PublicKeyValue([pk], params=self.params), PrivateKeyValue(sk))
@@ -1,10 +1,9 @@
 import secrets
 from typing import Tuple, List, Any
 
+from zkay.transaction.crypto import chaskey
 from zkay.transaction.crypto.params import CryptoParams
-from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar
 from zkay.transaction.crypto.ecdh_base import EcdhBase
-from zkay.utils.run_command import run_command
 
 
 class EcdhChaskeyCrypto(EcdhBase):
@@ -15,11 +14,9 @@ class EcdhChaskeyCrypto(EcdhBase):
         key = self._ecdh_sha256(target_pk, my_sk)
         plain_bytes = plain.to_bytes(32, byteorder='big')
 
-        # Call java implementation
+        # Encrypt (compatible with the java and circuit implementations)
         iv = secrets.token_bytes(16)
-        iv_cipher, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}',
-                                    'zkay.ChaskeyLtsCbc', 'enc', key.hex(), iv.hex(), plain_bytes.hex()])
-        iv_cipher = iv + int(iv_cipher.splitlines()[-1], 16).to_bytes(32, byteorder='big')
+        iv_cipher = iv + chaskey.encrypt(key, iv, plain_bytes)
 
         return self.pack_byte_array(iv_cipher, self.params.cipher_chunk_size), None
 
@@ -32,11 +29,11 @@ class EcdhChaskeyCrypto(EcdhBase):
         # Compute shared key
         key = self._ecdh_sha256(sender_pk, my_sk)
 
-        # Call java implementation
+        # Unpack iv and cipher
         iv_cipher = self.unpack_to_byte_array(cipher, self.params.cipher_chunk_size, self.params.cipher_bytes_payload)
         iv, cipher_bytes = iv_cipher[:16], iv_cipher[16:]
-        plain, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}',
-                                'zkay.ChaskeyLtsCbc', 'dec', key.hex(), iv.hex(), cipher_bytes.hex()])
-        plain = int(plain.splitlines()[-1], 16)
+
+        # Decrypt
+        plain = int.from_bytes(chaskey.decrypt(key, iv, cipher_bytes), byteorder='big')
 
         return plain, None
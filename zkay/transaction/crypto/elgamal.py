@@ -1,12 +1,14 @@
 import os
-from typing import Tuple, List, Any, Union
+import threading
+from typing import Tuple, List, Any, Union, Dict, Optional
 
 from Crypto.Random.random import randrange
 
 from zkay.config import cfg, zk_print
 from zkay.transaction.crypto import babyjubjub
 from zkay.transaction.crypto.params import CryptoParams
-from zkay.transaction.interface import ZkayHomomorphicCryptoInterface
+from zkay.transaction.crypto.pool import PrecomputationPool
+from zkay.transaction.interface import ZkayHomomorphicCryptoInterface, ZkayKeystoreInterface, PlaintextRangeError
 from zkay.transaction.types import KeyPair, CipherValue, PrivateKeyValue, PublicKeyValue
 
 import babygiant
@@ -20,18 +22,105 @@ def to_le_32_hex_bytes(num):
     return b
 
 
+def _babystep_table_file() -> str:
+    table_file = os.path.join(cfg.data_dir, 'babygiant', 'babystep_table_32.bin')
+    os.makedirs(os.path.dirname(table_file), exist_ok=True)
+    return table_file
+
+
+def get_dlogs(points: List[Tuple[int, int]]) -> List[int]:
+    """
+    Compute the discrete logs (w.r.t. the BabyJubJub generator) of all points.
+
+    The baby-step table is computed only once, stored in the zkay data directory and memory-mapped by all processes,
+    so that each discrete log only requires the giant-step walk.
+    """
+    xbs = [to_le_32_hex_bytes(x) for x, _ in points]
+    ybs = [to_le_32_hex_bytes(y) for _, y in points]
+
+    if hasattr(babygiant, 'compute_dlogs'):
+        zk_print(f'Running babygiant for {len(points)} point(s)...', verbosity_level=2)
+        return [int(dlog) for dlog in babygiant.compute_dlogs(_babystep_table_file(), xbs, ybs)]
+    else:
+        # babygiant-lib < 1.1 rebuilds the baby-step table for every call
+        return [int(babygiant.compute_dlog(xb, yb)) for xb, yb in zip(xbs, ybs)]
+
+
 def get_dlog(x: int, y: int):
     zk_print(f'Fetching discrete log for {x}, {y}...', verbosity_level=2)
-    xb = to_le_32_hex_bytes(x)
-    yb = to_le_32_hex_bytes(y)
-    zk_print(f'Running babygiant with arguments {xb}, {yb}...', verbosity_level=2)
+    return get_dlogs([(x, y)])[0]
+
+
+SMALL_DLOG_MAX_BITS = 16
+"""Discrete logs of plaintexts with at most this many bits are looked up in a precomputed table of k*G"""
+
+_small_dlogs: Dict[Tuple[int, int], int] = {}
+_small_dlogs_lock = threading.Lock()
+
+
+def _get_small_dlog_table(bits: int) -> Dict[Tuple[int, int], int]:
+    """Return a dict which maps the coordinates of k*G to k for (at least) all k < 2^bits."""
+    with _small_dlogs_lock:
+        start, end = len(_small_dlogs), 1 << bits
+        if start < end:
+            g = babyjubjub.ExtendedPoint.from_affine(babyjubjub.Point.GENERATOR)
+            p = g.mul(start)
+            points = []
+            for _ in range(start, end):
+                points.append(p)
+                p = p + g
+            for k, point in enumerate(babyjubjub.ExtendedPoint.batch_to_affine(points), start=start):
+                _small_dlogs[(point.u.s, point.v.s)] = k
+    return _small_dlogs
+
+
+def get_dlog_in_range(x: int, y: int, plain_bits: int) -> int:
+    """
+    Compute the discrete log of (x, y), which is expected to be in range [0, 2^plain_bits).
+
+    Small ranges are handled with a direct lookup table, larger ones with the baby-step giant-step search.
+
+    :raise PlaintextRangeError: if the discrete log is outside of the expected range
+    """
+    return get_dlogs_in_range([(x, y)], plain_bits)[0]
+
+
+def get_dlogs_in_range(points: List[Tuple[int, int]], plain_bits: Optional[int]) -> List[int]:
+    """
+    Compute the discrete logs of all points, which are expected to be in range [0, 2^plain_bits) if plain_bits is not None.
+
+    Same as get_dlog_in_range for every point, but all points which are not found in the lookup table are passed
+    to a single get_dlogs call.
+
+    :raise PlaintextRangeError: if any discrete log is outside of the expected range (for the first such point)
+    """
+    dlogs: List[Optional[int]] = [None] * len(points)
+    if plain_bits is not None and plain_bits <= SMALL_DLOG_MAX_BITS:
+        table = _get_small_dlog_table(plain_bits)
+        dlogs = [table.get(point) for point in points]
+
+    # Points which are not in the table are out of range, their discrete logs are computed for the exception
+    missing = [idx for idx, dlog in enumerate(dlogs) if dlog is None]
+    if missing:
+        for idx, dlog in zip(missing, get_dlogs([points[idx] for idx in missing])):
+            dlogs[idx] = dlog
 
-    return int(babygiant.compute_dlog(xb, yb))
+    if plain_bits is not None:
+        for dlog in dlogs:
+            if dlog >= 1 << plain_bits:
+                raise PlaintextRangeError(dlog, plain_bits)
+    return dlogs
 
 
 class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
     params = CryptoParams('elgamal')
 
+    def __init__(self, keystore: ZkayKeystoreInterface):
+        super().__init__(keystore)
+        # Pool of precomputed (r, Enc(0, r)) pairs per target public key, used for re-randomization
+        self.rerand_pool: PrecomputationPool[Tuple[int, ...], Tuple[int, List[int]]] = PrecomputationPool(
+            'elgamal-rerand', self._sample_enc_zero, cfg.elgamal_rerand_pool_size, cfg.elgamal_rerand_pool_low_water)
+
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
         key_file = os.path.join(cfg.data_dir, 'keys', f'elgamal_{self.params.key_bits}_{address}.bin')
         os.makedirs(os.path.dirname(key_file), exist_ok=True)
@@ -62,7 +151,7 @@ class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
 
     def _generate_key_pair(self) -> Tuple[List[int], int]:
         sk = randrange(babyjubjub.CURVE_ORDER)
-        pk = babyjubjub.Point.GENERATOR * babyjubjub.Fr(sk)
+        pk = babyjubjub.Point.GENERATOR.mul_fixed_base(babyjubjub.Fr(sk))
         return [pk.u.s, pk.v.s], sk
 
     def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
@@ -72,38 +161,71 @@ class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
         return cipher_chunks, [r]
 
     def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
+        return self._dec_in_range(cipher, sk, None)
+
+    def _dec_in_range(self, cipher: Tuple[int, ...], sk: Any, plain_bits: Optional[int]) -> Tuple[int, List[int]]:
         with time_measure("elgamal_decrypt"):
             c1 = babyjubjub.Point(babyjubjub.Fq(cipher[0]), babyjubjub.Fq(cipher[1]))
             c2 = babyjubjub.Point(babyjubjub.Fq(cipher[2]), babyjubjub.Fq(cipher[3]))
             shared_secret = c1 * babyjubjub.Fr(sk)
             plain_embedded = c2 + shared_secret.negate()
-            plain = self._de_embed(plain_embedded)
+            plain = self._de_embed(plain_embedded, plain_bits)
 
         # TODO randomness misused for the secret key, which is an extremely ugly hack...
         return plain, [sk]
 
-    def _de_embed(self, plain_embedded: babyjubjub.Point) -> int:
+    def dec_many_raw(self, ciphers: List[Tuple[int, ...]], sk: Any,
+                     plain_bits: Optional[int] = None) -> List[Tuple[int, List[int]]]:
+        # All embedded plaintexts are computed in extended coordinates and converted back with a single inversion,
+        # the discrete logs of all of them are then computed with a single babygiant call
+        with time_measure("elgamal_decrypt_many"):
+            embedded = []
+            for cipher in ciphers:
+                c1 = babyjubjub.ExtendedPoint.from_affine(babyjubjub.Point(babyjubjub.Fq(cipher[0]), babyjubjub.Fq(cipher[1])))
+                c2 = babyjubjub.ExtendedPoint.from_affine(babyjubjub.Point(babyjubjub.Fq(cipher[2]), babyjubjub.Fq(cipher[3])))
+                embedded.append(c2 + c1.mul(babyjubjub.Fr(sk).s).negate())
+            points = [(p.u.s, p.v.s) for p in babyjubjub.ExtendedPoint.batch_to_affine(embedded)]
+
+            # handle basic special cases without expensive discrete log computation
+            special = {(0, 1): 0, (babyjubjub.Point.GENERATOR.u.s, babyjubjub.Point.GENERATOR.v.s): 1}
+            plains = [special.get(point) for point in points]
+            todo = [idx for idx, plain in enumerate(plains) if plain is None]
+            if todo:
+                for idx, plain in zip(todo, get_dlogs_in_range([points[idx] for idx in todo], plain_bits)):
+                    plains[idx] = plain
+
+        return [(plain, [sk]) for plain in plains]
+
+    def _de_embed(self, plain_embedded: babyjubjub.Point, plain_bits: Optional[int] = None) -> int:
         # handle basic special cases without expensive discrete log computation
         if plain_embedded == babyjubjub.Point.ZERO:
             return 0
         if plain_embedded == babyjubjub.Point.GENERATOR:
             return 1
+        if plain_bits is not None:
+            return get_dlog_in_range(plain_embedded.u.s, plain_embedded.v.s, plain_bits)
         return get_dlog(plain_embedded.u.s, plain_embedded.v.s)
 
-    def do_op(self, op: str, public_key: List[int], *args: Union[CipherValue, int]) -> List[int]:
-        def deserialize(operand: Union[CipherValue, int]) -> Union[Tuple[babyjubjub.Point, babyjubjub.Point], int]:
+    @staticmethod
+    def _deserialize_cipher(cipher: CipherValue) -> Tuple[babyjubjub.Point, babyjubjub.Point]:
+        # if ciphertext is 0, return (Point.ZERO, Point.ZERO) == Enc(0, 0)
+        if cipher == CipherValue([0]*4, params=cipher.params):
+            return babyjubjub.Point.ZERO, babyjubjub.Point.ZERO
+        else:
+            c1 = babyjubjub.Point(babyjubjub.Fq(cipher[0]), babyjubjub.Fq(cipher[1]))
+            c2 = babyjubjub.Point(babyjubjub.Fq(cipher[2]), babyjubjub.Fq(cipher[3]))
+            return c1, c2
+
+    def _do_op(self, op: str, *args: Union[CipherValue, int]) -> Tuple[babyjubjub.Point, babyjubjub.Point]:
+        def deserialize(operand: Union[CipherValue, int]) -> Union[Tuple[babyjubjub.ExtendedPoint, babyjubjub.ExtendedPoint], int]:
             if isinstance(operand, CipherValue):
-                # if ciphertext is 0, return (Point.ZERO, Point.ZERO) == Enc(0, 0)
-                if operand == CipherValue([0]*4, params=operand.params):
-                    return babyjubjub.Point.ZERO, babyjubjub.Point.ZERO
-                else:
-                    c1 = babyjubjub.Point(babyjubjub.Fq(operand[0]), babyjubjub.Fq(operand[1]))
-                    c2 = babyjubjub.Point(babyjubjub.Fq(operand[2]), babyjubjub.Fq(operand[3]))
-                    return c1, c2
+                c1, c2 = operand.get_native(self._deserialize_cipher)
+                return babyjubjub.ExtendedPoint.from_affine(c1), babyjubjub.ExtendedPoint.from_affine(c2)
             else:
                 return operand
         args = [deserialize(arg) for arg in args]
 
+        # All computations are done in extended coordinates, both result points are converted back with a single inversion
         if op == '+':
             e1 = args[0][0] + args[1][0]
             e2 = args[0][1] + args[1][1]
@@ -111,25 +233,56 @@ class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
             e1 = args[0][0] + args[1][0].negate()
             e2 = args[0][1] + args[1][1].negate()
         elif op == '*' and isinstance(args[1], int):
-            e1 = args[0][0] * babyjubjub.Fr(args[1])
-            e2 = args[0][1] * babyjubjub.Fr(args[1])
+            e1 = args[0][0].mul(babyjubjub.Fr(args[1]).s)
+            e2 = args[0][1].mul(babyjubjub.Fr(args[1]).s)
         elif op == '*' and isinstance(args[0], int):
-            e1 = args[1][0] * babyjubjub.Fr(args[0])
-            e2 = args[1][1] * babyjubjub.Fr(args[0])
+            e1 = args[1][0].mul(babyjubjub.Fr(args[0]).s)
+            e2 = args[1][1].mul(babyjubjub.Fr(args[0]).s)
         else:
             raise ValueError(f'Unsupported operation {op}')
 
+        e1, e2 = babyjubjub.ExtendedPoint.batch_to_affine([e1, e2])
+        return e1, e2
+
+    def do_op(self, op: str, public_key: List[int], *args: Union[CipherValue, int]) -> List[int]:
+        e1, e2 = self._do_op(op, *args)
         return [e1.u.s, e1.v.s, e2.u.s, e2.v.s]
 
-    def do_rerand(self, arg: CipherValue, public_key: List[int]) -> Tuple[List[int], List[int]]:
-        # homomorphically add encryption of zero to re-randomize
+    def do_op_value(self, op: str, public_key: List[int], *args: Union[CipherValue, int]) -> CipherValue:
+        e1, e2 = self._do_op(op, *args)
+        return CipherValue([e1.u.s, e1.v.s, e2.u.s, e2.v.s], params=self.params, native=(e1, e2))
+
+    def _sample_enc_zero(self, public_key: Tuple[int, ...]) -> Tuple[int, List[int]]:
         r = randrange(babyjubjub.CURVE_ORDER)
-        enc_zero = CipherValue(self._enc_with_rand(0, r, public_key), params=arg.params)
-        return self.do_op('+', public_key, arg, enc_zero), [r]
+        return r, self._enc_with_rand(0, r, list(public_key))
+
+    def do_rerand(self, arg: CipherValue, public_key: List[int]) -> Tuple[List[int], List[int]]:
+        # homomorphically add encryption of zero to re-randomize (precomputed if available)
+        precomputed = self.rerand_pool.get(tuple(public_key))
+        r, enc_zero = precomputed if precomputed is not None else self._sample_enc_zero(tuple(public_key))
+        return self.do_op('+', public_key, arg, CipherValue(enc_zero, params=arg.params)), [r]
+
+    def enc_many_raw(self, plains: List[int], sk: Any, pks: List[Any]) -> List[Tuple[List[int], List[int]]]:
+        # All cipher texts are converted to affine coordinates with a single inversion
+        randoms = [randrange(babyjubjub.CURVE_ORDER) for _ in plains]
+        points = []
+        for plain, random, pk in zip(plains, randoms, pks):
+            points += self._enc_with_rand_extended(plain, random, self.serialize_pk(pk, self.params.key_bytes))
+        affine = babyjubjub.ExtendedPoint.batch_to_affine(points)
+        return [([c1.u.s, c1.v.s, c2.u.s, c2.v.s], [random]) for c1, c2, random in zip(affine[::2], affine[1::2], randoms)]
 
     def _enc_with_rand(self, plain: int, random: int, pk: List[int]) -> List[int]:
-        plain_embedded = babyjubjub.Point.GENERATOR * babyjubjub.Fr(plain)
-        shared_secret = babyjubjub.Point(babyjubjub.Fq(pk[0]), babyjubjub.Fq(pk[1])) * babyjubjub.Fr(random)
-        c1 = babyjubjub.Point.GENERATOR * babyjubjub.Fr(random)
-        c2 = plain_embedded + shared_secret
+        c1, c2 = babyjubjub.ExtendedPoint.batch_to_affine(self._enc_with_rand_extended(plain, random, pk))
         return [c1.u.s, c1.v.s, c2.u.s, c2.v.s]
+
+    @staticmethod
+    def _enc_with_rand_extended(plain: int, random: int, pk: List[int]) -> Tuple[babyjubjub.ExtendedPoint, babyjubjub.ExtendedPoint]:
+        # Both the generator and the target public key are fixed bases (tables are cached), all computations are
+        # done in extended coordinates and only the final results are converted back to affine coordinates
+        g_table = babyjubjub.fixed_base_table(babyjubjub.Point.GENERATOR)
+        pk_table = babyjubjub.fixed_base_table(babyjubjub.Point(babyjubjub.Fq(pk[0]), babyjubjub.Fq(pk[1])))
+        plain_embedded = g_table.mul(babyjubjub.Fr(plain).s)
+        shared_secret = pk_table.mul(babyjubjub.Fr(random).s)
+        c1 = g_table.mul(babyjubjub.Fr(random).s)
+        c2 = plain_embedded + shared_secret
+        return c1, c2
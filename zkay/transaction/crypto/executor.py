@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, Dict
+
+from zkay.config import cfg
+
+class CryptoExecutor(metaclass=ABCMeta):
+    """
+    Executes the CPU-bound part of crypto backend operations.
+
+    Operations are methods of a crypto backend instance, which only depend on their (picklable) arguments
+    (e.g. ZkayCryptoInterface.enc_raw, ZkayCryptoInterface.dec_raw or ZkayHomomorphicCryptoInterface.do_op).
+    Key lookups and result wrapping happen in the calling process.
+    """
+
+    workers = 1
+    """Number of operations which are executed concurrently"""
+
+    @abstractmethod
+    def submit(self, crypto, method: str, *args) -> Future:
+        """Schedule crypto.method(*args) and return a future for its result."""
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class InlineCryptoExecutor(CryptoExecutor):
+    """Executes all operations synchronously on the calling thread."""
+
+    def submit(self, crypto, method: str, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(getattr(crypto, method)(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+_worker_crypto: Dict[type, Any] = {}
+"""Crypto backend instances of the current worker process (they keep their key dependent precomputations across operations)"""
+
+
+def get_worker_context() -> BaseContext:
+    """
+    Return the multiprocessing context for crypto worker processes.
+
+    The calling process may run other threads and is therefore not forked, workers are started by a fork server
+    (or spawned where this is not supported). Use init_worker as their initializer.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def init_worker(config: Dict[str, Any]):
+    """Apply the configuration of the calling process (config = dict(vars(cfg))) in a worker process."""
+    cfg.__dict__.update(config)
+
+
+def _run_in_worker(crypto_class: type, method: str, args: tuple):
+    crypto = _worker_crypto.get(crypto_class)
+    if crypto is None:
+        # Keys are passed explicitly with each operation, workers never access a keystore
+        crypto = _worker_crypto[crypto_class] = crypto_class(None)
+    return getattr(crypto, method)(*args)
+
+
+class ProcessPoolCryptoExecutor(CryptoExecutor):
+    """
+    Executes operations in a pool of worker processes, so that crypto throughput scales with the number of cores.
+
+    Each worker keeps one instance per crypto backend, key dependent precomputations (e.g. Paillier decryption
+    contexts or ElGamal fixed-base tables) are therefore reused by all operations which the worker executes.
+    The workers are not forked (see get_worker_context), they receive the configuration of the calling process on startup.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers if workers > 0 else os.cpu_count()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_worker_context(),
+                                         initializer=init_worker, initargs=(dict(vars(cfg)),))
+
+    def submit(self, crypto, method: str, *args) -> Future:
+        return self._pool.submit(_run_in_worker, type(crypto), method, args)
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+def then(future: Future, fct: Callable[[Any], Any]) -> Future:
+    """Return a future for fct(result of future)."""
+    chained = Future()
+
+    def done(f: Future):
+        try:
+            chained.set_result(fct(f.result()))
+        except Exception as e:
+            chained.set_exception(e)
+    future.add_done_callback(done)
+    return chained
+
@@ -1,18 +1,79 @@
 import os
+from functools import lru_cache
 from math import gcd
-from typing import Tuple, Any, List, Union
+from typing import Tuple, Any, List, Union, Optional
 
 from Crypto.Math.Primality import generate_probable_prime
 from Crypto.Random.random import randrange
 
 from zkay.config import cfg, zk_print
+from zkay.transaction.crypto.bigint import invert, powmod
 from zkay.transaction.crypto.params import CryptoParams
-from zkay.transaction.interface import ZkayHomomorphicCryptoInterface
+from zkay.transaction.crypto.pool import PrecomputationPool
+from zkay.transaction.interface import ZkayHomomorphicCryptoInterface, ZkayKeystoreInterface
 from zkay.transaction.types import CipherValue, KeyPair, PublicKeyValue, PrivateKeyValue
 
 
+class PaillierDecryptionContext:
+    """
+    Values derived from a Paillier private key (p, q) which are needed for decryption.
+
+    Decryption and randomness recovery are done modulo p^2/p and q^2/q and combined using the chinese remainder theorem,
+    which is much faster than computing everything modulo n^2.
+    """
+
+    def __init__(self, p: int, q: int):
+        self.p, self.q = p, q
+        self.n = p * q
+        self.n_sqr = self.n * self.n
+        self.p_sqr, self.q_sqr = p * p, q * q
+
+        # Precomputed values for plaintext recovery (see Paillier '99, section 7)
+        g = self.n + 1
+        self.hp = invert((powmod(g, p - 1, self.p_sqr) - 1) // p, p)
+        self.hq = invert((powmod(g, q - 1, self.q_sqr) - 1) // q, q)
+
+        # Exponents to recover the randomness r from r^n mod p and r^n mod q
+        self.n_inv_p = invert(self.n, p - 1)
+        self.n_inv_q = invert(self.n, q - 1)
+
+        # CRT coefficient
+        self.p_inv_q = invert(p, q)
+
+    def _crt(self, xp: int, xq: int) -> int:
+        """Return x mod n with x == xp mod p and x == xq mod q."""
+        return xp + self.p * (((xq - xp) * self.p_inv_q) % self.q)
+
+    def decrypt(self, c: int) -> Tuple[int, int]:
+        """Return (plain, random) for cipher c, plain is in range [0, n)."""
+        mp = (((powmod(c, self.p - 1, self.p_sqr) - 1) // self.p) * self.hp) % self.p
+        mq = (((powmod(c, self.q - 1, self.q_sqr) - 1) // self.q) * self.hq) % self.q
+        plain = self._crt(mp, mq)
+
+        # c = g^plain * r^n mod n^2 with g^-plain == 1 - n * plain (mod n^2)
+        # see https://math.stackexchange.com/a/114142
+        rand_pow_n = (c * (1 - self.n * plain)) % self.n_sqr
+        rp = powmod(rand_pow_n % self.p, self.n_inv_p, self.p)
+        rq = powmod(rand_pow_n % self.q, self.n_inv_q, self.q)
+        return plain, self._crt(rp, rq)
+
+
+@lru_cache(maxsize=16)
+def get_decryption_context(p: int, q: int) -> PaillierDecryptionContext:
+    """Return the (cached) decryption context for private key (p, q)."""
+    return PaillierDecryptionContext(p, q)
+
+
 class PaillierCrypto(ZkayHomomorphicCryptoInterface):
     params = CryptoParams('paillier')
+    parallel_key_generation = True
+
+    def __init__(self, keystore: ZkayKeystoreInterface):
+        super().__init__(keystore)
+        # Pool of precomputed (r, r^n mod n^2) pairs per target public key n
+        self.randomness_pool: PrecomputationPool[int, Tuple[int, int]] = PrecomputationPool(
+            'paillier-randomness', self._sample_randomness, cfg.paillier_randomness_pool_size,
+            cfg.paillier_randomness_pool_low_water)
 
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
         key_file = os.path.join(cfg.data_dir, 'keys', f'paillier_{self.params.key_bits}_{address}.bin')
@@ -50,16 +111,19 @@ class PaillierCrypto(ZkayHomomorphicCryptoInterface):
                 sk.append(int.from_bytes(f.read(self.params.cipher_chunk_size), byteorder='big'))
         return pk, sk
 
-    def _generate_key_pair(self) -> Tuple[List[int], List[int]]:
-        n_bits = self.params.key_bits
+    @staticmethod
+    def generate_primes(n_bits: int) -> Tuple[int, int]:
+        """Return distinct primes p, q such that p * q has exactly n_bits bits."""
         pq_bits = (n_bits + 1) // 2
-
         while True:
             p = int(generate_probable_prime(exact_bits=pq_bits))
             q = int(generate_probable_prime(exact_bits=pq_bits))
-            n = p * q
-            if p != q and n.bit_length() == n_bits:
-                break
+            if p != q and (p * q).bit_length() == n_bits:
+                return p, q
+
+    def _generate_key_pair(self) -> Tuple[List[int], List[int]]:
+        p, q = self.generate_primes(self.params.key_bits)
+        n = p * q
 
         n_chunks = self.serialize_pk(n, self.params.key_bytes)
         p_chunks = self.serialize_pk(p, self.params.key_bytes)
@@ -74,94 +138,96 @@ class PaillierCrypto(ZkayHomomorphicCryptoInterface):
             if not co_prime or (gcd(random, n) == 1):
                 return random
 
+    def _sample_randomness(self, n: int) -> Tuple[int, int]:
+        """Return (r, r^n mod n^2) for a random r which is co-prime to n."""
+        random = self.sample_below(n, co_prime=True)
+        return random, powmod(random, n, n * n)
+
     def _enc_with_rand(self, plain: int, random: int, n: int) -> List[int]:
+        return self._enc_with_rand_pow_n(plain, powmod(random, n, n * n), n)
+
+    def _enc_with_rand_pow_n(self, plain: int, rand_pow_n: int, n: int) -> List[int]:
         n_sqr = n * n
         g_pow_plain = n * plain + 1
-        rand_pow_n = pow(random, n, n_sqr)
         cipher = (g_pow_plain * rand_pow_n) % n_sqr
         return self.serialize_pk(cipher, self.params.cipher_bytes_payload)
 
     def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
         n = target_pk
         plain = plain % n  # handle negative numbers
-        random = self.sample_below(n, co_prime=True)
 
-        cipher_chunks = self._enc_with_rand(plain, random, n)
+        # Use precomputed randomness if available, such that encryption only requires a single multiplication
+        precomputed = self.randomness_pool.get(n)
+        random, rand_pow_n = precomputed if precomputed is not None else self._sample_randomness(n)
+
+        cipher_chunks = self._enc_with_rand_pow_n(plain, rand_pow_n, n)
         random_chunks = self.serialize_pk(random, self.params.rnd_bytes)
 
         return cipher_chunks, random_chunks
 
-    def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
+    def _get_decryption_context(self, sk: Any) -> PaillierDecryptionContext:
         p = self.deserialize_pk(sk[:self.params.key_len])
         q = self.deserialize_pk(sk[self.params.key_len:])
-        n = p * q
-        n_sqr = n * n
-        lambda_ = (p - 1) * (q - 1)
-        lambda_inv = pow(lambda_, -1, n)
-        c = self.deserialize_pk(cipher)
-
-        # Compute the plaintext: plain = L(cipher^lambda mod n^2) / lambda mod n
-        c_pow_lambda = pow(c, lambda_, n_sqr)
-        l = (c_pow_lambda - 1) // n
-        plain = (l * lambda_inv) % n
-
-        # Compute the randomness that was used
-        # Fortunately, this has been asked and answered on stackexchange: https://math.stackexchange.com/a/114142
-        generator = n + 1
-        g_pow_plain_inv = pow(generator, -plain, n_sqr)
-        rand_pow_n = (c * g_pow_plain_inv) % n_sqr
-        p_inv = pow(p, -1, q - 1)  # Inverse of p modulo q-1
-        q_inv = pow(q, -1, p - 1)  # Inverse of q modulo p-1
-        c_pow_p_inv = pow(rand_pow_n, p_inv, q)
-        c_pow_q_inv = pow(rand_pow_n, q_inv, p)
-        # random == c_pow_q_inv mod p
-        # random == c_pow_p_inv mod q
-        # Compute random using the Chinese Remainder Theorem
-        y_1 = pow(q, -1, p)
-        y_2 = pow(p, -1, q)
-        w_1 = (y_1 * q) % n
-        w_2 = (y_2 * p) % n
-
-        random = (c_pow_q_inv * w_1 + c_pow_p_inv * w_2) % n
+        return get_decryption_context(p, q)
+
+    def _dec_with_context(self, ctx: PaillierDecryptionContext, cipher: Tuple[int, ...]) -> Tuple[int, List[int]]:
+        plain, random = ctx.decrypt(self.deserialize_pk(cipher))
         random_chunks = self.serialize_pk(random, self.params.rnd_bytes)
 
         # Handle possible negative plaintexts
-        if plain > n // 2:
-            plain = plain - n
+        if plain > ctx.n // 2:
+            plain = plain - ctx.n
 
         return plain, random_chunks
 
-    def do_op(self, op: str, public_key: Union[List[int], int], *args: Union[CipherValue, int]) -> List[int]:
+    def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
+        return self._dec_with_context(self._get_decryption_context(sk), cipher)
+
+    def dec_many_raw(self, ciphers: List[Tuple[int, ...]], sk: Any,
+                     plain_bits: Optional[int] = None) -> List[Tuple[int, List[int]]]:
+        # The private key is deserialized and its decryption context is looked up only once
+        ctx = self._get_decryption_context(sk)
+        return [self._dec_with_context(ctx, cipher) for cipher in ciphers]
+
+    def _deserialize_cipher(self, cipher: CipherValue) -> int:
+        val = self.deserialize_pk(cipher[:])
+        return val if val != 0 else 1  # If ciphertext is 0, return 1 == Enc(0, 0)
+
+    def _do_op(self, op: str, public_key: Union[List[int], int], *args: Union[CipherValue, int]) -> int:
         n = self.deserialize_pk(public_key)
         n_sqr = n * n
 
         def deserialize(operand: Union[CipherValue, int]) -> int:
             if isinstance(operand, CipherValue):
-                val = self.deserialize_pk(operand[:])
-                return val if val != 0 else 1  # If ciphertext is 0, return 1 == Enc(0, 0)
+                return operand.get_native(self._deserialize_cipher)
             else:
                 return operand  # Return plaintext arguments as-is
         operands = [deserialize(arg) for arg in args]
 
         if op == 'sign-':
             assert isinstance(args[0], CipherValue)
-            result = pow(operands[0], -1, n_sqr)
+            return invert(operands[0], n_sqr)
         elif op == '+':
             assert isinstance(args[0], CipherValue) and isinstance(args[1], CipherValue)
-            result = (operands[0] * operands[1]) % n_sqr
+            return (operands[0] * operands[1]) % n_sqr
         elif op == '-':
             assert isinstance(args[0], CipherValue) and isinstance(args[1], CipherValue)
-            result = (operands[0] * pow(operands[1], -1, n_sqr)) % n_sqr
+            return (operands[0] * invert(operands[1], n_sqr)) % n_sqr
         elif op == '*' and isinstance(args[1], int):
             assert isinstance(args[0], CipherValue)
-            result = pow(operands[0], operands[1], n_sqr)
+            return powmod(operands[0], operands[1], n_sqr)
         elif op == '*' and isinstance(args[0], int):
             assert isinstance(args[1], CipherValue)
-            result = pow(operands[1], operands[0], n_sqr)
+            return powmod(operands[1], operands[0], n_sqr)
         else:
             raise ValueError(f'Unsupported operation {op}')
 
-        return self.serialize_pk(result, self.params.cipher_bytes_payload)
+    def do_op(self, op: str, public_key: Union[List[int], int], *args: Union[CipherValue, int]) -> List[int]:
+        return self.serialize_pk(self._do_op(op, public_key, *args), self.params.cipher_bytes_payload)
+
+    def do_op_value(self, op: str, public_key: Union[List[int], int], *args: Union[CipherValue, int]) -> CipherValue:
+        result = self._do_op(op, public_key, *args)
+        return CipherValue(self.serialize_pk(result, self.params.cipher_bytes_payload), params=self.params, native=result)
 
     def do_rerand(self, arg: CipherValue, public_key: List[int]) -> Tuple[List[int], List[int]]:
         raise NotImplementedError("Rerandomization not implemented for Paillier backend")
@@ -0,0 +1,146 @@
+import atexit
+import threading
+import weakref
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Generic, Hashable, Optional, TypeVar
+
+from zkay.config import zk_print
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+_live_pools: 'weakref.WeakSet[PrecomputationPool]' = weakref.WeakSet()
+"""All pools which were not garbage collected yet, they are shut down at exit"""
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in list(_live_pools):
+        pool.shutdown()
+
+
+class PrecomputationPool(Generic[K, V]):
+    """
+    Per-key pools of precomputed values, which are refilled by a background thread.
+
+    Each value is handed out at most once. If the pool of a key is empty, get returns None and the caller has to
+    compute the value itself. As soon as a pool drops below low_water values, it is refilled up to size values
+    in the background (pools for the least recently used keys are discarded if there are more than max_keys).
+
+    NOTE: Python ints are immutable, zeroization of discarded values is therefore best effort only
+    (all references held by the pool are dropped).
+    """
+
+    def __init__(self, name: str, compute: Callable[[K], V], size: int, low_water: int, max_keys: int = 16):
+        self.name = name
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+
+        self._compute = compute
+        self._pools: Dict[K, Deque[V]] = OrderedDict()
+        self._refill_queue: Deque[K] = deque()
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        _live_pools.add(self)
+
+    def get(self, key: K) -> Optional[V]:
+        """Take a precomputed value for key out of the pool (None if no value is available)."""
+        if self.size <= 0:
+            return None
+        with self._cv:
+            pool = self._get_pool(key)
+            val = pool.popleft() if pool else None
+            if val is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            if len(pool) < max(self.low_water, 1):
+                self._schedule_refill(key)
+        return val
+
+    def fill(self, key: K):
+        """Schedule precomputation of values for key (e.g. before a latency-sensitive operation)."""
+        if self.size > 0:
+            with self._cv:
+                self._get_pool(key)
+                self._schedule_refill(key)
+
+    def available(self, key: K) -> int:
+        with self._cv:
+            return len(self._pools.get(key, ()))
+
+    def clear(self):
+        """Discard all precomputed values."""
+        with self._cv:
+            for pool in self._pools.values():
+                pool.clear()
+            self._pools.clear()
+            self._refill_queue.clear()
+
+    def shutdown(self):
+        """Stop the refill thread and discard all precomputed values."""
+        with self._cv:
+            self._stopped = True
+            self._cv.notify_all()
+        self.clear()
+        if self.hits or self.misses:
+            zk_print(f'{self.name} pool: {self.hits} hits, {self.misses} misses', verbosity_level=2)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cv:
+            return {'hits': self.hits, 'misses': self.misses, 'available': sum(len(p) for p in self._pools.values())}
+
+    def _get_pool(self, key: K) -> Deque[V]:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = deque()
+            while len(self._pools) > self.max_keys:
+                _, evicted = self._pools.popitem(last=False)
+                evicted.clear()
+        else:
+            self._pools.move_to_end(key)
+        return pool
+
+    def _schedule_refill(self, key: K):
+        if self._stopped or key in self._refill_queue:
+            return
+        self._refill_queue.append(key)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._refill_loop, name=f'{self.name}-pool', daemon=True)
+            self._thread.start()
+        self._cv.notify()
+
+    def _refill_loop(self):
+        while True:
+            with self._cv:
+                while not self._refill_queue and not self._stopped:
+                    self._cv.wait()
+                if self._stopped:
+                    return
+                key = self._refill_queue[0]
+
+            # Compute outside of the lock, one value at a time so that consumers are never blocked for long
+            while True:
+                with self._cv:
+                    pool = self._pools.get(key)
+                    done = self._stopped or pool is None or len(pool) >= self.size
+                if not done:
+                    try:
+                        val = self._compute(key)
+                    except Exception as e:
+                        zk_print(f'WARNING: {self.name} precomputation failed: {e}')
+                        done = True
+                if done:
+                    with self._cv:
+                        if self._refill_queue and self._refill_queue[0] == key:
+                            self._refill_queue.popleft()
+                    break
+                with self._cv:
+                    pool = self._pools.get(key)
+                    if pool is not None and not self._stopped:
+                        pool.append(val)
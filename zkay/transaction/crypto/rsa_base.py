@@ -1,47 +1,26 @@
 import os
-import sys
-from abc import ABCMeta
+from abc import ABCMeta, abstractmethod
+from functools import lru_cache
+from typing import Tuple, List
 
 from Crypto.PublicKey import RSA
+from Crypto.Random.random import randrange
 
 from zkay.config import cfg
+from zkay.transaction.crypto.bigint import powmod, invert
 from zkay.transaction.interface import PrivateKeyValue, PublicKeyValue, KeyPair, ZkayBlockchainInterface
 from zkay.transaction.interface import ZkayCryptoInterface
 
 
-# persistent_locals2 has been co-authored with Andrea Maffezzoli
-# http://code.activestate.com/recipes/577283-decorator-to-expose-local-variables-of-a-function-/
-# (hack to get local variables of called library function, used to extract randomness)
-class PersistentLocals(object):
-    def __init__(self, func):
-        self._locals = {}
-        self.func = func
-
-    def __call__(self, *args, **kwargs):
-        def tracer(frame, event, arg):
-            if event == 'return':
-                self._locals = frame.f_locals.copy()
-
-        # tracer is activated on next call, return or exception
-        sys.setprofile(tracer)
-        try:
-            # trace the function call
-            res = self.func(*args, **kwargs)
-        finally:
-            # disable tracer and replace with old one
-            sys.setprofile(None)
-        return res
-
-    def clear_locals(self):
-        self._locals = {}
-
-    @property
-    def locals(self):
-        return self._locals
+@lru_cache(maxsize=256)
+def get_public_key(modulus: int, exponent: int) -> RSA.RsaKey:
+    """Return the (cached) public key object for the given modulus."""
+    return RSA.construct((modulus, exponent))
 
 
 class RSACrypto(ZkayCryptoInterface, metaclass=ABCMeta):
     default_exponent = 65537 # == 0x10001
+    parallel_key_generation = True
 
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
         key_file = os.path.join(cfg.data_dir, 'keys', f'rsa_{self.params.key_bits}_{address}.bin')
@@ -60,3 +39,54 @@ class RSACrypto(ZkayCryptoInterface, metaclass=ABCMeta):
         modulus = key.publickey().n
         return KeyPair(PublicKeyValue(self.serialize_pk(modulus, self.params.key_bytes), params=self.params),
                        PrivateKeyValue(key))
+
+    @staticmethod
+    def serialize_sk(sk: RSA.RsaKey) -> str:
+        return sk.export_key().decode('ascii')
+
+    @staticmethod
+    def deserialize_sk(data: str) -> RSA.RsaKey:
+        return RSA.import_key(data)
+
+    @abstractmethod
+    def _pad(self, msg: bytes, k: int) -> Tuple[bytes, bytes]:
+        """Return (padded message of length k, randomness used for padding)."""
+        pass
+
+    @abstractmethod
+    def _unpad(self, em: bytes) -> Tuple[bytes, bytes]:
+        """Return (message, randomness used for padding) for padded message em."""
+        pass
+
+    def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
+        # The padding is done here rather than by pycryptodome, since the randomness is needed for the proof
+        pub_key = get_public_key(target_pk, self.default_exponent)
+        k = pub_key.size_in_bytes()
+        em, rnd_bytes = self._pad(plain.to_bytes(32, byteorder='big'), k)
+
+        cipher_bytes = powmod(int.from_bytes(em, byteorder='big'), pub_key.e, pub_key.n).to_bytes(k, byteorder='big')
+        cipher = self.pack_byte_array(cipher_bytes, self.params.cipher_chunk_size)
+        rnd = self.pack_byte_array(rnd_bytes, self.params.rnd_chunk_size)
+        return cipher, rnd
+
+    def _dec(self, cipher: Tuple[int, ...], sk: RSA.RsaKey) -> Tuple[int, List[int]]:
+        k = sk.size_in_bytes()
+        cipher_bytes = self.unpack_to_byte_array(cipher, self.params.cipher_chunk_size, self.params.cipher_bytes_payload)
+        c = int.from_bytes(cipher_bytes, byteorder='big')
+        if c >= sk.n:
+            raise ValueError('Ciphertext too large')
+
+        # Blind the cipher text with a random factor r^e, such that the timing of the private key operation
+        # does not depend on the cipher text (same as pycryptodome's decryption)
+        r = randrange(1, sk.n)
+        c = c * powmod(r, sk.e, sk.n) % sk.n
+
+        # Use the chinese remainder theorem with the prime factors of the private key
+        m_p = powmod(c, sk.d % (sk.p - 1), sk.p)
+        m_q = powmod(c, sk.d % (sk.q - 1), sk.q)
+        m = (m_p + sk.p * (((m_q - m_p) * sk.u) % sk.q)) * invert(r, sk.n) % sk.n
+        msg, rnd_bytes = self._unpad(m.to_bytes(k, byteorder='big'))
+
+        plain = int.from_bytes(msg, byteorder='big')
+        rnd = self.pack_byte_array(rnd_bytes, self.params.rnd_chunk_size)
+        return plain, rnd
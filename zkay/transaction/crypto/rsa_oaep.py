@@ -1,34 +1,52 @@
-from typing import Tuple, List
+import hmac
+from typing import Tuple
 
-from Crypto.Cipher import PKCS1_OAEP
 from Crypto.Hash import SHA256
-from Crypto.PublicKey import RSA
+from Crypto.Random import get_random_bytes
+from Crypto.Signature.pss import MGF1
+from Crypto.Util.strxor import strxor
 
 from zkay.transaction.crypto.params import CryptoParams
-from zkay.transaction.crypto.rsa_base import RSACrypto, PersistentLocals
+from zkay.transaction.crypto.rsa_base import RSACrypto
 
 
 class RSAOAEPCrypto(RSACrypto):
+    """RSA encryption with OAEP padding (RFC 8017, SHA-256 and MGF1-SHA-256, empty label)."""
     params = CryptoParams('rsa-oaep')
 
-    def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
-        pub_key = RSA.construct((target_pk, self.default_exponent))
-
-        encrypt = PersistentLocals(PKCS1_OAEP.new(pub_key, hashAlgo=SHA256).encrypt)
-        cipher_bytes = encrypt(plain.to_bytes(32, byteorder='big'))
-        cipher = self.pack_byte_array(cipher_bytes, self.params.cipher_chunk_size)
-
-        rnd_bytes = encrypt.locals['ros']
-        rnd = self.pack_byte_array(rnd_bytes, self.params.rnd_chunk_size)
-
-        return cipher, rnd
-
-    def _dec(self, cipher: Tuple[int, ...], sk: RSA.RsaKey) -> Tuple[int, List[int]]:
-        decrypt = PersistentLocals(PKCS1_OAEP.new(sk, hashAlgo=SHA256).decrypt)
-        cipher_bytes = self.unpack_to_byte_array(cipher, self.params.cipher_chunk_size, self.params.cipher_bytes_payload)
-        plain = int.from_bytes(decrypt(cipher_bytes), byteorder='big')
-
-        rnd_bytes = decrypt.locals['seed']
-        rnd = self.pack_byte_array(rnd_bytes, self.params.rnd_chunk_size)
-
-        return plain, rnd
+    h_len = SHA256.digest_size
+    l_hash = SHA256.new(b'').digest()
+
+    @staticmethod
+    def _mgf(seed: bytes, length: int) -> bytes:
+        return MGF1(seed, length, SHA256)
+
+    def _pad(self, msg: bytes, k: int) -> Tuple[bytes, bytes]:
+        ps_len = k - len(msg) - 2 * self.h_len - 2
+        if ps_len < 0:
+            raise ValueError('Plaintext is too long.')
+        db = self.l_hash + b'\x00' * ps_len + b'\x01' + msg
+        seed = get_random_bytes(self.h_len)
+        masked_db = strxor(db, self._mgf(seed, k - self.h_len - 1))
+        masked_seed = strxor(seed, self._mgf(masked_db, self.h_len))
+        return b'\x00' + masked_seed + masked_db, seed
+
+    def _unpad(self, em: bytes) -> Tuple[bytes, bytes]:
+        masked_seed, masked_db = em[1:1 + self.h_len], em[1 + self.h_len:]
+        seed = strxor(masked_seed, self._mgf(masked_db, self.h_len))
+        db = strxor(masked_db, self._mgf(seed, len(masked_db)))
+
+        # All checks are evaluated without data dependent branches, such that a failing decryption does not reveal
+        # which check failed (Manger's attack)
+        invalid = int(em[0] != 0) | int(not hmac.compare_digest(db[:self.h_len], self.l_hash))
+        found, sep = 0, 0
+        for idx in range(self.h_len, len(db)):
+            is_zero = ((db[idx] - 1) >> 8) & 1
+            is_one = (((db[idx] ^ 1) - 1) >> 8) & 1
+            # A byte other than 0 before the 0x01 separator
+            invalid |= (is_zero | is_one | found) ^ 1
+            sep |= idx & -(is_one & (found ^ 1))
+            found |= is_one
+        if invalid | (found ^ 1):
+            raise ValueError('Incorrect decryption.')
+        return db[sep + 1:], seed
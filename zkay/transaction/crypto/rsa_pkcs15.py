@@ -1,38 +1,31 @@
-from typing import Tuple, List
+from typing import Tuple
 
-from Crypto.Cipher import PKCS1_v1_5
-from Crypto.PublicKey import RSA
+from Crypto.Random import get_random_bytes
 
 from zkay.transaction.crypto.params import CryptoParams
-from zkay.transaction.crypto.rsa_base import RSACrypto, PersistentLocals
+from zkay.transaction.crypto.rsa_base import RSACrypto
 
 
 class RSAPKCS15Crypto(RSACrypto):
+    """RSA encryption with PKCS#1 v1.5 padding (RFC 8017)."""
     params = CryptoParams('rsa-pkcs1.5')
 
-    def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
-        pub_key = RSA.construct((target_pk, self.default_exponent))
-        encrypt = PersistentLocals(PKCS1_v1_5.new(pub_key).encrypt)
-
-        cipher_bytes = encrypt(plain.to_bytes(32, byteorder='big'))
-        cipher = self.pack_byte_array(cipher_bytes, self.params.cipher_chunk_size)
-
-        rnd_bytes = encrypt.locals['ps']
-        assert len(rnd_bytes) == self.params.rnd_bytes
-        rnd = self.pack_byte_array(rnd_bytes, self.params.rnd_chunk_size)
-
-        return cipher, rnd
-
-    def _dec(self, cipher: Tuple[int, ...], sk: RSA.RsaKey) -> Tuple[int, List[int]]:
-        decrypt = PersistentLocals(PKCS1_v1_5.new(sk).decrypt)
-        cipher_bytes = self.unpack_to_byte_array(cipher, self.params.cipher_chunk_size, self.params.cipher_bytes_payload)
-        ret = decrypt(cipher_bytes, None)
-        if ret is None:
+    def _pad(self, msg: bytes, k: int) -> Tuple[bytes, bytes]:
+        ps_len = k - len(msg) - 3
+        if ps_len < 8:
+            raise ValueError('Plaintext is too long.')
+
+        # Padding string consists of non-zero random bytes
+        ps = b''
+        while len(ps) < ps_len:
+            ps += get_random_bytes(ps_len - len(ps)).replace(b'\x00', b'')
+        assert len(ps) == self.params.rnd_bytes
+        return b'\x00\x02' + ps + b'\x00' + msg, ps
+
+    def _unpad(self, em: bytes) -> Tuple[bytes, bytes]:
+        sep = em.find(b'\x00', 2)
+        if em[:2] != b'\x00\x02' or sep < 10:
             raise RuntimeError("Tried to decrypt invalid cipher text")
-        plain = int.from_bytes(ret, byteorder='big')
-
-        rnd_bytes = decrypt.locals['em'][2:decrypt.locals['sep']]
-        assert len(rnd_bytes) == self.params.rnd_bytes
-        rnd = self.pack_byte_array(rnd_bytes, self.params.rnd_chunk_size)
-
-        return plain, rnd
+        ps = em[2:sep]
+        assert len(ps) == self.params.rnd_bytes
+        return em[sep + 1:], ps
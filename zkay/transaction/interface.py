@@ -8,14 +8,19 @@ It provides high level functions for
 * NIZK-proof generation
 """
 
+import functools
 import os
+import threading
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 from builtins import type
-from typing import Tuple, List, Optional, Union, Any, Dict, Collection
+from typing import Tuple, List, Optional, Union, Any, Dict, Collection, Iterable, Sequence
 
 from zkay.compiler.privacy.library_contracts import bn128_scalar_field
 from zkay.compiler.privacy.proving_scheme.proving_scheme import ProvingScheme
+from zkay.transaction.crypto.executor import get_worker_context, init_worker
 from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.pk_cache import PersistentPkCache
 from zkay.zkay_ast.process_ast import get_verification_contract_names
 from zkay.zkay_frontend import compile_zkay_file
 from zkay.config import cfg, zk_print, zk_print_banner
@@ -47,6 +52,22 @@ class ProofGenerationError(Exception):
     pass
 
 
+class PlaintextRangeError(Exception):
+    """
+    Exception which is raised when a decrypted plain text is not in the range [0, 2^plain_bits) which the caller expected.
+
+    The decrypted value is available as plain.
+    """
+
+    def __init__(self, plain: int, plain_bits: int):
+        super().__init__(plain, plain_bits)
+        self.plain = plain
+        self.plain_bits = plain_bits
+
+    def __str__(self):
+        return f'Plain text {self.plain} is not in the expected range [0, 2^{self.plain_bits})'
+
+
 class ZkayBlockchainInterface(metaclass=ABCMeta):
     """
     API to interact with the blockchain.
@@ -147,6 +168,54 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
         zk_print(f'Announcing public key "{pk}" for address "{sender}"')
         return self._announce_public_key(sender.val, pk[:], crypto_params)
 
+    def req_public_keys(self, addresses: List[AddressValue], crypto_params: CryptoParams) -> List[Optional[PublicKeyValue]]:
+        """
+        Request the public keys for all designated addresses from the PKI contract.
+
+        :param addresses: Addresses for which to request public keys
+        :raise BlockChainError: if request fails
+        :return: the public keys (None for addresses which did not announce a public key yet)
+        """
+        assert all(isinstance(address, AddressValue) for address in addresses)
+        zk_print(f'Requesting public keys for {len(addresses)} addresses', verbosity_level=2)
+        return self._req_public_keys([address.val for address in addresses], crypto_params)
+
+    def announce_public_keys(self, announcements: List[Tuple[AddressValue, PublicKeyValue]], crypto_params: CryptoParams) -> List[Any]:
+        """
+        Announce multiple public keys to the PKI (backends may submit all transactions before waiting for any of them).
+
+        **WARNING: THIS ISSUES CRYPTO CURRENCY TRANSACTIONS (GAS COST)**
+
+        :param announcements: (public key owner, public key to announce) pairs
+        :raise BlockChainError: if there is an error in the backend
+        :raise TransactionFailedException: if any announcement transaction failed
+        :return: backend-specific transaction receipts
+        """
+        for sender, pk in announcements:
+            assert isinstance(sender, AddressValue)
+            assert isinstance(pk, PublicKeyValue)
+            zk_print(f'Announcing public key "{pk}" for address "{sender}"')
+        return self._announce_public_keys([(sender.val, pk[:]) for sender, pk in announcements], crypto_params)
+
+    def pki_cache_id(self, crypto_params: CryptoParams) -> Optional[str]:
+        """
+        Return a string which uniquely identifies the pki contract for crypto_params (e.g. chain id and contract address).
+
+        :return: the identifier or None, if the backend does not support persistent public key caching
+        """
+        return self._pki_cache_id(crypto_params)
+
+    def req_pk_announcements(self, from_block: Optional[int], crypto_params: CryptoParams) -> Tuple[int, Dict[AddressValue, int]]:
+        """
+        Request all public key announcements to the pki contract in the blocks after from_block.
+
+        :param from_block: only announcements in later blocks are returned (if None, no announcements are requested)
+        :raise BlockChainError: if request fails
+        :return: (current block number, dict which maps announcing addresses to the block number of their latest announcement)
+        """
+        zk_print(f'Requesting public key announcements after block {from_block}', verbosity_level=2)
+        return self._req_pk_announcements(from_block, crypto_params)
+
     def req_state_var(self, contract_handle, name: str, *indices) -> Union[bool, int, str, bytes]:
         """
         Request the contract state variable value name[indices[0]][indices[1]][...] from the chain.
@@ -412,6 +481,25 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
     def _announce_public_key(self, address: Union[bytes, str], pk: Tuple[int, ...], crypto_params: CryptoParams) -> Any:
         pass
 
+    def _req_public_keys(self, addresses: List[Union[bytes, str]], crypto_params: CryptoParams) -> List[Optional[PublicKeyValue]]:
+        # Fallback for backends without batched requests
+        pks = []
+        for address in addresses:
+            try:
+                pks.append(self._req_public_key(address, crypto_params))
+            except BlockChainError:
+                pks.append(None)
+        return pks
+
+    def _announce_public_keys(self, announcements: List[Tuple[Union[bytes, str], Tuple[int, ...]]], crypto_params: CryptoParams) -> List[Any]:
+        return [self._announce_public_key(address, pk, crypto_params) for address, pk in announcements]
+
+    def _pki_cache_id(self, crypto_params: CryptoParams) -> Optional[str]:
+        return None
+
+    def _req_pk_announcements(self, from_block: Optional[int], crypto_params: CryptoParams) -> Tuple[int, Dict[AddressValue, int]]:
+        raise NotImplementedError('Current blockchain backend does not support requesting public key announcements.')
+
     @abstractmethod
     def _call(self, contract_handle, sender: Union[bytes, str], name: str, *args) -> Union[bool, int, str]:
         pass
@@ -443,11 +531,16 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
 class ZkayKeystoreInterface(metaclass=ABCMeta):
     """API to add and retrieve local key pairs, and to request public keys."""
 
+    stores_key_pairs = False
+    """If true, the key pairs of this keystore survive across sessions (crypto backends then do not reload them from their key files)"""
+
     def __init__(self, conn: ZkayBlockchainInterface, crypto_params: CryptoParams):
         self.conn = conn
         self.crypto_params = crypto_params
         self.local_pk_store: Dict[AddressValue, PublicKeyValue] = {}
         self.local_key_pairs: Dict[AddressValue, KeyPair] = {}
+        self._persistent_pk_cache: Optional[PersistentPkCache] = None
+        self._persistent_pk_cache_loaded = False
 
     def add_keypair(self, address: AddressValue, key_pair: KeyPair):
         """
@@ -464,10 +557,41 @@ class ZkayKeystoreInterface(metaclass=ABCMeta):
         except BlockChainError:
             self.conn.announce_public_key(address, key_pair.pk, self.crypto_params)
 
+    def add_keypairs(self, key_pairs: Dict[AddressValue, KeyPair]):
+        """
+        Import cryptographic keys for multiple addresses and announce all public keys which are not yet in the pki.
+
+        The pki is queried with a single batched request and all announcements are submitted back-to-back.
+
+        :param key_pairs: cryptographic keys per address
+        :raise TransactionFailedException: if an announcement transaction fails
+        """
+        self.local_key_pairs.update(key_pairs)
+        addresses = list(key_pairs.keys())
+        announced = self.conn.req_public_keys(addresses, self.crypto_params)
+        missing = [(address, key_pairs[address].pk) for address, pk in zip(addresses, announced) if pk is None]
+        if missing:
+            self.conn.announce_public_keys(missing, self.crypto_params)
+
     def has_initialized_keys_for(self, address: AddressValue) -> bool:
         """Return true if keys for address are already in the store."""
         return address in self.local_key_pairs
 
+    def prefetch(self, addresses: Iterable[AddressValue]):
+        """
+        Request the public keys of all addresses which are not yet cached locally from the pki with a single request.
+
+        Addresses which did not announce a public key yet are skipped, getPk raises for them as usual.
+
+        :param addresses: addresses whose public keys will be needed soon
+        :raise BlockChainError: if key request fails
+        """
+        self._load_persistent_pks()
+        todo = list(dict.fromkeys(address for address in addresses if address not in self.local_pk_store))
+        if todo:
+            pks = self.conn.req_public_keys(todo, self.crypto_params)
+            self._store_pks({address: pk for address, pk in zip(todo, pks) if pk is not None})
+
     def getPk(self, address: AddressValue) -> PublicKeyValue:
         """
         Return public key for address.
@@ -482,13 +606,43 @@ class ZkayKeystoreInterface(metaclass=ABCMeta):
         """
         assert isinstance(address, AddressValue)
         zk_print(f'Requesting public key for address {address.val}', verbosity_level=2)
+        self._load_persistent_pks()
         if address in self.local_pk_store:
             return self.local_pk_store[address]
         else:
             pk = self.conn.req_public_key(address, self.crypto_params)
-            self.local_pk_store[address] = pk
+            self._store_pks({address: pk})
             return pk
 
+    def _store_pks(self, pks: Dict[AddressValue, PublicKeyValue]):
+        self.local_pk_store.update(pks)
+        if self._persistent_pk_cache is not None and pks:
+            self._persistent_pk_cache.put(pks)
+            self._persistent_pk_cache.save()
+
+    def _load_persistent_pks(self):
+        """If cfg.persist_public_keys is set, populate local_pk_store from the on-disk cache (once per keystore)."""
+        if self._persistent_pk_cache_loaded or not cfg.persist_public_keys:
+            return
+        self._persistent_pk_cache_loaded = True
+
+        try:
+            cache_id = self.conn.pki_cache_id(self.crypto_params)
+            if cache_id is None:
+                return
+            cache = PersistentPkCache(cache_id, self.crypto_params)
+            cache.load()
+            current_block, announcements = self.conn.req_pk_announcements(cache.synced_block if len(cache) else None, self.crypto_params)
+        except (BlockChainError, NotImplementedError) as e:
+            zk_print(f'WARNING: Persistent public key cache disabled ({e})')
+            return
+
+        cache.sync(current_block, announcements)
+        cache.save()
+        for address, pk in cache.get_all().items():
+            self.local_pk_store.setdefault(address, pk)
+        self._persistent_pk_cache = cache
+
     def sk(self, address: AddressValue) -> PrivateKeyValue:
         """
         Return secret key for address from the local key store.
@@ -514,9 +668,31 @@ class ZkayKeystoreInterface(metaclass=ABCMeta):
         return self.local_key_pairs[address].pk
 
 
+_key_pair_cache: 'OrderedDict[Tuple[type, int, str, bytes], KeyPair]' = OrderedDict()
+"""
+Process-wide LRU cache of loaded key pairs, shared by all crypto backend instances.
+
+It holds at most cfg.keystore_key_pair_cache_size key pairs and is cleared by Runtime.reset.
+"""
+_key_pair_cache_lock = threading.Lock()
+
+
+def clear_key_pair_cache():
+    """Remove all key pairs from the process-wide key pair cache."""
+    with _key_pair_cache_lock:
+        _key_pair_cache.clear()
+
+
+def _generate_or_load_key_file(crypto_class, address: str):
+    crypto_class(None)._generate_or_load_key_pair(address)
+
+
 class ZkayCryptoInterface(metaclass=ABCMeta):
     """API to generate cryptographic keys and perform encryption/decryption operations."""
 
+    parallel_key_generation = False
+    """Whether key generation is expensive enough to generate missing keys of many accounts in worker processes"""
+
     def __init__(self, keystore: ZkayKeystoreInterface):
         self.keystore = keystore
 
@@ -534,7 +710,67 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
 
         :param address: the address for which to generate keys
         """
-        self.keystore.add_keypair(address, self._generate_or_load_key_pair(address.val.hex()))
+        self.keystore.add_keypair(address, self._get_stored_key_pairs([address]).get(address) or self._get_key_pair(address))
+
+    def generate_or_load_key_pairs(self, addresses: List[AddressValue]):
+        """
+        Store cryptographic keys for all accounts with the specified addresses in the keystore.
+
+        Missing keys are generated together (see _generate_key_files).
+
+        :param addresses: the addresses for which to generate keys
+        """
+        stored = self._get_stored_key_pairs(addresses)
+        with _key_pair_cache_lock:
+            missing = [address.val.hex() for address in addresses
+                       if address not in stored and self._key_pair_cache_key(address) not in _key_pair_cache]
+        if len(missing) > 1:
+            # Only create the key files here, they are loaded below
+            self._generate_key_files(missing)
+        self.keystore.add_keypairs({address: stored.get(address) or self._get_key_pair(address) for address in addresses})
+
+    def _generate_key_files(self, addresses: List[str]):
+        """
+        Create the key files for all addresses (hex strings) which do not have one yet.
+
+        If parallel_key_generation is true, the keys are generated in parallel worker processes.
+        Otherwise nothing is done here and the keys are generated one after the other when they are loaded.
+        """
+        if not self.parallel_key_generation or cfg.is_unit_test:
+            return
+        with get_worker_context().Pool(processes=min(os.cpu_count(), len(addresses)),
+                                       initializer=init_worker, initargs=(dict(vars(cfg)),)) as pool:
+            pool.map(functools.partial(_generate_or_load_key_file, type(self)), addresses)
+
+    def _get_stored_key_pairs(self, addresses: List[AddressValue]) -> Dict[AddressValue, KeyPair]:
+        """Return the key pairs of addresses which are already in a keystore which stores key pairs across sessions."""
+        if not self.keystore.stores_key_pairs:
+            return {}
+        return {address: self.keystore.local_key_pairs[address] for address in addresses if self.keystore.has_initialized_keys_for(address)}
+
+    def _key_pair_cache_key(self, address: AddressValue) -> Tuple[type, int, str, bytes]:
+        return type(self), self.params.key_bits, cfg.data_dir, address.val
+
+    def _get_key_pair(self, address: AddressValue) -> KeyPair:
+        if self.keystore is not None and self.keystore.stores_key_pairs:
+            # The keystore caches key pairs itself (with bounded memory)
+            return self._generate_or_load_key_pair(address.val.hex())
+
+        # Key pairs are cached for the whole process (shared by all keystore instances)
+        cache_key = self._key_pair_cache_key(address)
+        with _key_pair_cache_lock:
+            key_pair = _key_pair_cache.get(cache_key)
+            if key_pair is not None:
+                _key_pair_cache.move_to_end(cache_key)
+                return key_pair
+
+        # Loading may generate a new key pair, which must not block other threads
+        key_pair = self._generate_or_load_key_pair(address.val.hex())
+        with _key_pair_cache_lock:
+            _key_pair_cache[cache_key] = key_pair
+            while len(_key_pair_cache) > cfg.keystore_key_pair_cache_size:
+                _key_pair_cache.popitem(last=False)
+        return key_pair
 
     def enc(self, plain: Union[int, AddressValue], my_addr: AddressValue, target_addr: AddressValue) -> Tuple[CipherValue, Optional[RandomnessValue]]:
         """
@@ -545,6 +781,76 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
         :param target_addr: address of the receiver for whom to encrypt
         :return: if symmetric -> (iv_cipher, None), if asymmetric (cipher, randomness which was used to encrypt plain)
         """
+        return self.wrap_enc_result(self.enc_raw(*self.get_enc_args(plain, my_addr, target_addr)))
+
+    def dec(self, cipher: CipherValue, my_addr: AddressValue,
+            plain_bits: Optional[int] = None) -> Tuple[int, Optional[RandomnessValue]]:
+        """
+        Decrypt cipher encrypted for my_addr.
+
+        :param cipher: encrypted value
+        :param my_addr: cipher is encrypted for this address
+        :param plain_bits: if not None, the plain text is expected to be in range [0, 2^plain_bits) (hint for backends \
+                           whose decryption cost depends on the plain text range)
+        :raise PlaintextRangeError: if the backend uses plain_bits and the plain text is not in the expected range
+        :return: if symmetric -> (plain, None), if asymmetric (plain, randomness which was used to encrypt plain)
+        """
+        args = self.get_dec_args(cipher, my_addr, plain_bits)
+        if args is None:
+            # Ciphertext is all zeros, i.e. uninitialized -> zero
+            return 0, (None if self.params.is_symmetric_cipher() else RandomnessValue(params=self.params))
+        return self.wrap_dec_result(self.dec_raw(*args))
+
+    def enc_many(self, plains: Sequence[Union[int, AddressValue]], my_addr: AddressValue,
+                 target_addrs: Sequence[AddressValue]) -> List[Tuple[CipherValue, Optional[RandomnessValue]]]:
+        """
+        Encrypt plains[i] for receiver target_addrs[i] (for all i).
+
+        The public keys of all receivers are requested at once and backends may share key dependent
+        precomputations between the encryptions (see enc_many_raw).
+
+        :param plains: plain texts to encrypt
+        :param my_addr: address of the sender who encrypts
+        :param target_addrs: addresses of the receivers (same length as plains)
+        :return: list of enc results
+        """
+        assert len(plains) == len(target_addrs)
+        self.keystore.prefetch(target_addrs)
+        args = [self.get_enc_args(plain, my_addr, target_addr) for plain, target_addr in zip(plains, target_addrs)]
+        if not args:
+            return []
+        raw_results = self.enc_many_raw([plain for plain, _, _ in args], args[0][1], [pk for _, _, pk in args])
+        return [self.wrap_enc_result(raw) for raw in raw_results]
+
+    def dec_many(self, ciphers: Sequence[CipherValue], my_addr: AddressValue,
+                 plain_bits: Optional[int] = None) -> List[Tuple[int, Optional[RandomnessValue]]]:
+        """
+        Decrypt all ciphers encrypted for my_addr.
+
+        Backends may share key dependent precomputations between the decryptions (see dec_many_raw).
+
+        :param ciphers: encrypted values
+        :param my_addr: all ciphers are encrypted for this address
+        :param plain_bits: plain text range hint for all ciphers (see dec)
+        :raise PlaintextRangeError: if the backend uses plain_bits and any plain text is not in the expected range
+        :return: list of dec results
+        """
+        args = [self.get_dec_args(cipher, my_addr, plain_bits) for cipher in ciphers]
+        todo = [idx for idx, arg in enumerate(args) if arg is not None]
+
+        # Uninitialized cipher texts decrypt to zero
+        results = [(0, (None if self.params.is_symmetric_cipher() else RandomnessValue(params=self.params)))] * len(args)
+        if todo:
+            raw_results = self.dec_many_raw([args[idx][0] for idx in todo], args[todo[0]][1], plain_bits)
+            for idx, raw in zip(todo, raw_results):
+                results[idx] = self.wrap_dec_result(raw)
+        return results
+
+    # enc and dec are split into key lookup (get_*_args), computation on raw values (*_raw) and result wrapping (wrap_*).
+    # Only the raw computations depend on nothing but their arguments, a crypto executor may run them in a different process.
+
+    def get_enc_args(self, plain: Union[int, AddressValue], my_addr: AddressValue, target_addr: AddressValue) -> Tuple[int, Any, Any]:
+        """Return the arguments for enc_raw (plain text, raw secret key of my_addr, raw public key of target_addr)."""
         if isinstance(plain, AddressValue):
             plain = int.from_bytes(plain.val, byteorder='big')
         assert not isinstance(plain, Value), f"Tried to encrypt value of type {type(plain).__name__}"
@@ -559,35 +865,47 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
             pk = raw_pk[0]
         else:
             pk = self.deserialize_pk(raw_pk[:])
+        return int(plain), sk, pk
+
+    def enc_raw(self, plain: int, sk: Any, pk: Any) -> Tuple[List[int], Optional[List[int]]]:
         while True:
             # Retry until cipher text is not 0
-            cipher, rnd = self._enc(int(plain), sk, pk)
-            cipher = CipherValue(cipher, params=self.params)
-            rnd = RandomnessValue(rnd, params=self.params) if rnd is not None else None
-            if cipher != CipherValue(params=self.params):
-                break
+            cipher, rnd = self._enc(plain, sk, pk)
+            if any(cipher):
+                return cipher, rnd
 
-        return cipher, rnd
+    def wrap_enc_result(self, result: Tuple[List[int], Optional[List[int]]]) -> Tuple[CipherValue, Optional[RandomnessValue]]:
+        cipher, rnd = result
+        return CipherValue(cipher, params=self.params), (RandomnessValue(rnd, params=self.params) if rnd is not None else None)
 
-    def dec(self, cipher: CipherValue, my_addr: AddressValue) -> Tuple[int, Optional[RandomnessValue]]:
-        """
-        Decrypt cipher encrypted for my_addr.
-
-        :param cipher: encrypted value
-        :param my_addr: cipher is encrypted for this address
-        :return: if symmetric -> (plain, None), if asymmetric (plain, randomness which was used to encrypt plain)
-        """
+    def get_dec_args(self, cipher: CipherValue, my_addr: AddressValue, plain_bits: Optional[int] = None) -> Optional[Tuple[Tuple[int, ...], Any, Optional[int]]]:
+        """Return the arguments for dec_raw (raw cipher, raw secret key of my_addr, plain_bits), None if cipher is uninitialized."""
         assert isinstance(cipher, CipherValue), f"Tried to decrypt value of type {type(cipher).__name__}"
         assert isinstance(my_addr, AddressValue)
         zk_print(f'Decrypting value {cipher} for {my_addr}', verbosity_level=2)
 
         if cipher == CipherValue(params=self.params):
-            # Ciphertext is all zeros, i.e. uninitialized -> zero
-            return 0, (None if self.params.is_symmetric_cipher() else RandomnessValue(params=self.params))
+            return None
+        return cipher[:], self.keystore.sk(my_addr).val, plain_bits
+
+    def dec_raw(self, cipher: Tuple[int, ...], sk: Any, plain_bits: Optional[int] = None) -> Tuple[int, Optional[List[int]]]:
+        if plain_bits is None:
+            return self._dec(cipher, sk)
         else:
-            sk = self.keystore.sk(my_addr)
-            plain, rnd = self._dec(cipher[:], sk.val)
-            return plain, (None if rnd is None else RandomnessValue(rnd, params=self.params))
+            return self._dec_in_range(cipher, sk, plain_bits)
+
+    def enc_many_raw(self, plains: List[int], sk: Any, pks: List[Any]) -> List[Tuple[List[int], Optional[List[int]]]]:
+        """Batch version of enc_raw (encrypt plains[i] for pks[i]), backends override this to share precomputations."""
+        return [self.enc_raw(plain, sk, pk) for plain, pk in zip(plains, pks)]
+
+    def dec_many_raw(self, ciphers: List[Tuple[int, ...]], sk: Any,
+                     plain_bits: Optional[int] = None) -> List[Tuple[int, Optional[List[int]]]]:
+        """Batch version of dec_raw (all ciphers must be initialized), backends override this to share precomputations."""
+        return [self.dec_raw(cipher, sk, plain_bits) for cipher in ciphers]
+
+    def wrap_dec_result(self, result: Tuple[int, Optional[List[int]]]) -> Tuple[int, Optional[RandomnessValue]]:
+        plain, rnd = result
+        return plain, (None if rnd is None else RandomnessValue(rnd, params=self.params))
 
     def serialize_pk(self, key: int, total_bytes: int) -> List[int]:
         """Serialize a large integer into an array of {params.cipher_chunk_size}-byte ints."""
@@ -599,6 +917,16 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
         data = ZkayCryptoInterface.unpack_to_byte_array(arr, self.params.cipher_chunk_size, 0)
         return int.from_bytes(data, byteorder='big')
 
+    @staticmethod
+    def serialize_sk(sk: Any) -> Any:
+        """Return a json serializable representation of the raw private key sk (inverse of deserialize_sk)."""
+        return sk
+
+    @staticmethod
+    def deserialize_sk(data: Any) -> Any:
+        """Restore a raw private key from its serialize_sk representation."""
+        return data
+
     @staticmethod
     def pack_byte_array(bin: bytes, chunk_size) -> List[int]:
         """Pack byte array into an array of {chunk_size}-byte ints"""
@@ -628,6 +956,10 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
     def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
         pass
 
+    def _dec_in_range(self, cipher: Tuple[int, ...], sk: Any, plain_bits: int) -> Tuple[int, List[int]]:
+        """Decrypt cipher whose plain text is expected to be in range [0, 2^plain_bits), backends may use this hint."""
+        return self._dec(cipher, sk)
+
 
 class ZkayHomomorphicCryptoInterface(ZkayCryptoInterface):
 
@@ -635,6 +967,10 @@ class ZkayHomomorphicCryptoInterface(ZkayCryptoInterface):
     def do_op(self, op: str, public_key: List[int], *args: Union[CipherValue, int]) -> List[int]:
         pass
 
+    def do_op_value(self, op: str, public_key: List[int], *args: Union[CipherValue, int]) -> CipherValue:
+        """Same as do_op, but return the result as CipherValue (backends attach its native form, see CipherValue.get_native)."""
+        return CipherValue(self.do_op(op, public_key, *args), params=self.params)
+
     @abstractmethod
     def do_rerand(self, arg: CipherValue, public_key: List[int]) -> Tuple[List[int], List[int]]:
         """
@@ -682,8 +1018,29 @@ class ZkayProverInterface(metaclass=ABCMeta):
             assert int(arg) < bn128_scalar_field, 'argument overflow'
 
         with time_measure(f'generate_proof', True):
-            verify_dir = cfg.get_circuit_output_dir_name(cfg.get_verification_contract_name(contract, function))
-            return self._generate_proof(os.path.abspath(os.path.join(project_dir, verify_dir)), priv_values, in_vals, out_vals)
+            return self._generate_proof(self.get_verifier_dir(project_dir, contract, function), priv_values, in_vals, out_vals)
+
+    @staticmethod
+    def get_verifier_dir(project_dir: str, contract: str, function: str) -> str:
+        """Return the output directory of the verification contract of contract.function."""
+        verify_dir = cfg.get_circuit_output_dir_name(cfg.get_verification_contract_name(contract, function))
+        return os.path.abspath(os.path.join(project_dir, verify_dir))
+
+    def estimate_memory(self, verifier_dir: str) -> int:
+        """
+        Return an estimate of the peak memory usage (in bytes) of a proof generation for the circuit in verifier_dir.
+
+        The proving scheduler uses this to decide how many proofs can be generated in parallel. (default: 1 GiB)
+        """
+        return 1 << 30
+
+    def get_shared_memory(self) -> int:
+        """
+        Return the memory (in bytes) which resident processes that serve all proof generations may use.
+
+        This is not part of the per-proof estimates of estimate_memory. (default: 0)
+        """
+        return 0
 
     @abstractmethod
     def _generate_proof(self, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> List[int]:
@@ -5,6 +5,8 @@ This package contains the keystore backends.
 Submodules
 ==========
 * :py:mod:`.simple`: Basic key store implementation
+* :py:mod:`.sharded`: Thread-safe key store for many accounts, with an indexed key database
 """
 
 from .simple import SimpleKeystore
+from .sharded import ShardedKeystore
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Type
+
+from zkay.config import cfg
+from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.interface import ZkayBlockchainInterface, ZkayCryptoInterface, ZkayKeystoreInterface
+from zkay.transaction.types import AddressValue, KeyPair, PrivateKeyValue, PublicKeyValue
+
+
+class ShardedDict(MutableMapping):
+    """
+    Thread-safe dict which is split into shards with separate locks.
+
+    If max_size is not None, each shard is a LRU cache, such that the dict holds at most (about) max_size entries.
+    """
+
+    def __init__(self, shards: int, max_size: Optional[int] = None):
+        if max_size is not None:
+            shards = min(shards, max_size)
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(max(1, shards))]
+        self._locks = [threading.Lock() for _ in self._shards]
+        self._max_shard_size = None if max_size is None else max(1, -(-max_size // len(self._shards)))
+
+    def _shard_idx(self, key) -> int:
+        return hash(key) % len(self._shards)
+
+    def __getitem__(self, key):
+        idx = self._shard_idx(key)
+        with self._locks[idx]:
+            val = self._shards[idx][key]
+            if self._max_shard_size is not None:
+                self._shards[idx].move_to_end(key)
+            return val
+
+    def __setitem__(self, key, val):
+        idx = self._shard_idx(key)
+        with self._locks[idx]:
+            shard = self._shards[idx]
+            shard[key] = val
+            if self._max_shard_size is not None:
+                shard.move_to_end(key)
+                while len(shard) > self._max_shard_size:
+                    shard.popitem(last=False)
+
+    def __delitem__(self, key):
+        idx = self._shard_idx(key)
+        with self._locks[idx]:
+            del self._shards[idx][key]
+
+    def __contains__(self, key) -> bool:
+        idx = self._shard_idx(key)
+        with self._locks[idx]:
+            return key in self._shards[idx]
+
+    def __iter__(self) -> Iterator:
+        keys = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                keys += shard.keys()
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class KeyDatabase:
+    """
+    Key pairs of one crypto backend, stored in a single SQLite database file which is indexed by address.
+
+    The database may be shared by multiple threads (and processes).
+    """
+
+    def __init__(self, filename: str, crypto_params: CryptoParams, crypto_class: Type[ZkayCryptoInterface]):
+        """
+        :param filename: path of the database file
+        :param crypto_params: crypto backend of the stored key pairs
+        :param crypto_class: crypto backend implementation, which (de)serializes the private keys
+        """
+        self.filename = filename
+        self.crypto_params = crypto_params
+        self.crypto_class = crypto_class
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False, isolation_level=None, timeout=60)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS key_pairs '
+                               '(address BLOB PRIMARY KEY, pk TEXT NOT NULL, sk TEXT NOT NULL) WITHOUT ROWID')
+
+    def get(self, address: bytes) -> Optional[KeyPair]:
+        with self._lock:
+            row = self._conn.execute('SELECT pk, sk FROM key_pairs WHERE address = ?', (address,)).fetchone()
+        if row is None:
+            return None
+        return KeyPair(PublicKeyValue(json.loads(row[0]), params=self.crypto_params),
+                       PrivateKeyValue(self.crypto_class.deserialize_sk(json.loads(row[1]))))
+
+    def contains(self, address: bytes) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM key_pairs WHERE address = ?', (address,)).fetchone() is not None
+
+    def put(self, key_pairs: Dict[bytes, KeyPair]):
+        """Store all key pairs within a single transaction."""
+        rows = [(address, json.dumps(list(key_pair.pk[:])), json.dumps(self.crypto_class.serialize_sk(key_pair.sk.val)))
+                for address, key_pair in key_pairs.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.executemany('INSERT OR REPLACE INTO key_pairs (address, pk, sk) VALUES (?, ?, ?)', rows)
+
+    def delete(self, address: bytes):
+        with self._lock:
+            self._conn.execute('DELETE FROM key_pairs WHERE address = ?', (address,))
+
+    def addresses(self) -> List[bytes]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT address FROM key_pairs')]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM key_pairs').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class KeyPairStore(MutableMapping):
+    """Mapping from address to key pair, backed by a KeyDatabase and a bounded in-memory LRU cache."""
+
+    def __init__(self, db: KeyDatabase, shards: int, max_cached: int):
+        self.db = db
+        self._cache = ShardedDict(shards, max_cached)
+
+    def __getitem__(self, address: AddressValue) -> KeyPair:
+        try:
+            return self._cache[address]
+        except KeyError:
+            pass
+        key_pair = self.db.get(address.val)
+        if key_pair is None:
+            raise KeyError(address)
+        self._cache[address] = key_pair
+        return key_pair
+
+    def __setitem__(self, address: AddressValue, key_pair: KeyPair):
+        self.update({address: key_pair})
+
+    def update(self, key_pairs: Dict[AddressValue, KeyPair], **kwargs):
+        assert not kwargs
+        self.db.put({address.val: key_pair for address, key_pair in key_pairs.items()})
+        for address, key_pair in key_pairs.items():
+            self._cache[address] = key_pair
+
+    def __delitem__(self, address: AddressValue):
+        self.db.delete(address.val)
+        self._cache.pop(address, None)
+
+    def __contains__(self, address: Any) -> bool:
+        return address in self._cache or (isinstance(address, AddressValue) and self.db.contains(address.val))
+
+    def __iter__(self) -> Iterator[AddressValue]:
+        return iter([AddressValue(address) for address in self.db.addresses()])
+
+    def __len__(self) -> int:
+        return len(self.db)
+
+
+class ShardedKeystore(ZkayKeystoreInterface):
+    """
+    Thread-safe keystore for deployments which manage the keys of many accounts.
+
+    Key pairs are stored in one database file per crypto backend in data_dir and loaded lazily, only the
+    cfg.keystore_key_pair_cache_size most recently used key pairs are kept in memory.
+    Public keys which were requested from the pki are cached in memory.
+    """
+
+    stores_key_pairs = True
+
+    def __init__(self, conn: ZkayBlockchainInterface, crypto_params: CryptoParams):
+        super().__init__(conn, crypto_params)
+        # Imported here, the runtime module imports all keystores
+        from zkay.transaction.runtime import _crypto_classes
+        db = KeyDatabase(self.db_filename(crypto_params), crypto_params, _crypto_classes[crypto_params.crypto_name])
+        self.local_key_pairs = KeyPairStore(db, cfg.keystore_shards, cfg.keystore_key_pair_cache_size)
+        self.local_pk_store = ShardedDict(cfg.keystore_shards)
+        self._pk_cache_lock = threading.RLock()
+
+    @staticmethod
+    def db_filename(crypto_params: CryptoParams) -> str:
+        return os.path.join(cfg.data_dir, 'keys', f'keystore_{crypto_params.crypto_name}_{crypto_params.key_bits}.sqlite')
+
+    def _store_pks(self, pks: Dict[AddressValue, PublicKeyValue]):
+        with self._pk_cache_lock:
+            super()._store_pks(pks)
+
+    def _load_persistent_pks(self):
+        if self._persistent_pk_cache_loaded:
+            return
+        with self._pk_cache_lock:
+            super()._load_persistent_pks()
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import inspect
+from concurrent.futures import Future
 from contextlib import contextmanager, nullcontext
 from enum import IntEnum
-from typing import Dict, Union, Callable, Any, Optional, List, Tuple, ContextManager
+from typing import Dict, Union, Callable, Any, Optional, List, Tuple, ContextManager, Sequence
 
 from zkay.compiler.privacy.library_contracts import bn128_scalar_field
 from zkay.compiler.privacy.manifest import Manifest
 from zkay.config import cfg, zk_print_banner
 from zkay.my_logging.log_context import log_context
+from zkay.transaction.crypto.executor import then
 from zkay.transaction.crypto.params import CryptoParams
 from zkay.transaction.int_casts import __convert as int_cast
 from zkay.transaction.interface import BlockChainError, ZkayHomomorphicCryptoInterface, ZkayKeystoreInterface
@@ -32,30 +34,39 @@ class StateDict:
     def __init__(self, api) -> None:
         self.api = api
         self.__state: Dict[str, Any] = {}
-        self.__constructors: Dict[str, (bool, CryptoParams, Callable)] = {}
+        self.__constructors: Dict[str, (bool, CryptoParams, Callable, Optional[int])] = {}
 
     def clear(self):
         self.__state.clear()
 
     def decl(self, name, constructor: Callable = lambda x: x, *,
-             cipher: bool = False, crypto_backend: str = cfg.main_crypto_backend):
-        """Define the wrapper constructor for a state variable."""
+             cipher: bool = False, crypto_backend: str = cfg.main_crypto_backend, plain_bits: Optional[int] = None):
+        """Define the wrapper constructor (and for encrypted variables the plaintext bit width) for a state variable."""
         assert name not in self.__constructors
-        self.__constructors[name] = (cipher, CryptoParams(crypto_backend), constructor)
+        self.__constructors[name] = (cipher, CryptoParams(crypto_backend), constructor, plain_bits)
 
     @property
     def names(self) -> List[str]:
         return list(self.__constructors.keys())
 
     def get_plain(self, name: str, *indices):
-        is_cipher, crypto_params, constr = self.__constructors[name]
+        is_cipher, crypto_params, constr, plain_bits = self.__constructors[name]
         val = self.__get((name, *indices), cache=False)
         if is_cipher:
-            ret, _ = self.api.dec(val, constr, crypto_params.crypto_name)
+            ret, _ = self.api.dec(val, constr, crypto_params.crypto_name, plain_bits)
             return ret
         else:
             return val
 
+    def get_plain_many(self, name: str, indices: Sequence[Tuple]) -> List:
+        """Return get_plain(name, *idx) for all idx in indices, encrypted values are decrypted as a batch."""
+        is_cipher, crypto_params, constr, plain_bits = self.__constructors[name]
+        vals = [self.__get((name, *idx), cache=False) for idx in indices]
+        if is_cipher:
+            return [ret for ret, _ in self.api.dec_many(vals, constr, crypto_params.crypto_name, plain_bits)]
+        else:
+            return vals
+
     def get_raw(self, name: str, *indices):
         return self.__get((name, *indices), cache=False)
 
@@ -95,7 +106,7 @@ class StateDict:
         if cache and loc in self.__state:
             return self.__state[loc]
         else:
-            is_cipher, crypto_params, constr = self.__constructors[var]
+            is_cipher, crypto_params, constr, _ = self.__constructors[var]
             try:
                 if is_cipher:
                     cipher_len = crypto_params.cipher_len
@@ -238,6 +249,21 @@ class ContractSimulator:
             if not Runtime.keystore(crypto_params).has_initialized_keys_for(AddressValue(address)):
                 Runtime.crypto(crypto_params).generate_or_load_key_pair(account)
 
+    @staticmethod
+    def initialize_keys_for_accounts(addresses: Sequence[Union[bytes, str]]):
+        """
+        Generate/Load keys for all given addresses.
+
+        Missing keys are generated in parallel, the pki is queried once per crypto backend
+        and all missing public keys are announced back-to-back.
+        """
+        accounts = [AddressValue(address) for address in addresses]
+        for crypto_params in cfg.all_crypto_params():
+            keystore = Runtime.keystore(crypto_params)
+            todo = [account for account in accounts if not keystore.has_initialized_keys_for(account)]
+            if todo:
+                Runtime.crypto(crypto_params).generate_or_load_key_pairs(todo)
+
     @staticmethod
     def use_config_from_manifest(project_dir: str):
         """Override zkay configuration with values from the manifest file in project_dir."""
@@ -254,8 +280,7 @@ class ContractSimulator:
         :return: if count == 1 -> returns a address, otherwise returns a tuple of count addresses
         """
         accounts = Runtime.blockchain().create_test_accounts(count)
-        for account in accounts:
-            ContractSimulator.initialize_keys_for(account)
+        ContractSimulator.initialize_keys_for_accounts(accounts)
         if len(accounts) == 1:
             return accounts[0]
         else:
@@ -298,6 +323,8 @@ class ApiWrapper:
         self.__keystore = {}
         self.__crypto = {}
         self.__prover = Runtime.prover()
+        self.__proving_scheduler = Runtime.proving_scheduler()
+        self.__crypto_executor = Runtime.crypto_executor()
 
         for crypto_params in cfg.all_crypto_params():
             self.__keystore[crypto_params.crypto_name] = Runtime.keystore(crypto_params)
@@ -312,6 +339,9 @@ class ApiWrapper:
         self.__user_addr = user_addr
         """From address for all transactions which are issued by this ContractSimulator"""
 
+        self.proof_priority: int = 0
+        """Scheduling priority of the proofs for the transactions of this ContractSimulator (higher: started earlier)"""
+
         self.__current_msg: Optional[MsgStruct] = None
         self.__current_block: Optional[BlockStruct] = None
         self.__current_tx: Optional[TxStruct] = None
@@ -361,6 +391,10 @@ class ApiWrapper:
     def get_my_pk(self, crypto_backend: str = cfg.main_crypto_backend) -> PublicKeyValue:
         return self.__keystore[crypto_backend].pk(self.user_address)
 
+    def prefetch_pks(self, addresses: Sequence[AddressValue], crypto_backend: str = cfg.main_crypto_backend):
+        """Request the public keys of all addresses with a single pki request (e.g. before encrypting for multiple recipients)."""
+        self.__keystore[crypto_backend].prefetch(addresses)
+
     def call_fct(self, sec_offset, fct, *args) -> Any:
         with self.__call_ctx(sec_offset):
             return fct(*args)
@@ -387,16 +421,16 @@ class ApiWrapper:
     def transact(self, fname: str, args: List, should_encrypt: List[bool], wei_amount: Optional[int] = None) -> Any:
         return self.__conn.transact(self.__contract_handle, self.__user_addr, fname, args, should_encrypt, wei_amount=wei_amount)
 
-    def call(self, fname: str, args: List, ret_val_constructors: List[Tuple[bool, str, Callable]]):
+    def call(self, fname: str, args: List, ret_val_constructors: List[Tuple[bool, str, Callable, Optional[int]]]):
         retvals = self.__conn.call(self.__contract_handle, self.__user_addr, fname, *args)
         if len(ret_val_constructors) == 1:
             return self.__get_decrypted_retval(retvals, *ret_val_constructors[0])
         else:
-            return tuple([self.__get_decrypted_retval(retval, is_cipher, homomorphism, constr)
-                          for retval, (is_cipher, homomorphism, constr) in zip(retvals, ret_val_constructors)])
+            return tuple([self.__get_decrypted_retval(retval, *constr)
+                          for retval, constr in zip(retvals, ret_val_constructors)])
 
-    def __get_decrypted_retval(self, raw_value, is_cipher, crypto_params_name, constructor):
-        return self.dec(CipherValue(raw_value, params=CryptoParams(crypto_params_name)), constructor, crypto_backend=crypto_params_name)[0] if is_cipher else constructor(raw_value)
+    def __get_decrypted_retval(self, raw_value, is_cipher, crypto_params_name, constructor, plain_bits=None):
+        return self.dec(CipherValue(raw_value, params=CryptoParams(crypto_params_name)), constructor, crypto_backend=crypto_params_name, plain_bits=plain_bits)[0] if is_cipher else constructor(raw_value)
 
     def get_special_variables(self) -> Tuple[MsgStruct, BlockStruct, TxStruct]:
         assert self.__current_msg is not None and self.__current_block is not None and self.__current_tx is not None
@@ -408,17 +442,83 @@ class ApiWrapper:
     def clear_special_variables(self):
         self.__current_msg, self.__current_block, self.__current_tx = None, None, None
 
+    # Crypto operations are executed by Runtime.crypto_executor, the *_async variants return futures.
+
     def enc(self, plain: Union[int, AddressValue], target_addr: Optional[AddressValue] = None,
             crypto_backend: str = cfg.main_crypto_backend) -> Tuple[CipherValue, Optional[RandomnessValue]]:
+        return self.enc_async(plain, target_addr, crypto_backend).result()
+
+    def enc_async(self, plain: Union[int, AddressValue], target_addr: Optional[AddressValue] = None,
+                  crypto_backend: str = cfg.main_crypto_backend) -> Future:
         target_addr = self.__user_addr if target_addr is None else target_addr
-        return self.__crypto[crypto_backend].enc(plain, self.__user_addr, target_addr)
+        crypto_inst = self.__crypto[crypto_backend]
+        args = crypto_inst.get_enc_args(plain, self.__user_addr, target_addr)
+        return then(self.__crypto_executor.submit(crypto_inst, 'enc_raw', *args), crypto_inst.wrap_enc_result)
+
+    def enc_many(self, values: Sequence[Tuple[Union[int, AddressValue], Optional[AddressValue]]],
+                 crypto_backend: str = cfg.main_crypto_backend) -> List[Tuple[CipherValue, Optional[RandomnessValue]]]:
+        """Encrypt all (plain, target_addr) pairs, batches of encryptions may run concurrently."""
+        crypto_inst = self.__crypto[crypto_backend]
+        target_addrs = [self.__user_addr if target_addr is None else target_addr for _, target_addr in values]
+        self.prefetch_pks(target_addrs, crypto_backend)
+        args = [crypto_inst.get_enc_args(plain, self.__user_addr, target_addr) for (plain, _), target_addr in zip(values, target_addrs)]
+        if not args:
+            return []
+
+        # One enc_many_raw batch per executor worker
+        sk = args[0][1]
+        futures = [self.__crypto_executor.submit(crypto_inst, 'enc_many_raw', [plain for plain, _, _ in chunk], sk, [pk for _, _, pk in chunk])
+                   for chunk in self.__chunks(args)]
+        return [crypto_inst.wrap_enc_result(raw) for future in futures for raw in future.result()]
 
     def dec(self, cipher: CipherValue, constr: Callable[[int], Any],
-            crypto_backend: str = cfg.main_crypto_backend) -> Tuple[Any, Optional[RandomnessValue]]:
-        res = self.__crypto[crypto_backend].dec(cipher, self.__user_addr)
-        return constr(res[0]), res[1]
+            crypto_backend: str = cfg.main_crypto_backend, plain_bits: Optional[int] = None) -> Tuple[Any, Optional[RandomnessValue]]:
+        return self.dec_async(cipher, constr, crypto_backend, plain_bits).result()
+
+    def dec_async(self, cipher: CipherValue, constr: Callable[[int], Any],
+                  crypto_backend: str = cfg.main_crypto_backend, plain_bits: Optional[int] = None) -> Future:
+        crypto_inst = self.__crypto[crypto_backend]
+        args = crypto_inst.get_dec_args(cipher, self.__user_addr, plain_bits)
+        if args is None:
+            # Uninitialized cipher text, nothing to compute
+            res = crypto_inst.dec(cipher, self.__user_addr)
+            future = Future()
+            future.set_result((constr(res[0]), res[1]))
+            return future
+
+        def wrap(raw):
+            res = crypto_inst.wrap_dec_result(raw)
+            return constr(res[0]), res[1]
+        return then(self.__crypto_executor.submit(crypto_inst, 'dec_raw', *args), wrap)
+
+    def dec_many(self, ciphers: Sequence[CipherValue], constr: Callable[[int], Any],
+                 crypto_backend: str = cfg.main_crypto_backend, plain_bits: Optional[int] = None) -> List[Tuple[Any, Optional[RandomnessValue]]]:
+        """Decrypt all ciphers, batches of decryptions may run concurrently."""
+        crypto_inst = self.__crypto[crypto_backend]
+        args = [crypto_inst.get_dec_args(cipher, self.__user_addr, plain_bits) for cipher in ciphers]
+        todo = [idx for idx, arg in enumerate(args) if arg is not None]
+
+        # Uninitialized cipher texts, nothing to compute
+        results = [None if arg is not None else crypto_inst.dec(cipher, self.__user_addr) for cipher, arg in zip(ciphers, args)]
+        if todo:
+            # One dec_many_raw batch per executor worker
+            sk = args[todo[0]][1]
+            futures = [self.__crypto_executor.submit(crypto_inst, 'dec_many_raw', [args[idx][0] for idx in chunk], sk, plain_bits)
+                       for chunk in self.__chunks(todo)]
+            raw_results = [raw for future in futures for raw in future.result()]
+            for idx, raw in zip(todo, raw_results):
+                results[idx] = crypto_inst.wrap_dec_result(raw)
+        return [(constr(plain), rnd) for plain, rnd in results]
+
+    def __chunks(self, items: List) -> List[List]:
+        """Split items into (at most) one contiguous chunk per crypto executor worker."""
+        chunk_size = -(-len(items) // self.__crypto_executor.workers)
+        return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
 
     def do_homomorphic_op(self, op: str, crypto_backend: str, target_addr: AddressValue, *args: Union[CipherValue, int]):
+        return self.do_homomorphic_op_async(op, crypto_backend, target_addr, *args).result()
+
+    def do_homomorphic_op_async(self, op: str, crypto_backend: str, target_addr: AddressValue, *args: Union[CipherValue, int]) -> Future:
         params = CryptoParams(crypto_backend)
         pk = self.__keystore[params.crypto_name].getPk(target_addr)
         for arg in args:
@@ -427,8 +527,7 @@ class ApiWrapper:
 
         crypto_inst = self.__crypto[params.crypto_name]
         assert isinstance(crypto_inst, ZkayHomomorphicCryptoInterface)
-        result = crypto_inst.do_op(op, pk[:], *args)
-        return CipherValue(result, params=params)
+        return self.__crypto_executor.submit(crypto_inst, 'do_op_value', op, pk[:], *args)
 
     def do_rerand(self, arg: CipherValue, crypto_backend: str, target_addr: AddressValue, data: Dict, rnd_key: str):
         """
@@ -438,7 +537,7 @@ class ApiWrapper:
         pk = self.__keystore[params.crypto_name].getPk(target_addr)
         crypto_inst = self.__crypto[params.crypto_name]
         assert isinstance(crypto_inst, ZkayHomomorphicCryptoInterface)
-        result, rand = crypto_inst.do_rerand(arg, pk[:])
+        result, rand = self.__crypto_executor.submit(crypto_inst, 'do_rerand', arg, pk[:]).result()
         data[rnd_key] = RandomnessValue(rand, params=params)    # store randomness
         return CipherValue(result, params=params)
 
@@ -490,7 +589,8 @@ class ApiWrapper:
         self.__serialize_circuit_array(zk_priv, self.all_priv_values, self.current_all_index, priv_elem_bitwidths)
 
     def gen_proof(self, fname: str, in_vals: List, out_vals: List[Union[int, CipherValue]]) -> List[int]:
-        return self.__prover.generate_proof(self.__project_dir, self.__contract_name, fname, self.all_priv_values, in_vals, out_vals)
+        return self.__proving_scheduler.submit(self.__prover, self.__project_dir, self.__contract_name, fname, self.all_priv_values,
+                                               in_vals, out_vals, priority=self.proof_priority).result()
 
     @contextmanager
     def __call_ctx(self, sec_offset) -> ContextManager:
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from zkay.config import cfg
+from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.types import AddressValue, PublicKeyValue
+
+
+class PersistentPkCache:
+    """
+    On-disk cache for the public keys which were requested from a single pki contract.
+
+    The cache remembers up to which block all public key announcements have been taken into account (synced_block)
+    and, for every key, the block at which it was cached. A cached key is discarded as soon as an announcement for
+    the same address in a later block is seen.
+    """
+
+    format_version = 1
+
+    def __init__(self, cache_id: str, crypto_params: CryptoParams):
+        self.cache_id = cache_id
+        self.crypto_params = crypto_params
+        self.synced_block: Optional[int] = None
+        self._entries: Dict[str, Tuple[List[int], int]] = {}
+
+        name = hashlib.sha256(cache_id.encode()).hexdigest()[:32]
+        self.filename = os.path.join(cfg.data_dir, 'pk_cache', f'{name}.json')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """Load the cache file (missing, corrupted or incompatible files result in an empty cache)."""
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+            if data['version'] != self.format_version or data['id'] != self.cache_id:
+                return
+            entries = {addr: (pk, block) for addr, (pk, block) in data['keys'].items()}
+            synced_block = data['synced_block']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self._entries, self.synced_block = entries, synced_block
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        data = {'version': self.format_version, 'id': self.cache_id, 'synced_block': self.synced_block,
+                'keys': {addr: [pk, block] for addr, (pk, block) in self._entries.items()}}
+        tmp_file = f'{self.filename}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_file, self.filename)
+
+    def sync(self, current_block: int, announcements: Dict[AddressValue, int]):
+        """
+        Discard all keys which were announced again after they were cached.
+
+        :param current_block: the current block number, all announcements up to this block must be contained in announcements
+        :param announcements: maps addresses to the block number of their latest announcement after synced_block
+        """
+        if self.synced_block is not None and current_block < self.synced_block:
+            # Chain was reset or reorganized, nothing can be trusted
+            self._entries.clear()
+        for address, block in announcements.items():
+            entry = self._entries.get(str(address))
+            if entry is not None and entry[1] < block:
+                del self._entries[str(address)]
+        self.synced_block = current_block
+
+    def get_all(self) -> Dict[AddressValue, PublicKeyValue]:
+        return {AddressValue(bytes.fromhex(addr)): PublicKeyValue(pk, params=self.crypto_params)
+                for addr, (pk, _) in self._entries.items()}
+
+    def put(self, pks: Dict[AddressValue, PublicKeyValue]):
+        """Add keys which were requested after the last call to sync."""
+        assert self.synced_block is not None
+        for address, pk in pks.items():
+            self._entries[str(address)] = (list(pk[:]), self.synced_block)
@@ -5,6 +5,8 @@ This package contains the proof-generation backends.
 Submodules
 ==========
 * :py:mod:`.jsnark`: Proof generation using zkay jsnark/libsnark interface
+* :py:mod:`.scheduler`: Memory-aware scheduling of concurrent proof generations
 """
 
 from .jsnark import JsnarkProver
+from .scheduler import ProvingScheduler
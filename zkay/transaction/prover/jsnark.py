@@ -1,25 +1,55 @@
 import os
 from subprocess import SubprocessError
 from tempfile import TemporaryDirectory
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 import zkay.jsnark_interface.jsnark_interface as jsnark
 import zkay.jsnark_interface.libsnark_interface as libsnark
+from zkay.config import cfg, zk_print
+from zkay.jsnark_interface.witness_server import WitnessServerUnavailable, witness_server
 from zkay.transaction.interface import ZkayProverInterface, ProofGenerationError
 from zkay.utils.helpers import hash_file
 from zkay.utils.timer import time_measure
 
 
 class JsnarkProver(ZkayProverInterface):
+    memory_base = 256 << 20
+    """Estimated memory usage of the libsnark process of a proof generation, independent of the circuit size"""
+
+    memory_per_constraint = 4 << 10
+    """Estimated memory usage of the libsnark process of a proof generation per circuit constraint"""
+
+    jvm_overhead = 256 << 20
+    """Memory usage of a jvm in addition to its heap"""
+
+    def __init__(self, proving_scheme: str = None):
+        super().__init__(proving_scheme)
+        self._witness_server_failed = False
+        self._constraint_counts: Dict[str, Tuple[float, int]] = {}
+
+    def _uses_witness_server(self) -> bool:
+        return cfg.jsnark_witness_server and not self._witness_server_failed
+
+    def _prepare_proof(self, verifier_dir: str, output_dir: str, args: List[int]):
+        if self._uses_witness_server():
+            try:
+                witness_server().prepare_proof(verifier_dir, output_dir, args)
+                return
+            except WitnessServerUnavailable as e:
+                zk_print(f'WARNING: jsnark witness server not available, starting a new jvm per proof ({e})')
+                self._witness_server_failed = True
+        # The heap of the jvm is limited to what estimate_memory accounts for
+        jsnark.prepare_proof(verifier_dir, output_dir, args, jsnark.get_jvm_heap_size(self._count_constraints(verifier_dir)))
+
     def _generate_proof(self, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> List[int]:
         args = list(map(int, in_vals + out_vals + priv_values))
 
         # Generate proof in temporary directory
-        with TemporaryDirectory() as tempd:
+        with TemporaryDirectory(dir=cfg.proving_tmp_dir or None) as tempd:
             proof_path = os.path.join(tempd, 'proof.out')
             try:
                 with time_measure("jsnark_prepare_proof"):
-                    jsnark.prepare_proof(verifier_dir, tempd, args)
+                    self._prepare_proof(verifier_dir, tempd, args)
 
                 with time_measure("libsnark_gen_proof"):
                     libsnark.generate_proof(verifier_dir, tempd, proof_path, self.proving_scheme)
@@ -31,5 +61,33 @@ class JsnarkProver(ZkayProverInterface):
         proof = list(map(lambda x: int(x, 0), proof_lines))
         return proof
 
+    def _count_constraints(self, verifier_dir: str) -> Optional[int]:
+        """Return the number of constraints of the circuit in verifier_dir (None if it is not compiled)."""
+        arith_file = os.path.join(verifier_dir, 'circuit.arith')
+        try:
+            mtime = os.path.getmtime(arith_file)
+        except OSError:
+            return None
+
+        # Count constraints once per circuit version
+        cached = self._constraint_counts.get(arith_file)
+        if cached is None or cached[0] != mtime:
+            cached = self._constraint_counts[arith_file] = (mtime, jsnark.count_constraints(arith_file))
+        return cached[1]
+
+    def estimate_memory(self, verifier_dir: str) -> int:
+        constraints = self._count_constraints(verifier_dir)
+        libsnark_memory = self.memory_base + (constraints or 0) * self.memory_per_constraint
+        if self._uses_witness_server():
+            # The circuit is evaluated by the resident witness server (see get_shared_memory)
+            return libsnark_memory
+        # The jvm has exited before libsnark is started
+        return max(libsnark_memory, jsnark.get_jvm_heap_size(constraints) + self.jvm_overhead)
+
+    def get_shared_memory(self) -> int:
+        if cfg.jsnark_witness_server and not cfg.jsnark_witness_server_address:
+            return jsnark.jvm_max_heap + self.jvm_overhead
+        return 0
+
     def get_prover_key_hash(self, verifier_directory: str) -> bytes:
         return hash_file(os.path.join(verifier_directory, 'proving.key'))
@@ -0,0 +1,159 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+
+from zkay.transaction.interface import ZkayProverInterface
+from zkay.transaction.types import CipherValue
+
+
+def get_physical_memory() -> Optional[int]:
+    """Return the size of the physical memory of this machine in bytes (None if unknown)."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class _ProofJob:
+    def __init__(self, prover: ZkayProverInterface, args: tuple, memory: int, priority: int):
+        self.prover = prover
+        self.args = args
+        self.memory = memory
+        self.priority = priority
+        self.future = Future()
+        self.submit_time = time.monotonic()
+
+
+class ProvingScheduler:
+    """
+    Generates proofs which are submitted by many threads (or contract simulators) in parallel.
+
+    At most max_jobs proofs are generated at the same time, and only as many as fit into the memory budget according to
+    the prover's per-circuit memory estimates (ZkayProverInterface.estimate_memory). A proof which does not fit
+    into the budget on its own is generated when no other proof is running.
+
+    Waiting proofs are started in order of decreasing priority, proofs with equal priority in submission order.
+    Only the first waiting proof is ever admitted, such that large proofs are not starved by smaller ones.
+    """
+
+    def __init__(self, max_jobs: int = 0, memory_budget: Optional[int] = None):
+        """
+        :param max_jobs: maximum number of concurrently generated proofs (if 0, one per cpu core)
+        :param memory_budget: total memory in bytes which the running proofs may use (if None, no limit)
+        """
+        self.max_jobs = max_jobs if max_jobs > 0 else os.cpu_count()
+        self.memory_budget = memory_budget
+
+        self._cv = threading.Condition()
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._shutdown = False
+
+        self._started = 0
+        self._running = 0
+        self._memory_in_use = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def submit(self, prover: ZkayProverInterface, project_dir: str, contract: str, function: str, priv_values: List,
+               in_vals: List, out_vals: List[Union[int, CipherValue]], priority: int = 0) -> Future:
+        """
+        Schedule prover.generate_proof(project_dir, contract, function, priv_values, in_vals, out_vals).
+
+        :param priority: proofs with higher priority are started first
+        :return: future for the proof (raises ProofGenerationError if proof generation fails)
+        """
+        memory = prover.estimate_memory(prover.get_verifier_dir(project_dir, contract, function))
+        job = _ProofJob(prover, (project_dir, contract, function, list(priv_values), list(in_vals), list(out_vals)), memory, priority)
+        with self._cv:
+            if self._shutdown:
+                raise RuntimeError('Proving scheduler was shut down')
+            heapq.heappush(self._queue, (-priority, next(self._seq), job))
+            if len(self._threads) < self.max_jobs:
+                thread = threading.Thread(target=self._run, name=f'zkay-prover-{len(self._threads)}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cv.notify_all()
+        return job.future
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of proofs which wait to be started."""
+        with self._cv:
+            return len(self._queue)
+
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        """
+        Return the current state of the scheduler.
+
+        queue_depth, running: number of waiting / running proofs
+        memory_in_use: sum of the memory estimates of the running proofs in bytes
+        completed, failed: number of finished proofs
+        avg_wait_time, max_wait_time: time in seconds between submission and start of the started proofs
+        """
+        with self._cv:
+            return {
+                'queue_depth': len(self._queue),
+                'running': self._running,
+                'memory_in_use': self._memory_in_use,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_wait_time': self._total_wait_time / self._started if self._started else 0.0,
+                'max_wait_time': self._max_wait_time,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Cancel all waiting proofs and stop the scheduler threads once the running proofs are finished."""
+        with self._cv:
+            self._shutdown = True
+            for _, _, job in self._queue:
+                job.future.cancel()
+            self._queue.clear()
+            self._cv.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _can_start(self, job: _ProofJob) -> bool:
+        return self._running == 0 or self.memory_budget is None or self._memory_in_use + job.memory <= self.memory_budget
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._shutdown and not (self._queue and self._can_start(self._queue[0][2])):
+                    self._cv.wait()
+                if self._shutdown:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                wait_time = time.monotonic() - job.submit_time
+                self._total_wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+                self._started += 1
+                self._running += 1
+                self._memory_in_use += job.memory
+
+            failed = None
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.prover.generate_proof(*job.args))
+                    failed = False
+                except Exception as e:
+                    job.future.set_exception(e)
+                    failed = True
+
+            with self._cv:
+                self._running -= 1
+                self._memory_in_use -= job.memory
+                if failed is not None:
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+                self._cv.notify_all()
@@ -3,15 +3,18 @@ from zkay.transaction.crypto.dummy_hom import DummyHomCrypto
 from zkay.transaction.crypto.ecdh_chaskey import EcdhChaskeyCrypto
 from zkay.transaction.crypto.paillier import PaillierCrypto
 from zkay.transaction.crypto.params import CryptoParams
-from zkay.transaction.interface import ZkayBlockchainInterface, ZkayCryptoInterface, ZkayKeystoreInterface, ZkayProverInterface
+from zkay.transaction.interface import ZkayBlockchainInterface, ZkayCryptoInterface, ZkayKeystoreInterface, ZkayProverInterface, \
+    clear_key_pair_cache
 from zkay.transaction.blockchain import *
 from zkay.transaction.crypto.ecdh_aes import EcdhAesCrypto
 from zkay.transaction.crypto.dummy import DummyCrypto
 from zkay.transaction.crypto.rsa_pkcs15 import RSAPKCS15Crypto
 from zkay.transaction.crypto.rsa_oaep import RSAOAEPCrypto
 from zkay.transaction.crypto.elgamal import ElgamalCrypto
+from zkay.transaction.crypto.executor import CryptoExecutor, InlineCryptoExecutor, ProcessPoolCryptoExecutor
 from zkay.transaction.keystore import *
 from zkay.transaction.prover import *
+from zkay.transaction.prover.scheduler import get_physical_memory
 
 _crypto_classes = {
     'dummy': DummyCrypto,
@@ -28,6 +31,11 @@ _prover_classes = {
     'jsnark': JsnarkProver
 }
 
+_keystore_classes = {
+    'simple': SimpleKeystore,
+    'sharded': ShardedKeystore
+}
+
 _blockchain_classes = {
     'w3-eth-tester': Web3TesterBlockchain,
     'w3-ganache': Web3HttpGanacheBlockchain,
@@ -50,6 +58,8 @@ class Runtime:
     __crypto = {}
     __keystore = {}
     __prover = None
+    __crypto_executor = None
+    __proving_scheduler = None
 
     @staticmethod
     def reset():
@@ -61,7 +71,14 @@ class Runtime:
         Runtime.__blockchain = None
         Runtime.__crypto = {}
         Runtime.__keystore = {}
+        clear_key_pair_cache()
         Runtime.__prover = None
+        if Runtime.__crypto_executor is not None:
+            Runtime.__crypto_executor.shutdown()
+            Runtime.__crypto_executor = None
+        if Runtime.__proving_scheduler is not None:
+            Runtime.__proving_scheduler.shutdown()
+            Runtime.__proving_scheduler = None
 
     @staticmethod
     def blockchain() -> ZkayBlockchainInterface:
@@ -77,7 +94,7 @@ class Runtime:
         """Return object which implements ZkayKeystoreInterface for given homomorphism."""
         crypto_backend = crypto_params.crypto_name
         if crypto_backend not in Runtime.__keystore:
-            Runtime.__keystore[crypto_backend] = SimpleKeystore(Runtime.blockchain(), crypto_params)
+            Runtime.__keystore[crypto_backend] = _keystore_classes[cfg.keystore_backend](Runtime.blockchain(), crypto_params)
         return Runtime.__keystore[crypto_backend]
 
     @staticmethod
@@ -94,3 +111,26 @@ class Runtime:
         if Runtime.__prover is None:
             Runtime.__prover = _prover_classes[cfg.snark_backend]()
         return Runtime.__prover
+
+    @staticmethod
+    def crypto_executor() -> CryptoExecutor:
+        """Return singleton object which executes crypto backend operations (see cfg.crypto_executor)."""
+        if Runtime.__crypto_executor is None:
+            if cfg.crypto_executor == 'process' and not cfg.is_unit_test:
+                Runtime.__crypto_executor = ProcessPoolCryptoExecutor(cfg.crypto_executor_workers)
+            else:
+                Runtime.__crypto_executor = InlineCryptoExecutor()
+        return Runtime.__crypto_executor
+
+    @staticmethod
+    def proving_scheduler() -> ProvingScheduler:
+        """Return singleton object which schedules the proof generations of this process (see cfg.proving_scheduler_max_jobs)."""
+        if Runtime.__proving_scheduler is None:
+            if cfg.proving_scheduler_memory_gb > 0:
+                memory_budget = int(cfg.proving_scheduler_memory_gb * (1 << 30))
+            else:
+                memory_budget = get_physical_memory()
+                if memory_budget is not None:
+                    memory_budget = max(memory_budget - Runtime.prover().get_shared_memory(), 0)
+            Runtime.__proving_scheduler = ProvingScheduler(cfg.proving_scheduler_max_jobs, memory_budget)
+        return Runtime.__proving_scheduler
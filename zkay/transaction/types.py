@@ -1,3 +1,4 @@
+import functools
 from typing import Optional, Collection, Any, Dict, Tuple, List, Union, Callable
 
 from zkay.transaction.crypto.params import CryptoParams
@@ -61,19 +62,40 @@ class Value(tuple):
 
 
 class CipherValue(Value):
+    """
+    Cipher text in its chunked (on-chain) form.
+
+    Backends can attach the backend-native form of the cipher text (e.g. a big int) via get_native, which is
+    then computed at most once per value, even across chains of homomorphic operations.
+    """
+
     def __new__(cls, contents: Optional[Collection] = None, *,
-                params: CryptoParams = None, crypto_backend: str = None):
+                params: CryptoParams = None, crypto_backend: str = None, native: Any = None):
         params = Value.get_params(params, crypto_backend)
         content = [0] * params.cipher_len
         if contents:
             content[:len(contents)] = contents[:]
         ret = super(CipherValue, cls).__new__(cls, content)
         ret.params = params
+        if native is None and isinstance(contents, CipherValue) and contents.params == params:
+            # Re-wrapped cipher value, keep the native form
+            native = contents._native
+        ret._native = native
         return ret
 
     def __len__(self) -> int:
         return self.params.cipher_payload_len
 
+    def __reduce__(self):
+        # Crypto params are not part of the tuple contents, pass them explicitly when pickling (e.g. for crypto workers)
+        return functools.partial(CipherValue, params=self.params, native=self._native), (self[:],)
+
+    def get_native(self, deserialize: Callable[['CipherValue'], Any]) -> Any:
+        """Return the backend-native form of this cipher text, it is computed with deserialize(self) on first access."""
+        if self._native is None:
+            self._native = deserialize(self)
+        return self._native
+
 
 class PrivateKeyValue(Value):
     def __new__(cls, sk: Optional[Any] = None):